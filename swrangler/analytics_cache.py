@@ -0,0 +1,201 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Persistent cache of page analytics.
+
+This module provides a cache of view and viewer counts of Confluence pages
+stored in a local SQLite file, so that runs of ``pages-metadata`` only
+request counts which are missing or have expired.
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger("swrangler")
+
+
+def _batches(items: List[str], size: int) -> Iterator[List[str]]:
+    """Yield successive batches of items."""
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+class AnalyticsCache:
+    """Cache of analytics counts keyed by page ID and views type.
+
+    Every entry records when it was fetched and when it was last used.
+    Entries older than ``ttl`` are not returned by :meth:`get` but are kept
+    as a fallback for counts which cannot be fetched. Once the cache holds
+    more than ``max_entries`` entries, the least recently used ones are
+    evicted.
+
+    Attributes:
+        db_path (str): Path to the SQLite file.
+        site (str): The Confluence site the counts belong to.
+        ttl (float): Number of seconds a count stays fresh.
+        max_entries (int): Maximum number of entries kept in the cache.
+    """
+
+    # Keep the number of SQL variables well below the SQLite limit.
+    BATCH_SIZE: int = 500
+
+    def __init__(
+        self,
+        db_path: str,
+        site: str,
+        ttl: float = 86400,
+        max_entries: int = 1_000_000,
+    ) -> None:
+        """Open the cache, creating the SQLite file if needed.
+
+        Args:
+            db_path (str): Path to the SQLite file.
+            site (str): The Confluence site the counts belong to.
+            ttl (float, optional): Number of seconds a count stays fresh
+                (default is one day).
+            max_entries (int, optional): Maximum number of entries kept in
+                the cache (default is 1000000).
+        """
+        self.db_path = db_path
+        self.site = site
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Several runs may share the cache, so wait for their writes
+        # instead of failing.
+        self._connection = sqlite3.connect(db_path, timeout=30)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS analytics ("
+                "site TEXT NOT NULL, "
+                "content_id TEXT NOT NULL, "
+                "views_type TEXT NOT NULL, "
+                "count INTEGER NOT NULL, "
+                "fetched_at REAL NOT NULL, "
+                "used_at REAL NOT NULL, "
+                "PRIMARY KEY (site, content_id, views_type))"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS analytics_used_at "
+                "ON analytics (used_at)"
+            )
+
+    def get(
+        self,
+        views_type: str,
+        content_ids: Iterable[str],
+        max_age: Optional[float] = None,
+    ) -> Dict[str, int]:
+        """Get cached counts and mark them as recently used.
+
+        Args:
+            views_type (str): The type of analytics (viewers or views).
+            content_ids (Iterable[str]): IDs of Confluence pages.
+            max_age (Optional[float], optional): Maximum age of returned
+                counts in seconds (default is None, the TTL of the cache).
+                Use ``float("inf")`` to get expired counts as well.
+
+        Returns:
+            dict: Cached counts keyed by page ID. Pages without a count
+                young enough are omitted.
+        """
+        now = time.time()
+        oldest = now - (self.ttl if max_age is None else max_age)
+        counts: Dict[str, int] = {}
+
+        with self._connection:
+            for batch in _batches(list(content_ids), self.BATCH_SIZE):
+                placeholders = ",".join("?" * len(batch))
+                params: List[Any] = [self.site, views_type, *batch]
+                rows = self._connection.execute(
+                    "SELECT content_id, count, fetched_at FROM analytics "
+                    "WHERE site = ? AND views_type = ? "
+                    f"AND content_id IN ({placeholders})",
+                    params,
+                ).fetchall()
+
+                fresh = {
+                    content_id: count
+                    for content_id, count, fetched_at in rows
+                    if fetched_at >= oldest
+                }
+                if not fresh:
+                    continue
+
+                counts.update(fresh)
+                self._connection.execute(
+                    "UPDATE analytics SET used_at = ? "
+                    "WHERE site = ? AND views_type = ? "
+                    f"AND content_id IN ({','.join('?' * len(fresh))})",
+                    [now, self.site, views_type, *fresh],
+                )
+
+        return counts
+
+    def put(self, views_type: str, counts: Dict[str, Optional[int]]) -> None:
+        """Store fetched counts and evict the least recently used entries.
+
+        Args:
+            views_type (str): The type of analytics (viewers or views).
+            counts (dict): Counts keyed by page ID. None counts, which
+                could not be fetched, are ignored.
+        """
+        now = time.time()
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO analytics "
+                "(site, content_id, views_type, count, fetched_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (self.site, content_id, views_type, count, now, now)
+                    for content_id, count in counts.items()
+                    if count is not None
+                ),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        """Remove the least recently used entries above the size limit."""
+        (size,) = self._connection.execute(
+            "SELECT COUNT(*) FROM analytics"
+        ).fetchone()
+        excess = size - self.max_entries
+        if excess <= 0:
+            return
+
+        self._connection.execute(
+            "DELETE FROM analytics WHERE rowid IN ("
+            "SELECT rowid FROM analytics ORDER BY used_at LIMIT ?)",
+            (excess,),
+        )
+        logger.debug(f"Evicted {excess} entries from the analytics cache")
+
+    def close(self) -> None:
+        """Close the cache."""
+        self._connection.close()
+
+    def __enter__(self) -> "AnalyticsCache":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
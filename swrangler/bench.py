@@ -0,0 +1,325 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmarks of swrangler commands.
+
+This module runs swrangler commands end to end against a local fake
+Confluence server and measures their throughput and memory usage. Every
+command runs in a fresh interpreter, so the results include the startup
+time and the peak RSS is not shared between commands.
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from swrangler import __version__
+
+# The CLI imports the names of the commands at startup, so modules only
+# needed to run benchmarks are imported when they run.
+if TYPE_CHECKING:
+    from swrangler.fake_server import FakeConfluenceServer, FakeServerOptions
+
+logger = logging.getLogger("swrangler")
+
+COMMANDS = (
+    "spaces-metadata",
+    "export-space",
+    "pages-metadata",
+    "owners-metadata",
+)
+
+
+@dataclass
+class BenchmarkResult:  # pylint: disable=too-many-instance-attributes
+    """Measurements of a single benchmarked command.
+
+    Attributes:
+        command (str): Name of the benchmarked command.
+        exit_code (int): Exit code of the command.
+        wall_time (float): Wall-clock time of the command in seconds.
+        items (int): Number of processed items (spaces or pages).
+        requests (int): Number of requests received by the server.
+        failures (int): Number of failures injected by the server.
+        bytes_received (int): Number of response body bytes received.
+        peak_rss (Optional[int]): Largest peak resident set size of the
+            command or of any single worker process it waited for, in
+            bytes. None where the platform does not report it.
+        api (str): REST API version used to fetch pages.
+    """
+
+    command: str
+    exit_code: int
+    wall_time: float
+    items: int
+    requests: int
+    failures: int
+    bytes_received: int
+    peak_rss: Optional[int]
+    api: str = "v1"
+
+    @property
+    def items_per_second(self) -> float:
+        """float: Number of items processed per second."""
+        return self.items / self.wall_time if self.wall_time else 0.0
+
+    @property
+    def requests_per_second(self) -> float:
+        """float: Number of requests made per second."""
+        return self.requests / self.wall_time if self.wall_time else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the result to a dictionary for JSON reports.
+
+        Returns:
+            dict: Dictionary representation of the result.
+        """
+        data = asdict(self)
+        data["items_per_second"] = round(self.items_per_second, 2)
+        data["requests_per_second"] = round(self.requests_per_second, 2)
+        return data
+
+
+def build_argv(
+    command: str,
+    space_keys: Sequence[str],
+    output_dir: str,
+    extra_args: Sequence[str] = (),
+) -> List[str]:
+    """Build the command line of a benchmarked command.
+
+    Args:
+        command (str): Name of the command.
+        space_keys (Sequence[str]): Keys of the spaces to work with.
+        output_dir (str): Directory to save the data.
+        extra_args (Sequence[str], optional): Additional arguments of the
+            command (default is empty).
+
+    Returns:
+        list: Command line arguments.
+    """
+    argv = [sys.executable, "-m", "swrangler", "-q", command]
+    if command != "spaces-metadata":
+        argv += ["--space-key", ",".join(space_keys)]
+    return argv + ["--output-dir", output_dir, *extra_args]
+
+
+def spawn(
+    argv: Sequence[str], env: Dict[str, str]
+) -> Tuple[int, float, Optional[int]]:
+    """Run a command and measure its wall-clock time and peak RSS.
+
+    The peak RSS is the largest of the command and of the worker processes
+    it waited for, not their total. It is only measured where
+    ``os.wait4()`` is available, i.e. not on Windows.
+
+    Args:
+        argv (Sequence[str]): Command line arguments.
+        env (dict): Environment variables of the command.
+
+    Returns:
+        tuple: Exit code, wall-clock time in seconds and peak resident set
+            size in bytes, None if it is not measured.
+    """
+    import subprocess
+    import tempfile
+
+    peak_rss = None
+    with tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        # pylint: disable=consider-using-with
+        process = subprocess.Popen(
+            argv, env=env, stdout=subprocess.DEVNULL, stderr=stderr
+        )
+        if hasattr(os, "wait4"):
+            # Unlike Popen.wait(), wait4() reports the resource usage of
+            # this very child. Its ru_maxrss is the largest of the child
+            # and of the worker processes it has reaped.
+            _, status, rusage = os.wait4(process.pid, 0)
+            wall_time = time.perf_counter() - start
+            process.returncode = os.waitstatus_to_exitcode(status)
+            # ru_maxrss is reported in bytes on macOS and in kilobytes
+            # elsewhere.
+            scale = 1 if sys.platform == "darwin" else 1024
+            peak_rss = rusage.ru_maxrss * scale
+        else:
+            process.wait()
+            wall_time = time.perf_counter() - start
+
+        if process.returncode != 0:
+            stderr.seek(0)
+            message = stderr.read().decode("utf-8", "replace").strip()
+            logger.warning(f"Command exited with {process.returncode}")
+            if message:
+                logger.warning(message)
+
+    return process.returncode, wall_time, peak_rss
+
+
+def run_command(
+    server: "FakeConfluenceServer",
+    command: str,
+    output_dir: str,
+    extra_args: Sequence[str] = (),
+) -> BenchmarkResult:
+    """Run a single command against the fake server and measure it.
+
+    Args:
+        server (FakeConfluenceServer): Running fake Confluence server.
+        command (str): Name of the command.
+        output_dir (str): Directory to save the data.
+        extra_args (Sequence[str], optional): Additional arguments of the
+            command (default is empty).
+
+    Returns:
+        BenchmarkResult: Measurements of the command.
+    """
+    options = server.options
+    space_keys = [server.content.space_key(i) for i in range(options.spaces)]
+    env = dict(
+        os.environ,
+        CONFLUENCE_DOMAIN=server.url,
+        CONFLUENCE_API_USER="bench@example.com",
+        CONFLUENCE_API_TOKEN="bench-token",
+    )
+
+    logger.info(f"Benchmark {command}...")
+    server.reset_stats()
+    exit_code, wall_time, peak_rss = spawn(
+        build_argv(command, space_keys, output_dir, extra_args), env
+    )
+
+    items = options.spaces
+    if command != "spaces-metadata":
+        items *= options.pages
+
+    return BenchmarkResult(
+        command=command,
+        exit_code=exit_code,
+        wall_time=round(wall_time, 3),
+        items=items,
+        requests=server.requests_count,
+        failures=server.failures_count,
+        bytes_received=server.bytes_sent,
+        peak_rss=peak_rss,
+    )
+
+
+def run_benchmark(
+    commands: Sequence[str] = COMMANDS,
+    options: Optional["FakeServerOptions"] = None,
+    extra_args: Sequence[str] = (),
+    apis: Sequence[str] = ("v1",),
+) -> List[BenchmarkResult]:
+    """Benchmark commands against a fake Confluence server.
+
+    Commands fetching pages run once per REST API version, so the versions
+    can be compared.
+
+    Args:
+        commands (Sequence[str], optional): Names of the commands to
+            benchmark (default is all commands).
+        options (Optional[FakeServerOptions], optional): Configuration of
+            the fake server (default is None, the default options).
+        extra_args (Sequence[str], optional): Additional arguments passed
+            to every command (default is empty).
+        apis (Sequence[str], optional): REST API versions used to fetch
+            pages (default is v1 only).
+
+    Returns:
+        list: Measurements of every command.
+    """
+    import tempfile
+
+    from swrangler.fake_server import FakeConfluenceServer
+
+    results = []
+    with FakeConfluenceServer(options) as server:
+        with tempfile.TemporaryDirectory(prefix="swrangler-bench-") as tmp:
+            for command in commands:
+                if command == "spaces-metadata":
+                    output_dir = os.path.join(tmp, command)
+                    results.append(
+                        run_command(server, command, output_dir, extra_args)
+                    )
+                    continue
+
+                for api in apis:
+                    output_dir = os.path.join(tmp, f"{command}-{api}")
+                    result = run_command(
+                        server,
+                        command,
+                        output_dir,
+                        [*extra_args, "--api", api],
+                    )
+                    result.api = api
+                    results.append(result)
+    return results
+
+
+def _format_rss(peak_rss: Optional[int]) -> str:
+    """Format a peak RSS in MiB for the report."""
+    return "n/a" if peak_rss is None else f"{peak_rss / 2**20:.1f}"
+
+
+def report(
+    results: Sequence[BenchmarkResult],
+    options: "FakeServerOptions",
+    output_file: Optional[str] = None,
+) -> None:
+    """Log benchmark results and optionally save them as JSON.
+
+    Args:
+        results (Sequence[BenchmarkResult]): Measurements of commands.
+        options (FakeServerOptions): Configuration of the fake server.
+        output_file (Optional[str], optional): Path of the JSON report
+            (default is None, do not save).
+    """
+    logger.info(
+        f"{'command':<16} {'api':<3} {'exit':>4} {'time, s':>8} "
+        f"{'items/s':>9} {'req/s':>8} {'failures':>8} {'peak RSS, MiB':>13}"
+    )
+    for result in results:
+        logger.info(
+            f"{result.command:<16} {result.api:<3} {result.exit_code:>4} "
+            f"{result.wall_time:>8.2f} {result.items_per_second:>9.1f} "
+            f"{result.requests_per_second:>8.1f} {result.failures:>8} "
+            f"{_format_rss(result.peak_rss):>13}"
+        )
+
+    if output_file is None:
+        return
+
+    data = {
+        "version": __version__,
+        "python": sys.version.split()[0],
+        "options": asdict(options),
+        "results": [result.to_dict() for result in results],
+    }
+    with open(output_file, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=4)
+    logger.info(f"Benchmark results saved to {output_file}")
@@ -0,0 +1,346 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Checkpoint journal for long-running commands.
+
+This module provides a journal which records the progress of a command for
+a single space, so that an interrupted run can be resumed without fetching
+the completed work again.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Set,
+    Type,
+)
+
+logger = logging.getLogger("swrangler")
+
+
+class Checkpoint:  # pylint: disable=too-many-instance-attributes
+    """Progress journal of a command for a single Confluence space.
+
+    The journal lives in ``<output_dir>/<SPACE-KEY>/.checkpoint/<command>``
+    and consists of two files: ``pages.jsonl`` with all batches of pages
+    fetched so far and the requests which fetched them, and ``state.json``
+    with the pagination cursor, the IDs of completed pages and the analytics
+    counts fetched so far. The state file is replaced atomically every few
+    batches or seconds and records the committed size of the pages file, so
+    a crash between two flushes never duplicates pages on resume.
+
+    Without bodies, pages are journaled without their content. Resuming
+    then fetches the pages again from the first batch with a page which is
+    not completed, as only completed pages can do without their content.
+
+    The journal is a context manager: it is removed when the command
+    completes and flushed when the command fails or is interrupted. It is
+    thread-safe, so pages can be marked completed by worker threads.
+
+    Attributes:
+        directory (str): Directory holding the journal files.
+        flush_interval (float): Minimum number of seconds between two
+            periodic flushes of the state.
+        flush_batches (int): Number of batches of pages recorded between
+            two flushes of the state.
+        bodies (bool): Whether to journal the bodies of pages.
+        journal (bool): Whether the journal is written to disk.
+        before_flush (Optional[Callable]): Function called before the state
+            is written.
+        cursor (Optional[dict]): Query parameters of the next page request,
+            None before the first request.
+        pagination_done (bool): Whether all pages have been fetched.
+        completed (Set[str]): IDs of pages fully processed by the command.
+        analytics (Dict[str, Dict[str, Optional[int]]]): Analytics counts
+            keyed by views type and page ID.
+    """
+
+    STATE_FILE: str = "state.json"
+    PAGES_FILE: str = "pages.jsonl"
+
+    def __init__(
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        output_dir: str,
+        space_key: str,
+        command: str,
+        flush_interval: float = 30.0,
+        before_flush: Optional[Callable[[], None]] = None,
+        flush_batches: int = 10,
+        bodies: bool = True,
+    ) -> None:
+        """Initialize an empty Checkpoint.
+
+        Args:
+            output_dir (str): Base output directory.
+            space_key (str): The key of the Confluence space.
+            command (str): Name of the command owning the journal.
+            flush_interval (float, optional): Minimum number of seconds
+                between two periodic flushes (default is 30).
+            before_flush (Optional[Callable], optional): Function called
+                before the state is written, e.g. to flush the files of
+                completed pages to disk first (default is None).
+            flush_batches (int, optional): Number of batches of pages
+                recorded between two flushes (default is 10).
+            bodies (bool, optional): Whether to journal the bodies of pages
+                (default is True).
+        """
+        self.directory = os.path.join(
+            output_dir, space_key, ".checkpoint", command
+        )
+        self.flush_interval = flush_interval
+        self.before_flush = before_flush
+        self.flush_batches = flush_batches
+        self.bodies = bodies
+        self.journal = True
+
+        self.cursor: Optional[Dict[str, Any]] = None
+        self.pagination_done = False
+        self.completed: Set[str] = set()
+        self.analytics: Dict[str, Dict[str, Optional[int]]] = {}
+
+        self._pages_size = 0
+        self._pages_count = 0
+        self._batches = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+
+    @property
+    def state_path(self) -> str:
+        """str: Path to the state file."""
+        return os.path.join(self.directory, self.STATE_FILE)
+
+    @property
+    def pages_path(self) -> str:
+        """str: Path to the pages file."""
+        return os.path.join(self.directory, self.PAGES_FILE)
+
+    @property
+    def pages_count(self) -> int:
+        """int: Number of pages recorded in the journal."""
+        return self._pages_count
+
+    def start(self, resume: bool, journal: bool = True) -> "Checkpoint":
+        """Load the journal left by a previous run or start a new one.
+
+        Args:
+            resume (bool): Whether to continue from the existing journal.
+                Without it any existing journal is discarded.
+            journal (bool, optional): Whether to write the journal to disk.
+                Without it the progress is only kept in memory and the run
+                cannot be resumed (default is True).
+
+        Returns:
+            Checkpoint: The journal itself.
+        """
+        self.journal = journal
+        if resume and os.path.exists(self.state_path):
+            self._load()
+            logger.info(
+                f"Resume from checkpoint: {self._pages_count} pages fetched, "
+                f"{len(self.completed)} pages completed"
+            )
+        else:
+            if resume:
+                logger.info("No checkpoint found, start from scratch")
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+        if journal:
+            os.makedirs(self.directory, exist_ok=True)
+        return self
+
+    def _load(self) -> None:
+        """Load the state and drop pages written after the last flush."""
+        with open(self.state_path, encoding="utf-8") as file:
+            state = json.load(file)
+
+        self.cursor = state["cursor"]
+        self.pagination_done = state["pagination_done"]
+        self.completed = set(state["completed"])
+        self.analytics = state["analytics"]
+        self._pages_size = state["pages_size"]
+        self._pages_count = state["pages_count"]
+
+        if os.path.exists(self.pages_path):
+            with open(self.pages_path, "r+b") as file:
+                file.truncate(self._pages_size)
+                if not self.bodies:
+                    self._rewind(file)
+
+    def _rewind(self, file: BinaryIO) -> None:
+        """Drop the batches from the first one with an incomplete page."""
+        file.seek(0)
+        count = 0
+        for line in iter(file.readline, b""):
+            batch = json.loads(line)
+            if any(page["id"] not in self.completed for page in batch["pages"]):
+                self.cursor = batch["request"]
+                self.pagination_done = False
+                self._pages_size = file.tell() - len(line)
+                self._pages_count = count
+                file.truncate(self._pages_size)
+                return
+            count += len(batch["pages"])
+
+    def iter_pages(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over the pages recorded in the journal.
+
+        Yields:
+            dict: Confluence page data.
+        """
+        if not os.path.exists(self.pages_path):
+            return
+
+        with open(self.pages_path, encoding="utf-8") as file:
+            for line in file:
+                yield from json.loads(line)["pages"]
+
+    def record_pages(
+        self,
+        pages: Iterable[Dict[str, Any]],
+        cursor: Optional[Dict[str, Any]],
+        request: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Record a batch of fetched pages and the cursor of the next batch.
+
+        The state is flushed every few batches, the pages recorded after
+        the last flush are fetched again on resume.
+
+        Args:
+            pages (Iterable[dict]): Fetched Confluence pages.
+            cursor (Optional[dict]): Query parameters of the next request,
+                None if there are no more pages.
+            request (Optional[dict], optional): Query parameters of the
+                request which fetched the pages. Without bodies it is where
+                a resumed run starts if a page is not completed (default is
+                None).
+        """
+        with self._lock:
+            if not self.bodies:
+                pages = [
+                    {key: value for key, value in page.items() if key != "body"}
+                    for page in pages
+                ]
+            else:
+                pages = list(pages)
+
+            if self.journal:
+                batch = {"request": request, "pages": pages}
+                with open(self.pages_path, "a", encoding="utf-8") as file:
+                    file.write(json.dumps(batch) + "\n")
+                    self._pages_size = file.tell()
+            self._pages_count += len(pages)
+
+            self.cursor = cursor
+            self.pagination_done = cursor is None
+            self._batches += 1
+            if self._batches >= self.flush_batches:
+                self.flush()
+            else:
+                self.maybe_flush()
+
+    def mark_completed(self, page_id: str) -> None:
+        """Record that a page has been fully processed.
+
+        Args:
+            page_id (str): The ID of the Confluence page.
+        """
+        with self._lock:
+            self.completed.add(page_id)
+            self.maybe_flush()
+
+    def record_analytics(
+        self, views_type: str, counts: Dict[str, Optional[int]]
+    ) -> None:
+        """Record fetched analytics counts.
+
+        Args:
+            views_type (str): The type of analytics (viewers or views).
+            counts (dict): Analytics counts keyed by page ID.
+        """
+        with self._lock:
+            self.analytics.setdefault(views_type, {}).update(counts)
+            self.maybe_flush()
+
+    def maybe_flush(self) -> None:
+        """Flush the state if the flush interval has elapsed."""
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Atomically write the state to disk."""
+        with self._lock:
+            if not self.journal:
+                return
+
+            if self.before_flush is not None:
+                self.before_flush()
+            if os.path.exists(self.pages_path):
+                # The state must not count pages lost by a crash.
+                with open(self.pages_path, "ab") as file:
+                    os.fsync(file.fileno())
+
+            state = {
+                "cursor": self.cursor,
+                "pagination_done": self.pagination_done,
+                "completed": sorted(self.completed),
+                "analytics": self.analytics,
+                "pages_size": self._pages_size,
+                "pages_count": self._pages_count,
+            }
+
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(state, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.state_path)
+
+            self._batches = 0
+            self._last_flush = time.monotonic()
+
+    def remove(self) -> None:
+        """Remove the journal from disk."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self) -> "Checkpoint":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Any,
+    ) -> None:
+        if exc_type is None or not self.journal:
+            self.remove()
+            return
+
+        self.flush()
+        logger.warning(
+            f"Progress saved to {self.directory}. "
+            "Rerun the command with --resume to continue."
+        )
@@ -0,0 +1,297 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Chunked plain text of exported pages for search and embedding.
+
+The plain text of every page is split into chunks of limited size at the
+boundaries of its paragraphs, lines or, as a last resort, words. Chunks are
+written as NDJSON records while the text is in memory, so that indexers do
+not have to read and split the exported files again.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from swrangler.common import get_structured_title
+from swrangler.file_writer import FileWriter
+from swrangler.metrics import metrics
+from swrangler.renderers import rendered_text
+
+logger = logging.getLogger("swrangler")
+
+# Default maximum size of a chunk in characters, about 1000 tokens.
+DEFAULT_CHUNK_SIZE = 4000
+
+# Boundaries to split text at, in order of preference. Paragraphs of the
+# plain text are separated by an empty line.
+_SEPARATORS = ("\n\n", "\n", " ")
+
+
+def _parts(
+    text: str, start: int, end: int, separator: str
+) -> Iterator[Tuple[int, int]]:
+    """Find the non-blank parts of a span of text between separators."""
+    while start < end:
+        stop = text.find(separator, start, end)
+        if stop == -1:
+            stop = end
+        if text[start:stop].strip():
+            yield start, stop
+        start = stop + len(separator)
+
+
+def _split(
+    text: str, start: int, end: int, size: int, level: int
+) -> List[Tuple[int, int]]:
+    """Split a span of text at the separators of a level and below."""
+    if end - start <= size:
+        return [(start, end)] if text[start:end].strip() else []
+    if level == len(_SEPARATORS):
+        return [(i, min(i + size, end)) for i in range(start, end, size)]
+
+    spans: List[Tuple[int, int]] = []
+    # Span of the chunk being packed, negative if there is none.
+    chunk_start = chunk_end = -1
+    for part_start, part_end in _parts(text, start, end, _SEPARATORS[level]):
+        if chunk_start >= 0 and part_end - chunk_start <= size:
+            chunk_end = part_end
+            continue
+
+        if chunk_start >= 0:
+            spans.append((chunk_start, chunk_end))
+        if part_end - part_start > size:
+            spans.extend(_split(text, part_start, part_end, size, level + 1))
+            chunk_start = -1
+        else:
+            chunk_start, chunk_end = part_start, part_end
+
+    if chunk_start >= 0:
+        spans.append((chunk_start, chunk_end))
+    return spans
+
+
+def split_text(
+    text: str, size: int = DEFAULT_CHUNK_SIZE
+) -> List[Tuple[int, int]]:
+    """Split text into chunks at paragraph boundaries.
+
+    Consecutive paragraphs are packed into chunks of at most ``size``
+    characters. Paragraphs which do not fit into a chunk on their own are
+    split at line boundaries, then at spaces and then anywhere.
+
+    Args:
+        text (str): Plain text, as returned by :func:`format_text`.
+        size (int, optional): Maximum size of a chunk in characters
+            (default is 4000).
+
+    Returns:
+        List[Tuple[int, int]]: Start and end offsets of the chunks.
+
+    Raises:
+        ValueError: If the size is not positive.
+    """
+    if size < 1:
+        raise ValueError("The size of chunks must be positive.")
+    return _split(text, 0, len(text), size, 0)
+
+
+def _filter_chunks(file_path: str, keep: Callable[[str], bool]) -> int:
+    """Rewrite an NDJSON file of chunks with the chunks of some pages.
+
+    The file is rewritten one record at a time and renamed over the
+    original, so that it is never left half written. A last record cut off
+    by an interrupted run is dropped as well.
+    """
+    if not os.path.exists(file_path):
+        return 0
+
+    removed = 0
+    tmp_path = f"{file_path}.tmp"
+    with open(file_path, encoding="utf-8") as source, open(
+        tmp_path, "w", encoding="utf-8"
+    ) as target:
+        for line in source:
+            if line.endswith("\n") and keep(json.loads(line)["page_id"]):
+                target.write(line)
+            else:
+                removed += 1
+    os.replace(tmp_path, file_path)
+
+    logger.debug(f"Removed {removed} chunks from {file_path}")
+    return removed
+
+
+def remove_chunks(file_path: str, page_ids: Collection[str]) -> int:
+    """Remove the chunks of pages from an NDJSON file.
+
+    Args:
+        file_path (str): Path of the NDJSON file.
+        page_ids (Collection[str]): IDs of the pages.
+
+    Returns:
+        int: Number of chunks removed, 0 if the file does not exist.
+    """
+    if not page_ids:
+        return 0
+    return _filter_chunks(file_path, lambda page_id: page_id not in page_ids)
+
+
+def keep_chunks(file_path: str, page_ids: Collection[str]) -> int:
+    """Remove the chunks of all pages but some from an NDJSON file.
+
+    Used when resuming an export, whose chunks of pages not completed yet
+    are written again.
+
+    Args:
+        file_path (str): Path of the NDJSON file.
+        page_ids (Collection[str]): IDs of the pages whose chunks are kept.
+
+    Returns:
+        int: Number of chunks removed, 0 if the file does not exist.
+    """
+    return _filter_chunks(file_path, lambda page_id: page_id in page_ids)
+
+
+class ChunkWriter:
+    """Writer of the chunks of pages to an NDJSON file.
+
+    Every record holds the ID, type, title and structured title of its page,
+    the index of the chunk, its text and its start and end offsets in the
+    plain text of the page. The writer is thread-safe.
+
+    Attributes:
+        file_path (str): Path of the NDJSON file.
+        size (int): Maximum size of a chunk in characters.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        size: int = DEFAULT_CHUNK_SIZE,
+        append: bool = False,
+        writer: Optional[FileWriter] = None,
+    ) -> None:
+        """Initialize the ChunkWriter and open its file.
+
+        Args:
+            file_path (str): Path of the NDJSON file.
+            size (int, optional): Maximum size of a chunk in characters
+                (default is 4000).
+            append (bool, optional): Whether to append to an existing file,
+                e.g. when resuming an export (default is False).
+            writer (Optional[FileWriter], optional): Writer flushing the
+                file once closed according to its durability (default is
+                None).
+        """
+        self.file_path = file_path
+        self.size = size
+        self._writer = writer
+        self._lock = threading.Lock()
+        self._file = open(  # pylint: disable=consider-using-with
+            file_path, "a" if append else "w", encoding="utf-8"
+        )
+
+    def chunk(
+        self, rendered: Tuple[Dict[str, Any], List[Tuple[str, str]]]
+    ) -> Tuple[Dict[str, Any], List[Tuple[str, str]]]:
+        """Write the chunks of a rendered page.
+
+        The plain text rendered for the ``txt`` format is reused, if it was
+        requested.
+
+        Args:
+            rendered (tuple): The page and the extensions and contents of
+                its files.
+
+        Returns:
+            tuple: The rendered page, unchanged.
+        """
+        page, files = rendered
+        with metrics.stage("chunk"):
+            text = rendered_text(page, files)
+            lines = "".join(
+                json.dumps(record, ensure_ascii=False) + "\n"
+                for record in self.records(page, text)
+            )
+
+        with self._lock:
+            self._file.write(lines)
+        return rendered
+
+    def records(
+        self, page: Dict[str, Any], text: str
+    ) -> Iterator[Dict[str, Any]]:
+        """Split the plain text of a page into records.
+
+        Args:
+            page (dict): Confluence page.
+            text (str): Plain text of the page.
+
+        Yields:
+            dict: The records of the chunks of the page.
+        """
+        structured_title = get_structured_title(page)
+        for index, (start, end) in enumerate(split_text(text, self.size)):
+            metrics.increment("chunks")
+            yield {
+                "page_id": page["id"],
+                "type": page.get("type", "page"),
+                "title": page["title"],
+                "path": structured_title,
+                "chunk": index,
+                "start": start,
+                "end": end,
+                "text": text[start:end],
+            }
+
+    def flush(self) -> None:
+        """Flush the chunks written so far to disk.
+
+        Called before the pages are counted as completed, as their chunks
+        are not written again on resume.
+        """
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """Close the file."""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.close()
+        if self._writer is not None:
+            self._writer.written(self.file_path)
+        logger.info(f"Chunks saved to {self.file_path}")
+
+    def __enter__(self) -> "ChunkWriter":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
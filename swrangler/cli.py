@@ -15,13 +15,7 @@
 
 """The CLI entry point. Invoke as `swrangler' or `python -m swrangler'."""
 
-import logging
-import signal
-
-import click
-
 from swrangler.env_loader import EnvLoader
-from swrangler.exceptions import Error
 
 
 def main() -> int:
@@ -34,23 +28,6 @@ def main() -> int:
     # subsequent imports and operations have access to these variables.
     EnvLoader.load_env_variables()
 
-    try:
-        from .commands import app
-
-        # pylint: disable=no-value-for-parameter
-        retval = app(standalone_mode=False)
-    except click.exceptions.Abort:  # The user hit control-C
-        message = "Received keyboard interrupt, terminating."
-        logging.getLogger("swrangler").error(message)
-        # Control-C is fatal error signal 2, for more see
-        # https://tldp.org/LDP/abs/html/exitcodes.html
-        retval = 128 + signal.SIGINT
-    except click.exceptions.ClickException as click_err:  # Handle click errors
-        message = click_err.format_message()
-        logging.getLogger("swrangler").error(message)
-        retval = click_err.exit_code
-    except Error as err:  # Handle custom application errors
-        logging.getLogger("swrangler").error(str(err))
-        retval = 1
+    from .commands import run
 
-    return retval
+    return run()
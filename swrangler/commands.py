@@ -15,13 +15,30 @@
 
 """CLI commands for the swrangler application."""
 
-from typing import Any, Optional
+import logging
+import os
+import signal
+from typing import Any, List, Optional
 
 import click
 
 from swrangler import __copyright__, __description__, __version__
+from swrangler.bench import COMMANDS
+from swrangler.exceptions import Error
 from swrangler.logger import setup_logger
 
+# Commands which may be submitted to a server. Others would wait for the
+# server itself, like submit, or are not about Confluence data.
+JOB_COMMANDS = frozenset(
+    (
+        "spaces-metadata",
+        "export-space",
+        "search",
+        "pages-metadata",
+        "owners-metadata",
+    )
+)
+
 CONTEXT_SETTINGS = {
     "show_default": True,
     "help_option_names": ["-h", "--help"],
@@ -52,11 +69,12 @@ class CommaSeparatedList(click.ParamType):
             return value
 
         if value is None or str(value).strip() == "":
+            hint = param.opts[-1] if param is not None else "--space-key"
             raise click.BadParameter(
-                message="Option '--space-key' requires an argument.",
+                message=f"Option '{hint}' requires an argument.",
                 ctx=ctx,
                 param=param,
-                param_hint="--space-key",
+                param_hint=hint,
             )
 
         return value.split(",")
@@ -65,13 +83,53 @@ class CommaSeparatedList(click.ParamType):
 class ExportCommand(click.core.Command):
     """A custom command class for export-like commands.
 
-    This class adds additional options for specifying the output directory
-    and the Confluence space key.
+    This class adds additional options for specifying the output directory,
+    the Confluence space key, the memory limit for fetched pages, resuming
+    of interrupted runs and the REST API version used to fetch pages.
     """
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
 
+        self.params.insert(
+            0,
+            click.core.Option(
+                ("--api",),
+                help=(
+                    "Version of the Confluence REST API used to fetch pages. "
+                    "The v2 API pages with cursors and returns more pages "
+                    "per request."
+                ),
+                type=click.Choice(["v1", "v2"]),
+                default="v1",
+            ),
+        )
+
+        self.params.insert(
+            0,
+            click.core.Option(
+                ("--spill-threshold",),
+                help=(
+                    "Number of pages kept in memory before spilling them "
+                    "to a temporary file. Use 0 to never spill."
+                ),
+                type=click.IntRange(min=0),
+                default=0,
+            ),
+        )
+
+        self.params.insert(
+            0,
+            click.core.Option(
+                ("--resume",),
+                help=(
+                    "Continue from the checkpoint left by an interrupted "
+                    "run instead of starting from scratch."
+                ),
+                is_flag=True,
+            ),
+        )
+
         self.params.insert(
             0,
             click.core.Option(
@@ -138,14 +196,36 @@ def get_version_str() -> str:
     help="Synonym for --quiet.",
     is_flag=True,
 )
+@click.option(
+    "--metrics-file",
+    help="File to save the timings and counters of the command as JSON.",
+    type=click.Path(dir_okay=False),
+)
+@click.option(
+    "--prometheus-file",
+    help=(
+        "File to save the timings and counters of the command in the "
+        "Prometheus textfile format."
+    ),
+    type=click.Path(dir_okay=False),
+)
 @click.pass_context
-def app(ctx: click.core.Context, quiet: bool, silent: bool) -> int:
+def app(
+    ctx: click.core.Context,
+    quiet: bool,
+    silent: bool,
+    metrics_file: Optional[str],
+    prometheus_file: Optional[str],
+) -> int:
     """The main CLI application entry point.
 
     Args:
         ctx (click.core.Context): The Click context object.
         quiet (bool): Flag to suppress all output except warnings and errors.
         silent (bool): Synonym for `quiet`.
+        metrics_file (Optional[str]): File to save the metrics as JSON.
+        prometheus_file (Optional[str]): File to save the metrics in the
+            Prometheus textfile format.
 
     Returns:
         int: An exit code
@@ -155,6 +235,11 @@ def app(ctx: click.core.Context, quiet: bool, silent: bool) -> int:
     if ctx.invoked_subcommand is None:
         click.echo(ctx.get_help())
         return 1
+
+    from .metrics import emit
+
+    # Emitted when the command finishes, whether it succeeds or fails.
+    ctx.call_on_close(lambda: emit(metrics_file, prometheus_file))
     return 0
 
 
@@ -170,11 +255,36 @@ def app(ctx: click.core.Context, quiet: bool, silent: bool) -> int:
     type=click.Path(),
     default="output",
 )
-def spaces_metadata(**kwargs: str) -> None:
+@click.option(
+    "--enrich",
+    help="Add page counts, last activity and owners of spaces.",
+    is_flag=True,
+)
+@click.option(
+    "-j",
+    "--jobs",
+    help="Maximum number of concurrent requests used to enrich spaces.",
+    type=click.IntRange(min=1),
+    default=8,
+)
+@click.option(
+    "--metadata-db",
+    help=(
+        "SQLite file to upsert the metadata into as well, shared across "
+        "spaces and runs."
+    ),
+    type=click.Path(dir_okay=False),
+)
+def spaces_metadata(**kwargs: Any) -> None:
     """Export metadata of all spaces."""
     from .space_metadata import export_spaces_metadata
 
-    export_spaces_metadata(kwargs["output_dir"])
+    export_spaces_metadata(
+        kwargs["output_dir"],
+        enrich=kwargs["enrich"],
+        jobs=kwargs["jobs"],
+        metadata_db=kwargs["metadata_db"],
+    )
 
 
 @app.command(
@@ -183,12 +293,231 @@ def spaces_metadata(**kwargs: str) -> None:
     help="Export all pages from the specified Confluence space.",
     cls=ExportCommand,
 )
-def export_space_command(**kwargs: str) -> None:
+@click.option(
+    "--blog-posts",
+    help="Export blog posts as well.",
+    is_flag=True,
+)
+@click.option(
+    "--attachments",
+    help="Download the attachments of pages and blog posts.",
+    is_flag=True,
+)
+@click.option(
+    "-j",
+    "--jobs",
+    help="Maximum number of concurrent attachment downloads.",
+    type=click.IntRange(min=1),
+    default=4,
+)
+@click.option(
+    "--dedup",
+    help=(
+        "Store identical files once and export hard links to them. "
+        "The store is shared by all spaces in the output directory."
+    ),
+    is_flag=True,
+)
+@click.option(
+    "--render-jobs",
+    help="Number of threads rendering pages while they are being fetched.",
+    type=click.IntRange(min=1),
+    default=1,
+)
+@click.option(
+    "--write-jobs",
+    help="Number of threads writing the files of rendered pages.",
+    type=click.IntRange(min=1),
+    default=2,
+)
+@click.option(
+    "--durability",
+    help=(
+        "When to flush exported files to disk: never, leaving it to the "
+        "operating system (none), in batches (batch) or every file (full)."
+    ),
+    type=click.Choice(["none", "batch", "full"]),
+    default="none",
+)
+@click.option(
+    "--atomic-writes",
+    help=(
+        "Write files to temporary files renamed over the targets, so that "
+        "no partially written file is ever visible. Implied by --durability "
+        "batch and full."
+    ),
+    is_flag=True,
+)
+@click.option(
+    "--formats",
+    help=(
+        "Formats to export pages in. Separate multiple formats with commas. "
+        "Available formats: html, json, md, txt."
+    ),
+    type=CommaSeparatedList(),
+    default="html,json,txt",
+)
+@click.option(
+    "--chunks",
+    help=(
+        "Write the plain text of pages split into chunks to "
+        "chunks.ndjson in the space directory, e.g. for search or "
+        "embedding."
+    ),
+    is_flag=True,
+)
+@click.option(
+    "--chunk-size",
+    help="Maximum size of a chunk in characters.",
+    type=click.IntRange(min=1),
+    default=4000,
+)
+@click.option(
+    "--search-index",
+    help=(
+        "Index pages in the full-text search index of the output "
+        "directory, searched with swrangler search."
+    ),
+    is_flag=True,
+)
+@click.option(
+    "--sync",
+    help=(
+        "Only fetch the content changed since the last sync of a space "
+        "and apply the changes to its export, the chunks, the search "
+        "index and the page metadata. The first sync exports everything."
+    ),
+    is_flag=True,
+)
+@click.option(
+    "--metadata-db",
+    help="SQLite file of metadata to apply the changes of pages to as well.",
+    type=click.Path(dir_okay=False),
+)
+def export_space_command(**kwargs: Any) -> None:
     """Export all pages from the specified space."""
-    from .space_exporter import export_space
+    from .renderers import get_renderers
+    from .space_exporter import ExportOptions, export_space
+    from .sync import sync_space
+
+    try:
+        get_renderers(kwargs["formats"])
+    except Error as exc:
+        raise click.BadParameter(
+            str(exc), param_hint="--formats"
+        ) from exc
+
+    conflicts = ("resume", "attachments") if kwargs["sync"] else ()
+    for name in conflicts:
+        if kwargs[name]:
+            raise click.BadParameter(
+                "Cannot be used with --sync.", param_hint=f"--{name}"
+            )
+    # Changes are found with CQL searches, which only the v1 API offers.
+    if kwargs["sync"] and kwargs["api"] != "v1":
+        raise click.BadParameter(
+            "Only v1 can be used with --sync.", param_hint="--api"
+        )
+    if kwargs["metadata_db"] and not kwargs["sync"]:
+        raise click.BadParameter(
+            "Only used with --sync.", param_hint="--metadata-db"
+        )
 
+    options = ExportOptions(
+        blog_posts=kwargs["blog_posts"],
+        attachments=kwargs["attachments"],
+        jobs=kwargs["jobs"],
+        dedup=kwargs["dedup"],
+        render_jobs=kwargs["render_jobs"],
+        write_jobs=kwargs["write_jobs"],
+        durability=kwargs["durability"],
+        atomic_writes=kwargs["atomic_writes"],
+        formats=tuple(kwargs["formats"]),
+        chunks=kwargs["chunks"],
+        chunk_size=kwargs["chunk_size"],
+        search_index=kwargs["search_index"],
+    )
     for space_key in kwargs["space_key"]:
-        export_space(space_key, kwargs["output_dir"])
+        if kwargs["sync"]:
+            sync_space(
+                space_key,
+                kwargs["output_dir"],
+                options,
+                spill_threshold=kwargs["spill_threshold"],
+                metadata_db=kwargs["metadata_db"],
+            )
+        else:
+            export_space(
+                space_key,
+                kwargs["output_dir"],
+                spill_threshold=kwargs["spill_threshold"],
+                resume=kwargs["resume"],
+                api=kwargs["api"],
+                options=options,
+            )
+
+
+@app.command(
+    "search",
+    short_help="Search pages exported with --search-index.",
+    help=(
+        "Search the pages exported with export-space --search-index. "
+        "QUERY uses the SQLite FTS5 syntax, e.g. 'deploy AND kubernetes', "
+        "'\"release notes\"' or 'title:onboarding'."
+    ),
+)
+@click.argument("query")
+@click.option(
+    "-o",
+    "--output-dir",
+    help="Directory the pages were exported to.",
+    type=click.Path(file_okay=False),
+    default="output",
+)
+@click.option(
+    "-s",
+    "--space-key",
+    help=(
+        "Confluence space key(s) to search in. "
+        "Separate multiple keys with commas."
+    ),
+    type=CommaSeparatedList(),
+)
+@click.option(
+    "-n",
+    "--limit",
+    help="Maximum number of results.",
+    type=click.IntRange(min=1),
+    default=20,
+)
+def search_command(**kwargs: Any) -> None:
+    """Search pages exported with --search-index."""
+    from .search_index import SEARCH_INDEX_FILE, SearchIndex
+
+    db_path = os.path.join(kwargs["output_dir"], SEARCH_INDEX_FILE)
+    if not os.path.exists(db_path):
+        raise Error(
+            f"No search index found at {db_path}, "
+            "export spaces with --search-index first"
+        )
+
+    bold = click.style("", bold=True, reset=False)
+    with SearchIndex(db_path) as index:
+        results = index.search(
+            kwargs["query"],
+            kwargs["limit"],
+            kwargs["space_key"],
+            highlight=(bold, click.style("", reset=True)),
+        )
+
+    for result in results:
+        click.echo(
+            f"{click.style(result['path'], bold=True)} "
+            f"({result['space_key']}, {result['type']} {result['page_id']})"
+        )
+        click.echo(f"    {' '.join(result['snippet'].split())}")
+    if not results:
+        logging.getLogger("swrangler").info("No pages found")
 
 
 @app.command(
@@ -197,12 +526,90 @@ def export_space_command(**kwargs: str) -> None:
     help="Export metadata of pages from the specified Confluence space.",
     cls=ExportCommand,
 )
-def pages_metadata(**kwargs: str) -> None:
+@click.option(
+    "--analytics-deadline",
+    help=(
+        "Time budget for fetching analytics of a space, in seconds. "
+        "Counts not fetched in time are left empty."
+    ),
+    type=click.FloatRange(min=0, min_open=True),
+)
+@click.option(
+    "--analytics-error-ratio",
+    help=(
+        "Ratio of failed analytics requests after which requests are "
+        "stopped for a while instead of being retried."
+    ),
+    type=click.FloatRange(min=0, max=1, min_open=True),
+    default=0.5,
+)
+@click.option(
+    "--analytics-cache",
+    help="File caching analytics counts across runs. Default is no cache.",
+    type=click.Path(dir_okay=False),
+)
+@click.option(
+    "--analytics-ttl",
+    help=(
+        "Number of seconds a cached analytics count is used before it is "
+        "fetched again. Use 0 to disable the cache."
+    ),
+    type=click.FloatRange(min=0),
+    default=86400,
+)
+@click.option(
+    "--analytics-cache-size",
+    help="Maximum number of analytics counts kept in the cache.",
+    type=click.IntRange(min=1),
+    default=1_000_000,
+)
+@click.option(
+    "--analytics-top",
+    help=(
+        "Fetch analytics only for this number of most recently updated "
+        "pages, and for a sample of the others with --analytics-sample."
+    ),
+    type=click.IntRange(min=0),
+)
+@click.option(
+    "--analytics-sample",
+    help=(
+        "Fraction of pages, besides those selected by --analytics-top, "
+        "to fetch analytics for."
+    ),
+    type=click.FloatRange(min=0, max=1),
+)
+@click.option(
+    "--metadata-db",
+    help=(
+        "SQLite file to upsert the metadata into as well, shared across "
+        "spaces and runs."
+    ),
+    type=click.Path(dir_okay=False),
+)
+def pages_metadata(**kwargs: Any) -> None:
     """Export metadata of pages from the specified space."""
-    from .page_metadata import export_pages_metadata
-
+    from .page_metadata import AnalyticsOptions, export_pages_metadata
+
+    analytics = AnalyticsOptions(
+        deadline=kwargs["analytics_deadline"],
+        error_ratio=kwargs["analytics_error_ratio"],
+        cache_path=kwargs["analytics_cache"],
+        cache_ttl=kwargs["analytics_ttl"],
+        cache_size=kwargs["analytics_cache_size"],
+        top=kwargs["analytics_top"],
+        sample=kwargs["analytics_sample"],
+    )
     for space_key in kwargs["space_key"]:
-        export_pages_metadata(space_key, kwargs["output_dir"])
+        export_pages_metadata(
+            space_key,
+            kwargs["output_dir"],
+            spill_threshold=kwargs["spill_threshold"],
+            resume=kwargs["resume"],
+            analytics=analytics,
+            api=kwargs["api"],
+            metadata_db=kwargs["metadata_db"],
+        )
 
 
 @app.command(
@@ -211,9 +618,222 @@ def pages_metadata(**kwargs: str) -> None:
     help="Export metadata of page owners from the specified Confluence space.",
     cls=ExportCommand,
 )
-def owners_metadata(**kwargs: str) -> None:
+@click.option(
+    "--metadata-db",
+    help=(
+        "SQLite file to upsert the metadata into as well, shared across "
+        "spaces and runs."
+    ),
+    type=click.Path(dir_okay=False),
+)
+def owners_metadata(**kwargs: Any) -> None:
     """Export metadata of owners from the specified space."""
     from .owner_metadata import export_owners_metadata
 
     for space_key in kwargs["space_key"]:
-        export_owners_metadata(space_key, kwargs["output_dir"])
+        export_owners_metadata(
+            space_key,
+            kwargs["output_dir"],
+            spill_threshold=kwargs["spill_threshold"],
+            resume=kwargs["resume"],
+            api=kwargs["api"],
+            metadata_db=kwargs["metadata_db"],
+        )
+
+
+@app.command(
+    "bench",
+    short_help="Benchmark commands against a local fake Confluence.",
+    help=(
+        "Benchmark commands end to end against a local fake Confluence "
+        "server serving synthetic spaces."
+    ),
+)
+@click.option(
+    "-c",
+    "--command",
+    "commands",
+    help="Command to benchmark. Repeat to benchmark several commands.",
+    type=click.Choice(COMMANDS),
+    multiple=True,
+    default=COMMANDS,
+)
+@click.option(
+    "--spaces",
+    help="Number of synthetic spaces.",
+    type=click.IntRange(min=1),
+    default=1,
+)
+@click.option(
+    "--pages",
+    help="Number of pages in every synthetic space.",
+    type=click.IntRange(min=0),
+    default=1000,
+)
+@click.option(
+    "--body-size",
+    help="Approximate size of a page body in characters.",
+    type=click.IntRange(min=0),
+    default=2000,
+)
+@click.option(
+    "--latency",
+    help="Delay added to every response, in milliseconds.",
+    type=click.IntRange(min=0),
+    default=0,
+)
+@click.option(
+    "--error-rate",
+    help="Probability of answering a request with a server error (500).",
+    type=click.FloatRange(min=0, max=1),
+    default=0.0,
+)
+@click.option(
+    "--rate-limit-rate",
+    help="Probability of answering a request with a rate limit error (429).",
+    type=click.FloatRange(min=0, max=1),
+    default=0.0,
+)
+@click.option(
+    "--retry-after",
+    help="Retry-After header sent with rate limit errors, in seconds.",
+    type=click.IntRange(min=0),
+    default=1,
+)
+@click.option(
+    "--api",
+    "apis",
+    help=(
+        "REST API version used to fetch pages. Repeat to compare several "
+        "versions."
+    ),
+    type=click.Choice(["v1", "v2"]),
+    multiple=True,
+    default=["v1"],
+)
+@click.option(
+    "--output-file",
+    help="File to save the benchmark results as JSON.",
+    type=click.Path(dir_okay=False),
+)
+def bench(**kwargs: Any) -> None:
+    """Benchmark commands against a local fake Confluence."""
+    from .bench import report, run_benchmark
+    from .fake_server import FakeServerOptions
+
+    options = FakeServerOptions(
+        spaces=kwargs["spaces"],
+        pages=kwargs["pages"],
+        body_size=kwargs["body_size"],
+        latency=kwargs["latency"],
+        error_rate=kwargs["error_rate"],
+        rate_limit_rate=kwargs["rate_limit_rate"],
+        retry_after=kwargs["retry_after"],
+    )
+    results = run_benchmark(kwargs["commands"], options, apis=kwargs["apis"])
+    report(results, options, kwargs["output_file"])
+
+
+@app.command(
+    "serve",
+    short_help="Run commands submitted with swrangler submit.",
+    help=(
+        "Run a server which runs the commands submitted with swrangler "
+        "submit one after another, keeping connections to Confluence open "
+        "between them. Commands use the credentials of the server."
+    ),
+)
+@click.option(
+    "--socket",
+    "socket_path",
+    help=(
+        "Unix socket to listen on "
+        "[default: $XDG_RUNTIME_DIR/swrangler.sock]."
+    ),
+    type=click.Path(dir_okay=False),
+)
+def serve_command(**kwargs: Any) -> None:
+    """Run commands submitted with swrangler submit."""
+    from .server import default_socket_path, serve
+
+    serve(kwargs["socket_path"] or default_socket_path(), run, check_job)
+
+
+@app.command(
+    "submit",
+    short_help="Run a command in a running swrangler server.",
+    help=(
+        "Run a command in a running swrangler server and print its output. "
+        "Takes the same arguments as swrangler itself, e.g. "
+        "swrangler submit export-space --space-key KEY."
+    ),
+    context_settings={
+        "ignore_unknown_options": True,
+        "allow_interspersed_args": False,
+    },
+)
+@click.option(
+    "--socket",
+    "socket_path",
+    help=(
+        "Unix socket of the server "
+        "[default: $XDG_RUNTIME_DIR/swrangler.sock]."
+    ),
+    type=click.Path(dir_okay=False),
+)
+@click.argument("args", nargs=-1, type=click.UNPROCESSED, required=True)
+def submit_command(**kwargs: Any) -> int:
+    """Run a command in a running swrangler server."""
+    from .server import default_socket_path, submit
+
+    return submit(
+        list(kwargs["args"]), kwargs["socket_path"] or default_socket_path()
+    )
+
+
+def check_job(args: List[str]) -> None:
+    """Check that a command may be run by a server.
+
+    Unknown commands are left to fail when they run.
+
+    Args:
+        args (List[str]): Command line arguments of the command.
+
+    Raises:
+        Error: If the command must not be run by a server, e.g. submit,
+            which would wait for the server running it.
+    """
+    ctx = click.Context(app, resilient_parsing=True)
+    _, rest, _ = app.make_parser(ctx).parse_args(list(args))
+    if rest and rest[0] in app.commands and rest[0] not in JOB_COMMANDS:
+        raise Error(f"Cannot run {rest[0]} in a server")
+
+
+def run(args: Optional[List[str]] = None) -> int:
+    """Run a swrangler command.
+
+    Args:
+        args (Optional[List[str]], optional): Command line arguments
+            (default is None, the arguments of the process).
+
+    Returns:
+        int: An exit code
+    """
+    try:
+        # pylint: disable=no-value-for-parameter
+        retval = app(args=args, standalone_mode=False)
+    except click.exceptions.Abort:  # The user hit control-C
+        message = "Received keyboard interrupt, terminating."
+        logging.getLogger("swrangler").error(message)
+        # Control-C is fatal error signal 2, for more see
+        # https://tldp.org/LDP/abs/html/exitcodes.html
+        retval = 128 + signal.SIGINT
+    except click.exceptions.ClickException as click_err:  # Handle click errors
+        message = click_err.format_message()
+        logging.getLogger("swrangler").error(message)
+        retval = click_err.exit_code
+    except Error as err:  # Handle custom application errors
+        logging.getLogger("swrangler").error(str(err))
+        retval = 1
+
+    return retval
@@ -26,8 +26,6 @@ from datetime import datetime
 from functools import reduce
 from typing import Any, Dict, List, Optional
 
-from bs4 import BeautifulSoup
-
 logger = logging.getLogger("swrangler")
 
 
@@ -160,6 +158,9 @@ def format_text(html_content: str) -> str:
     Returns:
         str: Formatted plain text.
     """
+    # Imported here, as only exports of page bodies need it.
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html_content, "html.parser")
 
     # Remove all <ac:parameter> tags
@@ -22,10 +22,21 @@ handling authentication and HTTP requests.
 import logging
 import multiprocessing
 import os
-import random
+import threading
 import time
-from dataclasses import dataclass
-from typing import Any, Dict, Generator, List, Optional, Tuple
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import islice
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 from urllib.parse import parse_qs, urlparse
 
 import requests
@@ -33,32 +44,43 @@ from atlassian import Confluence as Client
 from atlassian.errors import ApiError
 from requests.auth import HTTPBasicAuth
 
+from swrangler.checkpoint import Checkpoint
 from swrangler.common import path
-from swrangler.exceptions import ConfigurationError, Error
+from swrangler.confluence_v2 import MAX_LIMIT, PagesV2, add_ancestors
+from swrangler.exceptions import CircuitOpenError, ConfigurationError, Error
+from swrangler.metrics import metrics, record_response
+from swrangler.page_store import PageStore
+from swrangler.retry import (
+    Backoff,
+    CircuitBreaker,
+    CircuitBreakerOptions,
+    DefaultRetryOptions,
+    call_with_retry,
+)
 
 logger = logging.getLogger("swrangler")
 
+# HTTP sessions shared by the clients of a long-lived process keyed by the
+# site and the user, None unless enabled by keep_sessions().
+_SESSIONS: Optional[Dict[Tuple[str, str], requests.Session]] = None
 
-@dataclass(frozen=True)
-class DefaultRetryOptions:
-    """Default configuration options for retry logic in API requests.
 
-    Attributes:
-        max_retries (int): The maximum number of retry attempts. Default is 4.
-        last_retry_delay (int): The delay before the last retry attempt, in
-            milliseconds. Default is 5000 ms.
-        max_retry_delay (int): The maximum delay between retry attempts, in
-            milliseconds. Default is 30000 ms.
-        jitter_multiplier_range (Tuple[float, float]): A tuple specifying the
-            range for jitter multiplier. The first element is the minimum
-            multiplier, and the second element is the maximum multiplier.
-            Default is (0.7, 1.3).
-    """
+# Summaries of spaces keyed by the site and the space key, with the time
+# they were looked up, shared by all clients of the process.
+_SPACE_SUMMARIES: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+_SPACE_SUMMARIES_LOCK = threading.Lock()
 
-    max_retries: int = 4
-    last_retry_delay: int = 5000
-    max_retry_delay: int = 30000
-    jitter_multiplier_range: Tuple[float, float] = (0.7, 1.3)
+
+def keep_sessions() -> None:
+    """Share HTTP sessions between all clients created from now on.
+
+    Long-lived processes, such as ``swrangler serve``, create a client for
+    every command they run. Sharing the sessions keeps the connections to
+    Confluence open from one command to the next.
+    """
+    global _SESSIONS  # pylint: disable=global-statement
+    if _SESSIONS is None:
+        _SESSIONS = {}
 
 
 @dataclass
@@ -76,6 +98,8 @@ class ProcessContext:
         timeout (int): The timeout for HTTP requests in seconds.
         retry_options (DefaultRetryOptions): Configuration options for
             retry logic.
+        breaker_options (CircuitBreakerOptions): Configuration options for
+            the circuit breaker of the analytics endpoints.
     """
 
     base_url: str
@@ -83,19 +107,198 @@ class ProcessContext:
     auth: HTTPBasicAuth
     timeout: int
     retry_options: DefaultRetryOptions
+    breaker_options: CircuitBreakerOptions = field(
+        default_factory=CircuitBreakerOptions
+    )
+
+
+class AnalyticsClient:
+    """Client for the Confluence analytics endpoints.
+
+    The client is built from a small picklable :class:`ProcessContext`, so
+    worker processes can create their own instance, with its own HTTP
+    session and circuit breaker, without receiving the whole
+    :class:`Confluence` client.
+
+    Attributes:
+        context (ProcessContext): Configuration of the client.
+        session (requests.Session): HTTP session reusing connections
+            between requests.
+        breaker (CircuitBreaker): Circuit breaker of the analytics
+            endpoints.
+        available (Optional[bool]): Whether the site serves page
+            analytics, None until probed.
+    """
+
+    # Status codes meaning that the site does not serve page analytics.
+    UNAVAILABLE_STATUS_CODES = frozenset((501,))
+
+    # Status codes meaning either that a page has no analytics, e.g. as it
+    # was deleted or is restricted, or that the site does not serve them.
+    MISSING_STATUS_CODES = frozenset((401, 403, 404))
+
+    # Number of pages probed before analytics are deemed unavailable.
+    PROBE_SIZE = 3
+
+    def __init__(self, context: ProcessContext) -> None:
+        """Initialize the AnalyticsClient.
+
+        Args:
+            context (ProcessContext): Configuration of the client.
+        """
+        self.context = context
+        self.session = requests.Session()
+        self.session.auth = context.auth
+        self.session.headers.update(context.headers)
+        self.breaker = CircuitBreaker("analytics", context.breaker_options)
+        self.available: Optional[bool] = None
+
+    def _url(self, content_id: str, views_type: str) -> str:
+        """Get the URL of the analytics of a page."""
+        return (
+            f"{self.context.base_url}"
+            f"/rest/api/analytics/content/{content_id}/{views_type}"
+        )
+
+    def _get_count(self, content_id: str, views_type: str) -> int:
+        """Request the number of views of a page once."""
+        with metrics.stage("analytics"):
+            response = self.session.get(
+                self._url(content_id, views_type), timeout=self.context.timeout
+            )
+        record_response(response)
+        response.raise_for_status()
+        return response.json()["count"]
+
+    def probe(
+        self, content_ids: List[str], views_type: str
+    ) -> Dict[str, Optional[int]]:
+        """Check whether the site serves page analytics.
+
+        Analytics are not available on every site, e.g. they depend on the
+        Confluence plan. Without this check every page would cost a failed
+        request. Only the first call makes requests, its result is
+        remembered in :attr:`available`.
+
+        A single missing page is not enough to tell the site has no
+        analytics, so up to :attr:`PROBE_SIZE` pages are requested until
+        one of them answers.
+
+        Args:
+            content_ids (List[str]): IDs of existing Confluence pages.
+            views_type (str): The type of analytics (viewers or views).
+
+        Returns:
+            dict: Counts of the probed pages keyed by page ID, None for
+                pages without analytics. Pages which failed otherwise are
+                left to the requests of the pages.
+        """
+        if self.available is not None:
+            return {}
+
+        counts: Dict[str, Optional[int]] = {}
+        self.available = True
+        for content_id in content_ids[: self.PROBE_SIZE]:
+            try:
+                counts[content_id] = call_with_retry(
+                    partial(self._get_count, content_id, views_type),
+                    self.context.retry_options,
+                    f"analytics probe of {content_id}",
+                )
+                return counts
+            except requests.HTTPError as exc:
+                status_code = (
+                    exc.response.status_code
+                    if exc.response is not None
+                    else None
+                )
+                if status_code in self.UNAVAILABLE_STATUS_CODES:
+                    self.available = False
+                    return {}
+                if status_code not in self.MISSING_STATUS_CODES:
+                    return counts
+                counts[content_id] = None
+            except requests.RequestException:
+                return counts
+
+        self.available = False
+        return {}
+
+    def fetch_page_views(
+        self,
+        content_id: str,
+        views_type: str,
+        deadline: Optional[float] = None,
+    ) -> Tuple[str, Optional[int]]:
+        """Fetch the number of views for the specified page.
+
+        Rate limits and transient failures are retried according to the
+        retry options of the client. Requests fail fast while the circuit
+        breaker of the analytics endpoints is open.
+
+        Args:
+            content_id (str): The ID of the Confluence page.
+            views_type (str): The type of analytics (viewers or views).
+            deadline (Optional[float], optional): Time, as returned by
+                ``time.time()``, after which no request is made (default is
+                None, no deadline).
+
+        Returns:
+            tuple: The page ID and the number of views, None if the number
+                could not be fetched.
+        """
+        if deadline is not None and time.time() >= deadline:
+            metrics.increment("deadline_skipped")
+            return content_id, None
+
+        try:
+            count = call_with_retry(
+                partial(self._get_count, content_id, views_type),
+                self.context.retry_options,
+                f"{views_type} of {content_id}",
+                breaker=self.breaker,
+                deadline=deadline,
+            )
+        except CircuitOpenError:
+            return content_id, None
+        except requests.RequestException as e:
+            message = f"Failed to fetch data for content ID {content_id}: {e}"
+            logger.error(message)
+            return content_id, None
+
+        return content_id, count
 
 
-class Confluence:
+class Confluence:  # pylint: disable=too-many-instance-attributes
     """Client for interacting with Confluence API.
 
     This client handles authentication and provides methods to perform
     various API requests to the Confluence server.
     """
 
+    # Number of pages whose analytics a worker fetches at a time.
+    ANALYTICS_BATCH_SIZE: int = 20
+
+    # REST API versions pages can be fetched with.
+    APIS: Tuple[str, ...] = ("v1", "v2")
+
+    # Size of the chunks attachments are downloaded in, in bytes.
+    DOWNLOAD_CHUNK_SIZE: int = 1 << 20
+
+    # Number of seconds a summary of a space is reused for.
+    SPACE_SUMMARY_TTL: float = 600.0
+
+    # Properties of pages and blog posts fetched with the v1 API.
+    CONTENT_EXPAND: str = (
+        "body.storage,ancestors,history.ownedBy,history.lastUpdated,version"
+    )
+
     def __init__(
         self,
         timeout: int = 75,
         retry_options: Optional[DefaultRetryOptions] = None,
+        breaker_options: Optional[CircuitBreakerOptions] = None,
+        api: str = "v1",
     ) -> None:
         """Initialize the Confluence with authentication and base URL.
 
@@ -104,11 +307,19 @@ class Confluence:
                (default is 10).
             retry_options (DefaultRetryOptions, optional): Retry options for
                 handling rate limits and server errors (default is None).
+            breaker_options (CircuitBreakerOptions, optional): Options of
+                the circuit breaker guarding the analytics endpoints
+                (default is None).
+            api (str, optional): REST API version used to fetch the pages
+                of spaces (default is v1).
 
         Raises:
             ValueError: If the Confluence API user or token is not set in
-                environment variables.
+                environment variables, or if the API version is unknown.
         """
+        if api not in self.APIS:
+            raise ValueError(f"api must be one of {', '.join(self.APIS)}.")
+
         user = os.getenv("CONFLUENCE_API_USER")
         token = os.getenv("CONFLUENCE_API_TOKEN")
         url = os.getenv("CONFLUENCE_DOMAIN")
@@ -116,13 +327,20 @@ class Confluence:
         if user is None or token is None or url is None:
             raise ConfigurationError(user, token, url)
 
+        session = None
+        if _SESSIONS is not None:
+            session = _SESSIONS.setdefault((url, user), requests.Session())
+
         self.client = Client(
             url=url,
             username=user,
             password=token,
             timeout=timeout,
             cloud=True,
+            session=session,
         )
+        if record_response not in self.client.session.hooks["response"]:
+            self.client.session.hooks["response"].append(record_response)
 
         # We use the following for requests that are not covered by
         # the atlassian library. These variables are used exclusively for
@@ -131,7 +349,24 @@ class Confluence:
         self.headers = {"Accept": "application/json"}
         self.timeout = timeout
         self.base_url = f"{url}/wiki"
-        self.retry_options = retry_options or DefaultRetryOptions()
+        self.retry_options = self._sanitise_retry_options(
+            retry_options or DefaultRetryOptions()
+        )
+
+        self.api = api
+        self.pages_v2 = PagesV2(
+            self.client.session, self.base_url, timeout, self.retry_options
+        )
+        self.analytics = AnalyticsClient(
+            ProcessContext(
+                base_url=self.base_url,
+                headers=self.headers,
+                auth=self.auth,
+                timeout=self.timeout,
+                retry_options=self.retry_options,
+                breaker_options=breaker_options or CircuitBreakerOptions(),
+            )
+        )
 
     def _sanitise_retry_options(
         self, retry_options: DefaultRetryOptions
@@ -139,6 +374,10 @@ class Confluence:
         min_jitter, max_jitter = retry_options.jitter_multiplier_range
         if max_jitter <= min_jitter:
             raise ValueError("jitter_multiplier_range must be (min, max).")
+        if retry_options.strategy not in Backoff.STRATEGIES:
+            raise ValueError(
+                f"strategy must be one of {', '.join(Backoff.STRATEGIES)}."
+            )
         return retry_options
 
     def _update_params_with_next(
@@ -161,55 +400,309 @@ class Confluence:
         """Check if there is a next page."""
         return "next" in data["_links"]
 
+    def _fetch_pages_v1(
+        self, space_key: str, params: Dict[str, Any]
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Fetch a batch of pages with the v1 API.
+
+        Returns:
+            tuple: Pages and the query parameters of the next batch, None
+                after the last one.
+        """
+        data = call_with_retry(
+            partial(self.client.get_space_content, space_key, **params),
+            self.retry_options,
+            f"pages of {space_key}",
+        )
+        if not self._has_next_page(data):
+            return data["results"], None
+
+        next_params = self._update_params_with_next(
+            path(data, "_links.next"), params, ["next"]
+        )
+        return data["results"], next_params
+
     def get_all_pages_in_space(
-        self, space_key: str, limit: int = 100
-    ) -> List[Dict[str, Any]]:
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        space_key: str,
+        limit: Optional[int] = None,
+        spill_threshold: int = 0,
+        checkpoint: Optional[Checkpoint] = None,
+        content_type: str = "page",
+        callback: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    ) -> PageStore:
         """Retrieve all pages for a given space key from Confluence.
 
+        With the v2 API pages are converted to the shape of the v1 API.
+        Their ancestors are only known once all pages are fetched, so the
+        callback is called at the end.
+
         Args:
             space_key (str): The key of the Confluence space.
-            limit (int, optional): Number of pages to retrieve per request
-               (default is 100).
+            limit (Optional[int], optional): Number of pages to retrieve per
+               request (default is None, 100 with the v1 API and 250 with
+               the v2 API).
+            spill_threshold (int, optional): Number of pages kept in memory
+               before spilling them to a temporary file (default is 0,
+               never spill).
+            checkpoint (Optional[Checkpoint], optional): Journal to record
+               fetched pages in. Pages already recorded by a previous run
+               are not fetched again (default is None).
+            content_type (str, optional): Type of the content to retrieve,
+               ``page`` or ``blogpost`` (default is page).
+            callback (Optional[Callable], optional): Function called with
+               every batch of pages as soon as it is available, including
+               pages recorded in the checkpoint (default is None).
 
         Returns:
-            list: List of pages in the specified Confluence space.
+            PageStore: List-like store of pages in the specified Confluence
+               space.
+
+        Raises:
+            Error: If the pages cannot be fetched.
         """
-        all_pages = []
+        all_pages = PageStore(spill_threshold)
+        if limit is None:
+            limit = MAX_LIMIT if self.api == "v2" else 100
         logger.info(
-            f"Fetch {space_key} space pages ({limit} pages per request)..."
+            f"Fetch {space_key} space {content_type}s with the {self.api} "
+            f"API ({limit} per request)..."
         )
 
-        expand = (
-            "body.storage,"
-            "ancestors,"
-            "history.ownedBy,"
-            "history.lastUpdated,"
-            "version"
-        )
-        params = {
+        fetch: Callable[
+            [Dict[str, Any]],
+            Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]],
+        ]
+        if self.api == "v2":
+            fetch = self.pages_v2.fetch
+        else:
+            fetch = partial(self._fetch_pages_v1, space_key)
+
+        # Pages of the v2 API get their ancestors once all of them are
+        # fetched, only then they are passed to the callback.
+        on_batch = callback if self.api == "v1" else None
+
+        try:
+            if checkpoint is not None and (
+                checkpoint.cursor is not None or checkpoint.pagination_done
+            ):
+                params = self._resume(
+                    space_key, checkpoint, all_pages, on_batch, limit
+                )
+            else:
+                params = self._first_params(space_key, limit, content_type)
+
+            while params is not None:
+                request = params
+                with metrics.stage("pagination"):
+                    results, params = fetch(params)
+
+                metrics.increment("pages_fetched", len(results))
+                all_pages.extend(results)
+                if checkpoint is not None:
+                    checkpoint.record_pages(results, params, request)
+                if on_batch is not None:
+                    on_batch(results)
+        except (ApiError, requests.RequestException) as exc:
+            raise Error(
+                f"Failed to fetch pages for {space_key}: {exc}"
+            ) from exc
+
+        if self.api == "v2":
+            all_pages = self._add_ancestors(all_pages, spill_threshold)
+            _in_batches(all_pages, limit, callback)
+        return all_pages
+
+    def _resume(
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        space_key: str,
+        checkpoint: Checkpoint,
+        pages: PageStore,
+        callback: Optional[Callable[[List[Dict[str, Any]]], None]],
+        limit: int,
+    ) -> Optional[Dict[str, Any]]:
+        """Load the pages recorded in a checkpoint.
+
+        Returns:
+            Optional[dict]: Parameters of the next request, None if all
+                pages have been fetched.
+        """
+        params = checkpoint.cursor
+        if params is not None and (("space_id" in params) != (self.api == "v2")):
+            raise Error(
+                f"The checkpoint of {space_key} was made with "
+                "another API version, run without --resume"
+            )
+
+        pages.extend(checkpoint.iter_pages())
+        _in_batches(checkpoint.iter_pages(), limit, callback)
+        return params
+
+    def _first_params(
+        self, space_key: str, limit: int, content_type: str
+    ) -> Dict[str, Any]:
+        """Get the query parameters of the first batch of pages."""
+        if self.api == "v2":
+            return self.pages_v2.first_cursor(space_key, limit, content_type)
+
+        return {
             "depth": "all",
             "start": 0,
             "limit": limit,
-            "expand": expand,
-            "content_type": "page",  # How about blogpost?
+            "expand": self.CONTENT_EXPAND,
+            "content_type": content_type,
         }
 
-        while True:
+    @staticmethod
+    def _add_ancestors(pages: PageStore, spill_threshold: int) -> PageStore:
+        """Add ancestors to the pages fetched with the v2 API."""
+        with pages, metrics.stage("ancestors"):
+            parents = {
+                page["id"]: (page["title"], page.get("parentId"))
+                for page in pages
+            }
+            resolved = PageStore(spill_threshold)
+            resolved.extend(add_ancestors(page, parents) for page in pages)
+        return resolved
+
+    def search_content(
+        self,
+        cql: str,
+        expand: Optional[str] = None,
+        limit: int = 100,
+        description: str = "content",
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Search content with a CQL query.
+
+        Args:
+            cql (str): The CQL query.
+            expand (Optional[str], optional): Properties of the content to
+               expand (default is None, only IDs, types and titles).
+            limit (int, optional): Number of results to retrieve per
+               request (default is 100).
+            description (str, optional): Description of the searched
+               content for logs and errors (default is content).
+
+        Yields:
+            list: Batches of matching content, as they are fetched.
+
+        Raises:
+            Error: If the content cannot be fetched.
+        """
+        query: Dict[str, Any] = {"cql": cql, "limit": limit}
+        if expand is not None:
+            query["expand"] = expand
+
+        params: Optional[Dict[str, Any]] = query
+
+        while params is not None:
             try:
-                data = self.client.get_space_content(space_key, **params)
-            except ApiError as exc:
-                raise Error(
-                    f"Failed to fetch pages for {space_key}: {exc}"
-                ) from exc
+                with metrics.stage("pagination"):
+                    data = call_with_retry(
+                        partial(
+                            self.client.get,
+                            "rest/api/content/search",
+                            params=params,
+                        ),
+                        self.retry_options,
+                        description,
+                    )
+            except (ApiError, requests.RequestException) as exc:
+                raise Error(f"Failed to fetch {description}: {exc}") from exc
 
-            all_pages.extend(data["results"])
-            if not self._has_next_page(data):
-                break
-            params = self._update_params_with_next(
-                path(data, "_links.next"), params, ["next"]
-            )
+            yield data["results"]
+            if self._has_next_page(data):
+                params = self._update_params_with_next(
+                    path(data, "_links.next"), params, ["next"]
+                )
+            else:
+                params = None
 
-        return all_pages
+    def get_all_attachments_in_space(
+        self, space_key: str, limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Retrieve the metadata of all attachments in a space.
+
+        A single CQL search lists the attachments of all pages and blog
+        posts of the space, instead of a request per page.
+
+        Args:
+            space_key (str): The key of the Confluence space.
+            limit (int, optional): Number of attachments to retrieve per
+               request (default is 100).
+
+        Returns:
+            list: Attachments with their containers.
+
+        Raises:
+            Error: If the attachments cannot be fetched.
+        """
+        logger.info(f"Fetch {space_key} space attachments...")
+        attachments: List[Dict[str, Any]] = []
+        for results in self.search_content(
+            f'space = "{space_key}" and type = attachment',
+            expand="container",
+            limit=limit,
+            description=f"attachments for {space_key}",
+        ):
+            attachments.extend(results)
+        return attachments
+
+    def download_attachment(
+        self, attachment: Dict[str, Any], file_path: str
+    ) -> int:
+        """Download an attachment to a file.
+
+        The content is streamed to disk in chunks, so attachments of any
+        size take little memory. It is written to a temporary file renamed
+        once complete, so an interrupted download never leaves a truncated
+        file behind.
+
+        Args:
+            attachment (dict): Attachment as returned by
+                :meth:`get_all_attachments_in_space`.
+            file_path (str): Path of the file to save the attachment to.
+
+        Returns:
+            int: Number of bytes written.
+
+        Raises:
+            Error: If the attachment cannot be downloaded.
+        """
+        url = self.base_url + path(attachment, "_links.download")
+        tmp_path = f"{file_path}.part"
+
+        def download() -> int:
+            size = 0
+            with self.client.session.get(
+                url, stream=True, timeout=self.timeout
+            ) as response:
+                response.raise_for_status()
+                with open(tmp_path, "wb") as file:
+                    for chunk in response.iter_content(
+                        self.DOWNLOAD_CHUNK_SIZE
+                    ):
+                        size += file.write(chunk)
+            return size
+
+        try:
+            with metrics.stage("download"):
+                size = call_with_retry(
+                    download, self.retry_options, attachment["title"]
+                )
+        except requests.RequestException as exc:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise Error(
+                f"Failed to download {attachment['title']}: {exc}"
+            ) from exc
+
+        os.replace(tmp_path, file_path)
+        metrics.increment("bytes_received", size)
+        metrics.increment("bytes_written", size)
+        return size
 
     def get_all_spaces(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Retrieve all spaces from Confluence.
@@ -224,11 +717,16 @@ class Confluence:
             "start": 0,
             "limit": limit,
             "space_status": "current",
-            "expand": "history",
+            "expand": "history,homepage.history.ownedBy",
         }
 
         while True:
-            data = self.client.get_all_spaces(**params)
+            with metrics.stage("spaces"):
+                data = call_with_retry(
+                    lambda: self.client.get_all_spaces(**params),
+                    self.retry_options,
+                    "spaces",
+                )
             all_spaces.extend(data["results"])
             if not self._has_next_page(data):
                 break
@@ -238,140 +736,221 @@ class Confluence:
 
         return all_spaces
 
-    def exponential_backoff(
-        self,
-        retry_count: int,
-        base_delay: int,
-        max_retry_delay: int,
-    ) -> int:
-        """Calculate the backoff delay with jitter."""
-        delay = min((2**retry_count) * base_delay, max_retry_delay)
-        jitter = delay * random.uniform(
-            *self.retry_options.jitter_multiplier_range
-        )
-        return int(delay + jitter)
+    def get_space_summary(self, space_key: str) -> Dict[str, Any]:
+        """Retrieve page count and last activity for a given space.
 
-    def fetch_page_views(
-        self, content_id: str, views_type: str, retry_count: int = 0
-    ) -> Tuple[str, Optional[int]]:
-        """Fetch the number of views for the specified page."""
-        url = (
-            f"{self.base_url}"
-            f"/rest/api/analytics/content/{content_id}/{views_type}"
-        )
-        retry_options = self._sanitise_retry_options(self.retry_options)
-        result = (content_id, None)
+        A single CQL search ordered by modification date is enough to get
+        both values. Summaries are cached by all clients of the process for
+        :attr:`SPACE_SUMMARY_TTL` seconds, so repeated lookups of the same
+        space, e.g. by the commands run by ``swrangler serve``, do not hit
+        Confluence again. This method is safe to call from multiple threads.
 
-        try:
-            response = requests.get(
-                url,
-                headers=self.headers,
-                auth=self.auth,
-                timeout=self.timeout,
-            )
-            if response.status_code == 200:
-                data = response.json()
-                result = (content_id, data["count"])
-            elif response.status_code == 429:
-                retry_after = response.headers.get(
-                    "Retry-After", retry_options.last_retry_delay / 1000
-                )
+        Args:
+            space_key (str): The key of the Confluence space.
 
-                # Rate limited. Retry after the specified delay.
-                if retry_count < retry_options.max_retries:
-                    time.sleep(int(retry_after))
-                    delay = self.exponential_backoff(
-                        retry_count,
-                        int(retry_after),
-                        retry_options.max_retry_delay,
-                    )
+        Returns:
+            dict: Dictionary with ``page_count`` and ``last_activity`` keys.
+                The latter is None for spaces without pages.
+        """
+        key = (self.base_url, space_key)
+        with _SPACE_SUMMARIES_LOCK:
+            cached = _SPACE_SUMMARIES.get(key)
+        if cached is not None and (
+            time.monotonic() - cached[0] < self.SPACE_SUMMARY_TTL
+        ):
+            return cached[1]
+
+        with metrics.stage("space_summary"):
+            data = call_with_retry(
+                lambda: self.client.cql(
+                    f'space = "{space_key}" and type = page '
+                    "order by lastmodified desc",
+                    limit=1,
+                ),
+                self.retry_options,
+                f"summary of {space_key}",
+            )
+        results = data.get("results") or [{}]
+        summary = {
+            "page_count": data.get("totalSize", 0),
+            "last_activity": results[0].get("lastModified"),
+        }
 
-                    time.sleep(delay / 1000)
-                    return self.fetch_page_views(
-                        content_id,
-                        views_type,
-                        retry_count + 1,
-                    )
+        with _SPACE_SUMMARIES_LOCK:
+            _SPACE_SUMMARIES[key] = (time.monotonic(), summary)
+        return summary
 
-                # Exceeded max retries.
-                message = (
-                    f"Exceeded max retries for content ID {content_id} "
-                    "after being rate limited."
-                )
-                logger.error(message)
-            elif response.status_code == 500:
-                # Internal Server Error. Retry after backoff.
-                if retry_count < retry_options.max_retries:
-                    delay = self.exponential_backoff(
-                        retry_count,
-                        retry_options.last_retry_delay,
-                        retry_options.max_retry_delay,
-                    )
-                    time.sleep(delay / 1000)
-                    return self.fetch_page_views(
-                        content_id,
-                        views_type,
-                        retry_count + 1,
-                    )
+    def fetch_page_views(
+        self,
+        content_id: str,
+        views_type: str,
+        deadline: Optional[float] = None,
+    ) -> Tuple[str, Optional[int]]:
+        """Fetch the number of views for the specified page.
 
-                # Exceeded max retries.
-                message = (
-                    f"Exceeded max retries for content ID {content_id} "
-                    "after server error."
-                )
-                logger.error(message)
-            else:
-                # Other errors.
-                response.raise_for_status()
-        except requests.RequestException as e:
-            message = f"Failed to fetch data for content ID {content_id}: {e}"
-            logger.error(message)
+        See :meth:`AnalyticsClient.fetch_page_views`.
 
-        return result
+        Args:
+            content_id (str): The ID of the Confluence page.
+            views_type (str): The type of analytics (viewers or views).
+            deadline (Optional[float], optional): Time, as returned by
+                ``time.time()``, after which no request is made (default is
+                None, no deadline).
 
-    def _fetch_page_views_chunk(
-        self, content_ids: List[str], views_type: str
-    ) -> Dict[str, Optional[int]]:
-        """Fetch page views for a chunk of content IDs."""
-        chunk_results = {}
-        for content_id in content_ids:
-            content_id, views = self.fetch_page_views(content_id, views_type)
-            chunk_results[content_id] = views
-        return chunk_results
+        Returns:
+            tuple: The page ID and the number of views, None if the number
+                could not be fetched.
+        """
+        return self.analytics.fetch_page_views(
+            content_id, views_type, deadline
+        )
 
     def get_page_analytics(
-        self, content_ids: List[str], views_type: str
+        self,
+        content_ids: List[str],
+        views_type: str,
+        deadline: Optional[float] = None,
+        callback: Optional[Callable[[Dict[str, Optional[int]]], None]] = None,
     ) -> Dict[str, Optional[int]]:
         """Get analytics for the specified Confluence pages.
 
+        Pages are split into small batches handed out to the worker
+        processes one at a time, so a worker slowed down by rate limiting
+        does not hold up the others and pages are requested roughly in the
+        given order. Results are collected as soon as a batch completes.
+
+        Confluence offers no endpoint returning the counts of many pages at
+        once, so every count costs a request. A few requests probe the
+        endpoint first: if the site does not serve analytics at all, no
+        other request is made and no counts are returned. Counts fetched
+        by the probe are not requested again.
+
         Args:
             content_ids (list): List of Confluence page IDs.
             views_type (str): The type of analytics (viewers or views).
+            deadline (Optional[float], optional): Time, as returned by
+                ``time.time()``, after which no more requests are made.
+                Counts not fetched by then are None (default is None, no
+                deadline).
+            callback (Optional[Callable], optional): Function called with
+                the counts of every completed batch (default is None).
 
         Returns:
             dict: Dictionary with page IDs as keys and list of viewers as
                values.
         """
         logger.info(f"Fetch {views_type} for the specified pages...")
-
-        jobs = multiprocessing.cpu_count() or 1
+        if not content_ids:
+            return {}
+
+        page_views = self.analytics.probe(content_ids, views_type)
+        if not self.analytics.available:
+            metrics.increment("analytics_unavailable")
+            logger.warning(
+                f"Page analytics are not available on {self.base_url}, "
+                f"skip fetching {views_type}"
+            )
+            return {}
+        if page_views and callback is not None:
+            callback(dict(page_views))
+
+        content_ids = [
+            content_id
+            for content_id in content_ids
+            if content_id not in page_views
+        ]
+        batch_size = self.ANALYTICS_BATCH_SIZE
+        batches = [
+            content_ids[i : i + batch_size]
+            for i in range(0, len(content_ids), batch_size)
+        ]
+        if not batches:
+            return page_views
+
+        jobs = min(multiprocessing.cpu_count() or 1, len(batches))
         logger.info(f"Select the number of jobs: {jobs}")
 
-        def chunks(lst: List, n: int) -> Generator:
-            """Yield successive n-sized chunks from lst."""
-            for i in range(0, len(lst), n or 1):  # 1 for tests
-                yield lst[i : i + n]
+        with multiprocessing.Pool(
+            processes=jobs,
+            initializer=_init_analytics_worker,
+            initargs=(self.analytics.context,),
+        ) as pool:
+            for result, worker_metrics in pool.imap_unordered(
+                partial(
+                    _fetch_analytics_batch,
+                    views_type=views_type,
+                    deadline=deadline,
+                ),
+                batches,
+            ):
+                page_views.update(result)
+                metrics.merge(worker_metrics)
+                if callback is not None:
+                    callback(result)
+
+        missing = sum(1 for views in page_views.values() if views is None)
+        if missing:
+            logger.warning(f"Failed to fetch {views_type} of {missing} pages")
 
-        content_id_chunks = chunks(content_ids, len(content_ids) // jobs)
+        return page_views
 
-        with multiprocessing.Pool(processes=jobs) as pool:
-            results = pool.starmap(
-                self._fetch_page_views_chunk,
-                [(chunk, views_type) for chunk in content_id_chunks],
-            )
 
-        page_views = {}
-        for result in results:
-            page_views.update(result)
+def _in_batches(
+    pages: Iterable[Dict[str, Any]],
+    size: int,
+    callback: Optional[Callable[[List[Dict[str, Any]]], None]],
+) -> None:
+    """Call a function, if any, with successive batches of pages."""
+    if callback is None:
+        return
 
-        return page_views
+    iterator = iter(pages)
+    while batch := list(islice(iterator, size)):
+        callback(batch)
+
+
+# State of the analytics worker process, set up by _init_analytics_worker.
+_WORKER_STATE: Dict[str, AnalyticsClient] = {}
+
+
+def _init_analytics_worker(context: ProcessContext) -> None:
+    """Set up a worker process fetching analytics.
+
+    Only the small context is sent to every worker, once. The worker builds
+    its own client from it, so the HTTP session and the circuit breaker of
+    the analytics endpoints live as long as the worker.
+
+    Args:
+        context (ProcessContext): Configuration of the analytics client.
+    """
+    _WORKER_STATE["client"] = AnalyticsClient(context)
+    # Forked workers inherit a copy of the parent's metrics.
+    metrics.reset()
+
+
+def _fetch_analytics_batch(
+    content_ids: List[str],
+    views_type: str,
+    deadline: Optional[float] = None,
+) -> Tuple[Dict[str, Optional[int]], Dict[str, Any]]:
+    """Fetch analytics for a batch of pages in a worker process.
+
+    Args:
+        content_ids (list): List of Confluence page IDs.
+        views_type (str): The type of analytics (viewers or views).
+        deadline (Optional[float], optional): Time, as returned by
+            ``time.time()``, after which no more requests are made
+            (default is None, no deadline).
+
+    Returns:
+        tuple: Counts keyed by page ID, and the metrics collected while
+            fetching them, to be merged by the parent process.
+    """
+    client = _WORKER_STATE["client"]
+    batch_results = {}
+    for content_id in content_ids:
+        content_id, views = client.fetch_page_views(
+            content_id, views_type, deadline
+        )
+        batch_results[content_id] = views
+    return batch_results, metrics.drain()
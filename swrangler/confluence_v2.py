@@ -0,0 +1,272 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Pages of a space from the Confluence REST API v2.
+
+The v2 API paginates with opaque cursors instead of offsets, so requests
+deep into a large space are as fast as the first ones, and it returns up
+to 250 pages per request. Its pages refer to their parent and to users by
+ID only, so this module converts them to the shape of the v1 API used by
+the rest of swrangler.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from swrangler.common import path
+from swrangler.exceptions import Error
+from swrangler.retry import DefaultRetryOptions, call_with_retry
+
+logger = logging.getLogger("swrangler")
+
+# Maximum number of pages the v2 API returns per request.
+MAX_LIMIT = 250
+
+# Collections of the v2 API keyed by the content type of the v1 API.
+COLLECTIONS = {"page": "pages", "blogpost": "blogposts"}
+CONTENT_TYPES = {value: key for key, value in COLLECTIONS.items()}
+
+
+class PagesV2:
+    """Client of the pages of a space in the REST API v2.
+
+    Attributes:
+        session (requests.Session): Authenticated HTTP session.
+        base_url (str): URL of the Confluence site including ``/wiki``.
+        timeout (int): The timeout for HTTP requests in seconds.
+        retry_options (DefaultRetryOptions): Configuration options for
+            retry logic.
+        users (dict): Users seen so far keyed by account ID.
+    """
+
+    USERS_BATCH_SIZE: int = 100
+
+    def __init__(
+        self,
+        session: requests.Session,
+        base_url: str,
+        timeout: int,
+        retry_options: DefaultRetryOptions,
+    ) -> None:
+        """Initialize PagesV2.
+
+        Args:
+            session (requests.Session): Authenticated HTTP session.
+            base_url (str): URL of the Confluence site including ``/wiki``.
+            timeout (int): The timeout for HTTP requests in seconds.
+            retry_options (DefaultRetryOptions): Configuration options for
+                retry logic.
+        """
+        self.session = session
+        self.base_url = base_url
+        self.timeout = timeout
+        self.retry_options = retry_options
+        self.users: Dict[str, Dict[str, Any]] = {}
+
+    def _get(
+        self, url_path: str, params: Dict[str, Any], description: str
+    ) -> Dict[str, Any]:
+        """Make a GET request retrying transient failures."""
+
+        def request() -> Dict[str, Any]:
+            response = self.session.get(
+                f"{self.base_url}{url_path}",
+                params=params,
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            return response.json()
+
+        return call_with_retry(request, self.retry_options, description)
+
+    def first_cursor(
+        self, space_key: str, limit: int, content_type: str = "page"
+    ) -> Dict[str, Any]:
+        """Get the cursor of the first request for the pages of a space.
+
+        Args:
+            space_key (str): The key of the Confluence space.
+            limit (int): Number of pages to retrieve per request, capped at
+                :data:`MAX_LIMIT`.
+            content_type (str, optional): Type of the content to retrieve,
+                ``page`` or ``blogpost`` (default is page).
+
+        Returns:
+            dict: Cursor to pass to :meth:`fetch`.
+
+        Raises:
+            Error: If the space does not exist.
+        """
+        data = self._get(
+            "/api/v2/spaces", {"keys": space_key}, f"ID of {space_key}"
+        )
+        if not data["results"]:
+            raise Error(f"Space {space_key} not found")
+
+        return {
+            "space_id": data["results"][0]["id"],
+            "collection": COLLECTIONS[content_type],
+            "limit": min(limit, MAX_LIMIT),
+        }
+
+    def fetch(
+        self, cursor: Dict[str, Any]
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Fetch a batch of pages.
+
+        Args:
+            cursor (dict): Cursor returned by :meth:`first_cursor` or by
+                the previous call.
+
+        Returns:
+            tuple: Pages in the shape of the v1 API, without ancestors, and
+                the cursor of the next batch, None after the last one.
+        """
+        params = {
+            "limit": cursor["limit"],
+            "status": "current",
+            "body-format": "storage",
+        }
+        if "cursor" in cursor:
+            params["cursor"] = cursor["cursor"]
+
+        space_id = cursor["space_id"]
+        collection = cursor.get("collection", "pages")
+        data = self._get(
+            f"/api/v2/spaces/{space_id}/{collection}",
+            params,
+            f"{collection} of {space_id}",
+        )
+        pages = data["results"]
+
+        self._fetch_users(
+            account_id
+            for page in pages
+            for account_id in (
+                page.get("ownerId"),
+                path(page, "version.authorId"),
+            )
+        )
+
+        next_cursor = None
+        next_url = path(data, "_links.next")
+        if next_url:
+            query = parse_qs(urlparse(next_url).query)
+            next_cursor = dict(cursor, cursor=query["cursor"][0])
+
+        content_type = CONTENT_TYPES[collection]
+        return [self.to_v1(page, content_type) for page in pages], next_cursor
+
+    def _fetch_users(self, account_ids: Iterable[Optional[str]]) -> None:
+        """Fetch the users not seen yet."""
+        missing = sorted(
+            {
+                account_id
+                for account_id in account_ids
+                if account_id and account_id not in self.users
+            }
+        )
+
+        for i in range(0, len(missing), self.USERS_BATCH_SIZE):
+            batch = missing[i : i + self.USERS_BATCH_SIZE]
+            data = self._get(
+                "/rest/api/user/bulk",
+                {"accountId": ",".join(batch), "limit": len(batch)},
+                f"{len(batch)} users",
+            )
+            for user in data["results"]:
+                self.users[user["accountId"]] = user
+
+            # Deleted users are not returned, do not ask for them again.
+            for account_id in batch:
+                self.users.setdefault(account_id, {"accountId": account_id})
+
+    def _user(self, account_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Get a user seen before by account ID."""
+        return self.users.get(account_id) if account_id else None
+
+    def to_v1(
+        self, page: Dict[str, Any], content_type: str = "page"
+    ) -> Dict[str, Any]:
+        """Convert a page of the v2 API to the shape of the v1 API.
+
+        The ID of the parent page is kept as ``parentId``, ancestors are
+        added by :func:`add_ancestors` once all pages are fetched.
+
+        Args:
+            page (dict): Page of the v2 API.
+            content_type (str, optional): Type of the content, ``page`` or
+                ``blogpost`` (default is page).
+
+        Returns:
+            dict: Page of the v1 API without ancestors.
+        """
+        version = page.get("version") or {}
+        last_editor = self._user(version.get("authorId"))
+
+        return {
+            "id": page["id"],
+            "type": content_type,
+            "status": page.get("status"),
+            "title": page["title"],
+            "parentId": page.get("parentId"),
+            "body": page.get("body") or {},
+            "history": {
+                "createdDate": page.get("createdAt"),
+                "lastUpdated": {
+                    "when": version.get("createdAt"),
+                    "by": last_editor,
+                },
+                "ownedBy": self._user(page.get("ownerId")),
+            },
+            "version": {"number": version.get("number"), "by": last_editor},
+            "_links": {"webui": path(page, "_links.webui")},
+        }
+
+
+def add_ancestors(
+    page: Dict[str, Any], parents: Dict[str, Tuple[str, Optional[str]]]
+) -> Dict[str, Any]:
+    """Add ancestors to a page converted by :meth:`PagesV2.to_v1`.
+
+    Parents which are not pages of the space, such as folders, end the
+    chain of ancestors. Pages fetched with the v1 API, e.g. recorded in
+    a checkpoint, are returned as is.
+
+    Args:
+        page (dict): Page without ancestors.
+        parents (dict): Titles and parent IDs of all pages of the space
+            keyed by page ID.
+
+    Returns:
+        dict: The page with ancestors, root first.
+    """
+    if "parentId" not in page:
+        return page
+
+    ancestors: List[Dict[str, str]] = []
+    parent_id = page.get("parentId")
+    while parent_id is not None and parent_id in parents:
+        if len(ancestors) >= len(parents):
+            break  # A cycle, should never happen.
+        title, next_id = parents[parent_id]
+        ancestors.append({"id": parent_id, "title": title})
+        parent_id = next_id
+
+    page["ancestors"] = ancestors[::-1]
+    return page
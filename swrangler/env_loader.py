@@ -17,8 +17,6 @@
 
 from pathlib import Path
 
-from dotenv import load_dotenv
-
 
 class EnvLoader:
     """Class for loading environment variables in a specified order."""
@@ -34,13 +32,14 @@ class EnvLoader:
         # 1. Load environment variables from the current console session
         # (already loaded by default)
 
-        # 2. Load from .confluence in current working directory
-        cwd_confluence = Path.cwd() / ".confluence"
-        if cwd_confluence.exists():
-            load_dotenv(dotenv_path=cwd_confluence, override=False)
-            return  # Stop loading from other sources
-
+        # 2. Load from .confluence in current working directory, or
         # 3. Load from .confluence in the user's home directory
-        home_confluence = Path.home() / ".confluence"
-        if home_confluence.exists():
-            load_dotenv(dotenv_path=home_confluence, override=False)
+        for dotenv_path in (Path.cwd(), Path.home()):
+            confluence = dotenv_path / ".confluence"
+            if confluence.exists():
+                # Imported here to keep the startup of the CLI fast when
+                # no .confluence file is used.
+                from dotenv import load_dotenv
+
+                load_dotenv(dotenv_path=confluence, override=False)
+                return  # Stop loading from other sources
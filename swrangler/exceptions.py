@@ -93,3 +93,11 @@ class ConfigurationError(Error):
 
         # This should never happen since we check for missing configs above
         return "Unknown configuration error occurred."
+
+
+class CircuitOpenError(Error):
+    """Exception raised when a request is rejected by an open circuit breaker.
+
+    The breaker opens after too many requests to an endpoint have failed,
+    so further requests fail fast instead of waiting for their retries.
+    """
@@ -0,0 +1,957 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""A local stand-in for the Confluence REST API.
+
+This module provides a small HTTP server serving synthetic Confluence spaces
+of configurable size. It can add latency to every response and inject rate
+limiting (429) and server errors (500), which makes it suitable for
+benchmarks and end-to-end tests of the whole fetch/render/write pipeline
+without touching a real Confluence instance.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Pattern, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.000Z"
+EPOCH = datetime(2020, 1, 1)
+
+
+@dataclass(frozen=True)
+class FakeServerOptions:  # pylint: disable=too-many-instance-attributes
+    """Configuration options of the fake Confluence server.
+
+    Attributes:
+        spaces (int): Number of spaces served. Default is 1.
+        pages (int): Number of pages in every space. Default is 1000.
+        body_size (int): Approximate size of a page body in characters.
+            Default is 2000.
+        fanout (int): Number of child pages per page, controls the depth of
+            the page tree. Default is 10.
+        latency (int): Delay added to every response, in milliseconds.
+            Default is 0.
+        error_rate (float): Probability of answering a request with
+            a server error (500). Default is 0.
+        rate_limit_rate (float): Probability of answering a request with
+            a rate limit error (429). Default is 0.
+        retry_after (int): Value of the Retry-After header sent with rate
+            limit errors, in seconds. Default is 1.
+        seed (int): Seed of the random generator used to inject errors.
+            Default is 0.
+        analytics (bool): Whether page analytics are served, as on sites
+            without analytics they are not. Default is True.
+        blog_posts (int): Number of blog posts in every space. Default is 0.
+        attachments (int): Number of attachments in every space, attached
+            to the pages in turn. Default is 0.
+        attachment_size (int): Size of the smallest attachment in bytes,
+            the others are up to four times larger. Default is 1024.
+    """
+
+    spaces: int = 1
+    pages: int = 1000
+    body_size: int = 2000
+    fanout: int = 10
+    latency: int = 0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: int = 1
+    seed: int = 0
+    analytics: bool = True
+    blog_posts: int = 0
+    attachments: int = 0
+    attachment_size: int = 1024
+
+
+class FakeConfluence:
+    """Deterministic generator of synthetic Confluence content.
+
+    Content is generated on demand from indices, so the server memory does
+    not grow with the size of the served spaces.
+
+    Attributes:
+        options (FakeServerOptions): Configuration of the served content.
+    """
+
+    USERS: int = 20
+
+    # Blog posts get IDs of pages with indices from this offset on.
+    BLOG_POST_OFFSET: int = 5_000_000
+
+    def __init__(self, options: FakeServerOptions) -> None:
+        """Initialize FakeConfluence.
+
+        Args:
+            options (FakeServerOptions): Configuration of the served content.
+        """
+        self.options = options
+
+    @staticmethod
+    def space_key(space_index: int) -> str:
+        """Get the key of a space by its index.
+
+        Args:
+            space_index (int): Index of the space.
+
+        Returns:
+            str: The key of the space.
+        """
+        return f"BENCH{space_index}"
+
+    def space_index(self, space_key: str) -> Optional[int]:
+        """Get the index of a space by its key.
+
+        Args:
+            space_key (str): The key of the space.
+
+        Returns:
+            Optional[int]: Index of the space, None for unknown keys.
+        """
+        match = re.fullmatch(r"BENCH(\d+)", space_key)
+        if match is None or int(match.group(1)) >= self.options.spaces:
+            return None
+        return int(match.group(1))
+
+    def page_id(self, space_index: int, page_index: int) -> str:
+        """Get the ID of a page.
+
+        Args:
+            space_index (int): Index of the space.
+            page_index (int): Index of the page within the space.
+
+        Returns:
+            str: The ID of the page.
+        """
+        return str((space_index + 1) * 10_000_000 + page_index)
+
+    def parse_page_id(self, page_id: str) -> Optional[Tuple[int, int]]:
+        """Get the space and page indices of a page ID.
+
+        Args:
+            page_id (str): The ID of the page.
+
+        Returns:
+            Optional[tuple]: Space and page indices, None for unknown IDs.
+        """
+        if not page_id.isdigit():
+            return None
+        space_index, page_index = divmod(int(page_id), 10_000_000)
+        space_index -= 1
+        if not 0 <= space_index < self.options.spaces:
+            return None
+        if not 0 <= page_index < self.options.pages:
+            return None
+        return space_index, page_index
+
+    def user(self, index: int) -> Dict[str, str]:
+        """Get a synthetic user.
+
+        Args:
+            index (int): Any number, mapped onto the pool of users.
+
+        Returns:
+            dict: User data.
+        """
+        number = index % self.USERS
+        return {
+            "accountId": f"user-{number:04d}",
+            "displayName": f"User {number}",
+        }
+
+    def user_by_id(self, account_id: str) -> Optional[Dict[str, str]]:
+        """Get a synthetic user by account ID.
+
+        Args:
+            account_id (str): The account ID of the user.
+
+        Returns:
+            Optional[dict]: User data, None for unknown IDs.
+        """
+        match = re.fullmatch(r"user-(\d{4})", account_id)
+        if match is None or int(match.group(1)) >= self.USERS:
+            return None
+        return self.user(int(match.group(1)))
+
+    def body(self, page_index: int) -> str:
+        """Generate the body of a page in storage format.
+
+        Args:
+            page_index (int): Index of the page within the space.
+
+        Returns:
+            str: Page body.
+        """
+        paragraph = (
+            f"<p>Paragraph of page {page_index}. Lorem ipsum dolor sit amet, "
+            "consectetur adipiscing elit, sed do eiusmod tempor.</p>"
+        )
+        code = (
+            '<ac:structured-macro ac:name="code">'
+            '<ac:parameter ac:name="language">python</ac:parameter>'
+            f"<ac:plain-text-body>print({page_index})</ac:plain-text-body>"
+            "</ac:structured-macro>"
+        )
+        count = max(1, self.options.body_size // len(paragraph))
+        return f"<h1>Page {page_index}</h1>" + paragraph * count + code
+
+    def ancestor_indices(self, page_index: int) -> List[int]:
+        """Get the indices of the ancestors of a page, root first.
+
+        Args:
+            page_index (int): Index of the page within the space.
+
+        Returns:
+            list: Indices of the ancestors.
+        """
+        ancestors = []
+        while page_index > 0:
+            page_index = (page_index - 1) // self.options.fanout
+            ancestors.append(page_index)
+        return ancestors[::-1]
+
+    @staticmethod
+    def updated(page_index: int) -> datetime:
+        """Get the time a page or blog post was last updated.
+
+        Args:
+            page_index (int): Index of the page within the space.
+
+        Returns:
+            datetime: Time of the last update.
+        """
+        return (
+            EPOCH
+            + timedelta(hours=page_index)
+            + timedelta(days=page_index * 37 % 1000)
+        )
+
+    def content_by_id(self, content_id: str) -> Optional[Dict[str, Any]]:
+        """Get a page or a blog post by ID.
+
+        Args:
+            content_id (str): The ID of the page or blog post.
+
+        Returns:
+            Optional[dict]: Page or blog post data, None for unknown IDs.
+        """
+        if not content_id.isdigit():
+            return None
+        space_index, index = divmod(int(content_id), 10_000_000)
+        space_index -= 1
+        if not 0 <= space_index < self.options.spaces:
+            return None
+        if index < self.options.pages:
+            return self.page(space_index, index)
+        index -= self.BLOG_POST_OFFSET
+        if 0 <= index < self.options.blog_posts:
+            return self.blog_post(space_index, index)
+        return None
+
+    def find_content(
+        self, space_index: int, cql: str
+    ) -> List[Callable[[], Dict[str, Any]]]:
+        """Find the pages and blog posts of a space matching a CQL query.
+
+        Only the clauses sync queries with are understood: the types of
+        the content and its minimum modification time.
+
+        Args:
+            space_index (int): Index of the space.
+            cql (str): The CQL query.
+
+        Returns:
+            list: Functions generating the matching content, so that only
+                the requested batch is generated.
+        """
+        oldest = EPOCH
+        since = re.search(r'lastmodified >= "([^"]+)"', cql)
+        if since is not None:
+            oldest = datetime.strptime(since.group(1), "%Y-%m-%d %H:%M")
+
+        found: List[Callable[[], Dict[str, Any]]] = []
+        for content_type, total, generate in (
+            ("page", self.options.pages, self.page),
+            ("blogpost", self.options.blog_posts, self.blog_post),
+        ):
+            if not re.search(rf"type (=|in \(.*){content_type}\b", cql):
+                continue
+            found.extend(
+                partial(generate, space_index, index)
+                for index in range(total)
+                if self.updated(index) >= oldest
+            )
+        return found
+
+    def page(self, space_index: int, page_index: int) -> Dict[str, Any]:
+        """Generate a page in the shape of the REST API v1.
+
+        Args:
+            space_index (int): Index of the space.
+            page_index (int): Index of the page within the space.
+
+        Returns:
+            dict: Page data.
+        """
+        page_id = self.page_id(space_index, page_index)
+        created = EPOCH + timedelta(hours=page_index)
+        updated = self.updated(page_index)
+
+        return {
+            "id": page_id,
+            "type": "page",
+            "status": "current",
+            "title": f"Page {page_index}",
+            "ancestors": [
+                {
+                    "id": self.page_id(space_index, index),
+                    "title": f"Page {index}",
+                }
+                for index in self.ancestor_indices(page_index)
+            ],
+            "body": {
+                "storage": {
+                    "value": self.body(page_index),
+                    "representation": "storage",
+                }
+            },
+            "history": {
+                "createdDate": created.strftime(DATE_FORMAT),
+                "lastUpdated": {
+                    "when": updated.strftime(DATE_FORMAT),
+                    "by": self.user(page_index + 1),
+                },
+                "ownedBy": self.user(page_index),
+            },
+            "version": {
+                "number": page_index % 7 + 1,
+                "by": self.user(page_index + 1),
+            },
+            "_links": {
+                "webui": (
+                    f"/spaces/{self.space_key(space_index)}"
+                    f"/pages/{page_id}"
+                )
+            },
+        }
+
+    def blog_post(self, space_index: int, index: int) -> Dict[str, Any]:
+        """Generate a blog post in the shape of the REST API v1.
+
+        Args:
+            space_index (int): Index of the space.
+            index (int): Index of the blog post within the space.
+
+        Returns:
+            dict: Blog post data.
+        """
+        post = self.page(space_index, index)
+        post_id = self.page_id(space_index, self.BLOG_POST_OFFSET + index)
+        post.update(
+            {
+                "id": post_id,
+                "type": "blogpost",
+                "title": f"Blog post {index}",
+                "ancestors": [],
+                "_links": {
+                    "webui": (
+                        f"/spaces/{self.space_key(space_index)}"
+                        f"/blog/{post_id}"
+                    )
+                },
+            }
+        )
+        return post
+
+    def to_v2(self, page: Dict[str, Any], space_index: int) -> Dict[str, Any]:
+        """Convert a page or a blog post to the shape of the REST API v2.
+
+        Args:
+            page (dict): Page or blog post in the shape of the v1 API.
+            space_index (int): Index of the space.
+
+        Returns:
+            dict: Page or blog post data.
+        """
+        history = page["history"]
+        parent = page["ancestors"][-1] if page["ancestors"] else None
+
+        return {
+            "id": page["id"],
+            "status": page["status"],
+            "title": page["title"],
+            "spaceId": str(space_index + 1),
+            "parentId": parent and parent["id"],
+            "parentType": parent and "page",
+            "authorId": history["ownedBy"]["accountId"],
+            "ownerId": history["ownedBy"]["accountId"],
+            "createdAt": history["createdDate"],
+            "version": {
+                "number": page["version"]["number"],
+                "createdAt": history["lastUpdated"]["when"],
+                "authorId": history["lastUpdated"]["by"]["accountId"],
+            },
+            "body": page["body"],
+            "_links": page["_links"],
+        }
+
+    def attachment_size(self, index: int) -> int:
+        """Get the size of an attachment.
+
+        Args:
+            index (int): Index of the attachment within the space.
+
+        Returns:
+            int: Size in bytes.
+        """
+        return self.options.attachment_size * (index % 4 + 1)
+
+    def attachment(self, space_index: int, index: int) -> Dict[str, Any]:
+        """Generate the metadata of an attachment.
+
+        Args:
+            space_index (int): Index of the space.
+            index (int): Index of the attachment within the space.
+
+        Returns:
+            dict: Attachment data.
+        """
+        page_index = index % max(1, self.options.pages)
+        page_id = self.page_id(space_index, page_index)
+        name = f"file-{index}.bin"
+        media_type = "application/octet-stream"
+
+        return {
+            "id": f"att{self.page_id(space_index, index)}",
+            "type": "attachment",
+            "status": "current",
+            "title": name,
+            "metadata": {"mediaType": media_type},
+            "extensions": {
+                "mediaType": media_type,
+                "fileSize": self.attachment_size(index),
+            },
+            "container": {
+                "id": page_id,
+                "type": "page",
+                "title": f"Page {page_index}",
+            },
+            "_links": {
+                "download": (
+                    f"/download/attachments/{page_id}/{name}?version=1"
+                )
+            },
+        }
+
+    def attachment_data(self, page_id: str, name: str) -> Optional[bytes]:
+        """Generate the content of an attachment.
+
+        Args:
+            page_id (str): The ID of the page holding the attachment.
+            name (str): File name of the attachment.
+
+        Returns:
+            Optional[bytes]: Content of the attachment, None for unknown
+                attachments.
+        """
+        indices = self.parse_page_id(page_id)
+        match = re.fullmatch(r"file-(\d+)\.bin", name)
+        if indices is None or match is None:
+            return None
+
+        index = int(match.group(1))
+        if index >= self.options.attachments:
+            return None
+
+        chunk = f"Attachment {index} of page {page_id}\n".encode("utf-8")
+        size = self.attachment_size(index)
+        return (chunk * (size // len(chunk) + 1))[:size]
+
+    def space(self, space_index: int) -> Dict[str, Any]:
+        """Generate a space.
+
+        Args:
+            space_index (int): Index of the space.
+
+        Returns:
+            dict: Space data.
+        """
+        space_key = self.space_key(space_index)
+        return {
+            "id": space_index + 1,
+            "key": space_key,
+            "name": f"Benchmark Space {space_index}",
+            "type": "global",
+            "history": {
+                "createdBy": self.user(space_index),
+                "createdDate": EPOCH.strftime(DATE_FORMAT),
+            },
+            "homepage": {
+                "id": self.page_id(space_index, 0),
+                "history": {"ownedBy": self.user(space_index)},
+            },
+            "_links": {"webui": f"/spaces/{space_key}"},
+        }
+
+    def views(self, page_id: str, views_type: str) -> Optional[int]:
+        """Get the number of views of a page.
+
+        Args:
+            page_id (str): The ID of the page.
+            views_type (str): The type of analytics (viewers or views).
+
+        Returns:
+            Optional[int]: Number of views, None for unknown pages.
+        """
+        indices = self.parse_page_id(page_id)
+        if indices is None:
+            return None
+        count = indices[1] * 13 % 500
+        return count if views_type == "viewers" else count * 3
+
+
+def _paginate(
+    path: str, query: Dict[str, str], total: int, default_limit: int
+) -> Tuple[int, int, Dict[str, str]]:
+    """Compute the slice and links of an offset-paginated collection."""
+    start = int(query.get("start", 0))
+    limit = int(query.get("limit", default_limit))
+    end = min(start + limit, total)
+
+    links: Dict[str, str] = {}
+    if end < total:
+        next_query = urlencode({"limit": limit, "start": end})
+        links["next"] = f"{path}?{next_query}"
+    return start, end, links
+
+
+def _paginate_cursor(
+    path: str, query: Dict[str, str], total: int, max_limit: int
+) -> Tuple[int, int, Dict[str, str]]:
+    """Compute the slice and links of a cursor-paginated collection."""
+    cursor = query.get("cursor", "")
+    start = int(cursor[len("offset-") :]) if cursor else 0
+    limit = min(int(query.get("limit", 25)), max_limit)
+    end = min(start + limit, total)
+
+    links: Dict[str, str] = {}
+    if end < total:
+        next_query = urlencode({"cursor": f"offset-{end}", "limit": limit})
+        links["next"] = f"/wiki{path}?{next_query}"
+    return start, end, links
+
+
+class FakeConfluenceHandler(BaseHTTPRequestHandler):
+    """Request handler of the fake Confluence server."""
+
+    server: "FakeConfluenceServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # pylint: disable=redefined-builtin
+        """Keep the benchmark output clean from access logs."""
+
+    def send_json(
+        self,
+        status: int,
+        data: Any,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Send a JSON response.
+
+        Args:
+            status (int): HTTP status code.
+            data (Any): Response body.
+            headers (Optional[dict]): Additional response headers.
+        """
+        headers = dict(headers or {}, **{"Content-Type": "application/json"})
+        self.send_body(status, json.dumps(data).encode("utf-8"), headers)
+
+    def send_body(
+        self,
+        status: int,
+        payload: bytes,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Send a response.
+
+        Args:
+            status (int): HTTP status code.
+            payload (bytes): Response body.
+            headers (Optional[dict]): Additional response headers.
+        """
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+        self.server.record_bytes(len(payload))
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Serve a GET request."""
+        failure = self.server.next_failure()
+        if failure == 429:
+            self.send_json(
+                429,
+                {"message": "Rate limit exceeded"},
+                {"Retry-After": str(self.server.options.retry_after)},
+            )
+            return
+        if failure == 500:
+            self.send_json(500, {"message": "Injected server error"})
+            return
+
+        parsed = urlparse(self.path)
+        path = re.sub(r"^/wiki", "", parsed.path)
+        query = {
+            key: value[0] for key, value in parse_qs(parsed.query).items()
+        }
+
+        response = self.server.route(path, query)
+        if response is None:
+            self.send_json(404, {"message": f"No route for {path}"})
+        elif isinstance(response, bytes):
+            self.send_body(
+                200, response, {"Content-Type": "application/octet-stream"}
+            )
+        else:
+            self.send_json(200, response)
+
+
+class FakeConfluenceServer(ThreadingHTTPServer):
+    # pylint: disable=too-many-instance-attributes
+    """Threaded HTTP server emulating the Confluence REST API.
+
+    The server runs in a background thread. It is a context manager which
+    starts the server on enter and stops it on exit.
+
+    Attributes:
+        options (FakeServerOptions): Configuration of the server.
+        content (FakeConfluence): Generator of the served content.
+        requests_count (int): Number of requests received.
+        failures_count (int): Number of injected failures.
+        bytes_sent (int): Number of response body bytes sent.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        options: Optional[FakeServerOptions] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        """Initialize FakeConfluenceServer.
+
+        Args:
+            options (Optional[FakeServerOptions]): Configuration of the
+                server (default is None, the default options).
+            host (str, optional): Interface to listen on (default is
+                127.0.0.1).
+            port (int, optional): Port to listen on (default is 0, any free
+                port).
+        """
+        super().__init__((host, port), FakeConfluenceHandler)
+        self.options = options or FakeServerOptions()
+        self.content = FakeConfluence(self.options)
+        self.requests_count = 0
+        self.failures_count = 0
+        self.bytes_sent = 0
+
+        self._random = random.Random(self.options.seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._routes: List[Tuple[Pattern, Callable[..., Any]]] = [
+            (re.compile(r"/rest/api/space"), self._spaces),
+            (
+                re.compile(
+                    r"/rest/api/space/(?P<key>[^/]+)"
+                    r"/content/(?P<type>page|blogpost)"
+                ),
+                self._space_content,
+            ),
+            (re.compile(r"/rest/api/content/search"), self._content_search),
+            (
+                re.compile(
+                    r"/download/attachments/(?P<id>\d+)/(?P<name>[^/]+)"
+                ),
+                self._download,
+            ),
+            (
+                re.compile(
+                    r"/rest/api/analytics/content/(?P<id>[^/]+)"
+                    r"/(?P<type>views|viewers)"
+                ),
+                self._analytics,
+            ),
+            (re.compile(r"/rest/api/search"), self._search),
+            (re.compile(r"/rest/api/user/bulk"), self._users),
+            (re.compile(r"/api/v2/spaces"), self._spaces_v2),
+            (
+                re.compile(
+                    r"/api/v2/spaces/(?P<id>\d+)/(?P<type>pages|blogposts)"
+                ),
+                self._space_content_v2,
+            ),
+        ]
+
+    @property
+    def url(self) -> str:
+        """str: Base URL of the server, suitable for CONFLUENCE_DOMAIN."""
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def reset_stats(self) -> None:
+        """Reset request statistics of the server."""
+        with self._lock:
+            self.requests_count = 0
+            self.failures_count = 0
+            self.bytes_sent = 0
+
+    def record_bytes(self, size: int) -> None:
+        """Account for a sent response body.
+
+        Args:
+            size (int): Size of the response body in bytes.
+        """
+        with self._lock:
+            self.bytes_sent += size
+
+    def next_failure(self) -> Optional[int]:
+        """Count a request, apply latency and decide on a failure.
+
+        Returns:
+            Optional[int]: Status code of the injected failure, None if the
+                request should be served normally.
+        """
+        with self._lock:
+            self.requests_count += 1
+            roll = self._random.random()
+
+        if self.options.latency:
+            time.sleep(self.options.latency / 1000)
+
+        if roll < self.options.rate_limit_rate:
+            status: Optional[int] = 429
+        elif roll < self.options.rate_limit_rate + self.options.error_rate:
+            status = 500
+        else:
+            return None
+
+        with self._lock:
+            self.failures_count += 1
+        return status
+
+    def route(self, path: str, query: Dict[str, str]) -> Any:
+        """Find and call the handler of a path.
+
+        Args:
+            path (str): Request path without the ``/wiki`` prefix.
+            query (dict): Query parameters.
+
+        Returns:
+            Response body, a dict sent as JSON or binary content, None if no
+                route matches.
+        """
+        for pattern, handler in self._routes:
+            match = pattern.fullmatch(path)
+            if match is not None:
+                return handler(path, query, **match.groupdict())
+        return None
+
+    def _spaces(
+        self, path: str, query: Dict[str, str], **params: str
+    ) -> Dict[str, Any]:
+        # pylint: disable=unused-argument
+        start, end, links = _paginate(path, query, self.options.spaces, 25)
+        return {
+            "results": [self.content.space(i) for i in range(start, end)],
+            "start": start,
+            "limit": end - start,
+            "size": end - start,
+            "_links": links,
+        }
+
+    def _space_content(
+        self, path: str, query: Dict[str, str], **params: str
+    ) -> Optional[Dict[str, Any]]:
+        space_index = self.content.space_index(params["key"])
+        if space_index is None:
+            return None
+
+        generate: Callable[[int, int], Dict[str, Any]]
+        if params["type"] == "page":
+            total, generate = self.options.pages, self.content.page
+        else:
+            total, generate = self.options.blog_posts, self.content.blog_post
+
+        start, end, links = _paginate(path, query, total, 25)
+        return {
+            "results": [generate(space_index, i) for i in range(start, end)],
+            "start": start,
+            "limit": end - start,
+            "size": end - start,
+            "_links": links,
+        }
+
+    def _users(
+        self, path: str, query: Dict[str, str], **params: str
+    ) -> Dict[str, Any]:
+        # pylint: disable=unused-argument
+        users = [
+            self.content.user_by_id(account_id)
+            for account_id in query.get("accountId", "").split(",")
+        ]
+        results = [user for user in users if user is not None]
+        return {"results": results, "size": len(results)}
+
+    def _spaces_v2(
+        self, path: str, query: Dict[str, str], **params: str
+    ) -> Dict[str, Any]:
+        # pylint: disable=unused-argument
+        results = []
+        for key in query.get("keys", "").split(","):
+            space_index = self.content.space_index(key)
+            if space_index is not None:
+                space = self.content.space(space_index)
+                results.append(
+                    {"id": str(space["id"]), "key": key, "name": space["name"]}
+                )
+        return {"results": results, "_links": {}}
+
+    def _space_content_v2(
+        self, path: str, query: Dict[str, str], **params: str
+    ) -> Optional[Dict[str, Any]]:
+        space_index = int(params["id"]) - 1
+        if not 0 <= space_index < self.options.spaces:
+            return None
+
+        generate: Callable[[int, int], Dict[str, Any]]
+        if params["type"] == "pages":
+            total, generate = self.options.pages, self.content.page
+        else:
+            total, generate = self.options.blog_posts, self.content.blog_post
+
+        start, end, links = _paginate_cursor(path, query, total, 250)
+        return {
+            "results": [
+                self.content.to_v2(generate(space_index, i), space_index)
+                for i in range(start, end)
+            ],
+            "_links": links,
+        }
+
+    def _content_search(
+        self, path: str, query: Dict[str, str], **params: str
+    ) -> Dict[str, Any]:
+        # pylint: disable=unused-argument
+        cql = query.get("cql", "")
+        ids = re.fullmatch(r"id in \(([^)]*)\)", cql)
+        if ids is not None:
+            results = [
+                content
+                for content in map(
+                    self.content.content_by_id, ids.group(1).split(",")
+                )
+                if content is not None
+            ]
+            return {"results": results, "size": len(results), "_links": {}}
+
+        match = re.search(r'space = "([^"]+)"', cql)
+        space_index = self.content.space_index(match.group(1) if match else "")
+        if space_index is None:
+            return {"results": [], "size": 0, "_links": {}}
+
+        found: List[Callable[[], Dict[str, Any]]]
+        if "type = attachment" in cql:
+            found = [
+                partial(self.content.attachment, space_index, i)
+                for i in range(self.options.attachments)
+            ]
+        else:
+            found = self.content.find_content(space_index, cql)
+
+        start, end, links = _paginate(path, query, len(found), 25)
+        return {
+            "results": [generate() for generate in found[start:end]],
+            "start": start,
+            "limit": end - start,
+            "size": end - start,
+            "_links": links,
+        }
+
+    def _download(
+        self, path: str, query: Dict[str, str], **params: str
+    ) -> Optional[bytes]:
+        # pylint: disable=unused-argument
+        return self.content.attachment_data(params["id"], params["name"])
+
+    def _analytics(
+        self, path: str, query: Dict[str, str], **params: str
+    ) -> Optional[Dict[str, Any]]:
+        # pylint: disable=unused-argument
+        if not self.options.analytics:
+            return None
+        count = self.content.views(params["id"], params["type"])
+        return None if count is None else {"count": count}
+
+    def _search(
+        self, path: str, query: Dict[str, str], **params: str
+    ) -> Dict[str, Any]:
+        # pylint: disable=unused-argument
+        match = re.search(r'space = "([^"]+)"', query.get("cql", ""))
+        space_index = self.content.space_index(match.group(1) if match else "")
+        if space_index is None or not self.options.pages:
+            return {"results": [], "totalSize": 0}
+
+        page = self.content.page(space_index, self.options.pages - 1)
+        last_modified = page["history"]["lastUpdated"]["when"]
+        return {
+            "results": [{"content": page, "lastModified": last_modified}],
+            "totalSize": self.options.pages,
+        }
+
+    def start(self) -> "FakeConfluenceServer":
+        """Start serving requests in a background thread.
+
+        Returns:
+            FakeConfluenceServer: The server itself.
+        """
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="fake-confluence", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server and release its socket."""
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
+
+    def __enter__(self) -> "FakeConfluenceServer":
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
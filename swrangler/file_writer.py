@@ -0,0 +1,200 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Writing of exported files with configurable durability.
+
+By default files are written in place and left to the operating system to
+flush, which is the fastest option. Atomic writes go to a temporary file
+renamed over the target, so readers never see partially written files.
+The ``batch`` and ``full`` durability levels also flush files to disk,
+either in batches or one by one, so that an export that completed
+survives a crash of the machine.
+"""
+
+import logging
+import os
+import threading
+from typing import List, Set
+
+from swrangler.metrics import metrics
+
+logger = logging.getLogger("swrangler")
+
+
+class FileWriter:
+    """Writer of exported files.
+
+    The writer is thread-safe. Use it as a context manager, or call
+    :meth:`flush`, to flush the last batch of files.
+
+    Attributes:
+        durability (str): ``none`` to leave flushing to the operating
+            system, ``batch`` to flush files in batches or ``full`` to
+            flush every file before the next one is written.
+        atomic (bool): Whether files are written to a temporary file which
+            is renamed over the target. Implied by durable writes.
+        batch_size (int): Number of files flushed together with the
+            ``batch`` durability.
+    """
+
+    DURABILITIES = ("none", "batch", "full")
+
+    def __init__(
+        self,
+        durability: str = "none",
+        atomic: bool = False,
+        batch_size: int = 512,
+    ) -> None:
+        """Initialize the FileWriter.
+
+        Args:
+            durability (str, optional): ``none``, ``batch`` or ``full``
+                (default is none).
+            atomic (bool, optional): Whether to write files atomically
+                (default is False, unless the durability is not none).
+            batch_size (int, optional): Number of files flushed together
+                with the ``batch`` durability (default is 512).
+
+        Raises:
+            ValueError: If the durability is unknown.
+        """
+        if durability not in self.DURABILITIES:
+            raise ValueError(
+                f"durability must be one of {', '.join(self.DURABILITIES)}."
+            )
+
+        self.durability = durability
+        self.atomic = atomic or durability != "none"
+        self.batch_size = batch_size
+        self._pending: List[str] = []
+        self._lock = threading.Lock()
+
+    def write(self, file_path: str, data: bytes) -> int:
+        """Write a file.
+
+        Existing hard links and symbolic links, e.g. left by an export with
+        deduplication, are replaced instead of written through.
+
+        Args:
+            file_path (str): Path of the file.
+            data (bytes): Content of the file.
+
+        Returns:
+            int: Number of bytes written.
+        """
+        if not self.atomic:
+            if os.path.islink(file_path) or (
+                os.path.exists(file_path) and os.stat(file_path).st_nlink > 1
+            ):
+                os.remove(file_path)
+            with open(file_path, "wb") as file:
+                size = file.write(data)
+            self.written(file_path)
+            return size
+
+        tmp_path = f"{file_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as file:
+                size = file.write(data)
+                if self.durability == "full":
+                    file.flush()
+                    _fsync(file.fileno())
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if self.durability == "full":
+            _fsync_directory(os.path.dirname(file_path))
+        elif self.durability == "batch":
+            self._add_pending(file_path)
+        return size
+
+    def written(self, file_path: str) -> None:
+        """Flush a file written by other means according to the durability.
+
+        Args:
+            file_path (str): Path of the file.
+        """
+        if self.durability == "full":
+            _fsync_path(file_path)
+            _fsync_directory(os.path.dirname(file_path))
+        elif self.durability == "batch":
+            self._add_pending(file_path)
+
+    def _add_pending(self, file_path: str) -> None:
+        """Add a file to the batch, flushing the batch once it is full."""
+        with self._lock:
+            self._pending.append(file_path)
+            if len(self._pending) < self.batch_size:
+                return
+            batch, self._pending = self._pending, []
+
+        _fsync_batch(batch)
+
+    def flush(self) -> None:
+        """Flush the files written since the last batch."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        _fsync_batch(batch)
+
+    def __enter__(self) -> "FileWriter":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.flush()
+
+
+def _fsync(fd: int) -> None:
+    """Flush a file descriptor to disk."""
+    with metrics.stage("fsync"):
+        os.fsync(fd)
+    metrics.increment("fsyncs")
+
+
+def _fsync_path(file_path: str) -> None:
+    """Flush a file to disk."""
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        _fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_directory(directory: str) -> None:
+    """Flush the entries of a directory to disk, where supported."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return  # E.g. on Windows, where renames are durable once done.
+    fd = os.open(directory or ".", os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        _fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_batch(file_paths: List[str]) -> None:
+    """Flush files and then, once each, their directories to disk."""
+    if not file_paths:
+        return
+
+    directories: Set[str] = set()
+    for file_path in file_paths:
+        if os.path.exists(file_path):
+            _fsync_path(file_path)
+        directories.add(os.path.dirname(file_path))
+    for directory in sorted(directories):
+        _fsync_directory(directory)
+    logger.debug(f"Flushed {len(file_paths)} files to disk")
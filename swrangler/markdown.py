@@ -0,0 +1,534 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Conversion of Confluence storage format to Markdown.
+
+Page bodies are converted in a single pass of an event driven parser, with
+no document tree built in between. Headings, paragraphs, lists, task lists,
+tables, links, images, inline formatting, code blocks and the info, note,
+tip, warning and panel macros are converted; the parameters of other
+macros are dropped and their bodies converted like the rest of the page.
+"""
+
+import html
+import re
+from functools import partial
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote, quote_plus
+
+Attributes = Dict[str, Optional[str]]
+
+# CDATA sections, e.g. the bodies of code blocks.
+_CDATA = re.compile(r"<!\[CDATA\[(.*?)\]\]>", re.DOTALL)
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Characters of text which Markdown would take for inline formatting.
+_INLINE_SPECIAL = re.compile(r"([\\`*_~\[\]<])")
+
+# Text at the start of a line which Markdown would take for a block, e.g. a
+# heading, a quote, a list item or a thematic break.
+_BLOCK_START = re.compile(r"^(?:[#>+=-]|(\d+)([.)])(?=\s|$))")
+
+# Tags whose content is dropped.
+_SKIPPED_TAGS = frozenset(
+    {"ac:parameter", "ac:placeholder", "ac:task-id", "script", "style"}
+)
+
+# Tags separating blocks, only separating words inside table cells.
+_BLOCK_TAGS = frozenset(
+    {
+        "ac:layout-cell",
+        "ac:layout-section",
+        "ac:task-list",
+        "ac:task",
+        "blockquote",
+        "br",
+        "div",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+        "hr",
+        "li",
+        "ol",
+        "p",
+        "pre",
+        "section",
+        "ul",
+    }
+)
+
+_CODE_MACROS = frozenset({"code", "noformat"})
+
+_QUOTE_MACROS = frozenset({"info", "note", "panel", "tip", "warning"})
+
+_INLINE_MARKERS = {
+    "b": "**",
+    "del": "~~",
+    "em": "*",
+    "i": "*",
+    "s": "~~",
+    "strong": "**",
+}
+
+# Indentation of nested list items.
+_LIST_INDENT = "    "
+
+
+def _escape_line(text: str) -> str:
+    """Escape text at the start of a line which would start a block."""
+    return _BLOCK_START.sub(
+        lambda match: (
+            f"{match.group(1)}\\{match.group(2)}"
+            if match.group(1)
+            else f"\\{match.group(0)}"
+        ),
+        text,
+        count=1,
+    )
+
+
+def _table_row(cells: List[str]) -> str:
+    """Format the cells of a table row."""
+    return f"| {' | '.join(cells)} |"
+
+
+def _format_table(rows: List[List[str]]) -> str:
+    """Format a table, the first row being its header."""
+    rows = [row for row in rows if row]
+    if not rows:
+        return ""
+
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    lines = [_table_row(rows[0]), _table_row(["---"] * width)]
+    lines.extend(_table_row(row) for row in rows[1:])
+    return "\n".join(lines)
+
+
+class _MarkdownParser(HTMLParser):
+    """Parser writing Markdown as the tags of a page body are read."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, base_url: str = "", space_key: str = "") -> None:
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.space_key = space_key
+        self.blocks: List[str] = []
+        self._lines: List[str] = []
+        self._inline: List[str] = []
+        self._skip = 0
+        self._heading = 0
+        self._quotes = 0
+        # Number of the next item of each open list, 0 if unordered.
+        self._lists: List[int] = []
+        # Indentation of the paragraphs of the current item of each list.
+        self._continuations: List[str] = []
+        self._marker = ""
+        self._code_span = False
+        self._macros: List[str] = []
+        self._code: Optional[List[str]] = None
+        self._language = ""
+        self._param: Optional[List[str]] = None
+        self._tables = 0
+        self._rows: List[List[str]] = []
+        self._in_cell = False
+        # Text preceding each open link or image and its target.
+        self._refs: List[Tuple[List[str], Dict[str, str]]] = []
+
+        self._starts: Dict[str, Callable[[Attributes], None]] = {
+            "a": self._start_ref,
+            "ac:image": self._start_ref,
+            "ac:link": self._start_ref,
+            "ac:parameter": self._start_parameter,
+            "ac:structured-macro": self._start_macro,
+            "ac:task": self._start_task,
+            "ac:task-list": partial(self._start_list, False),
+            "ac:task-status": self._start_status,
+            "blockquote": self._start_quote,
+            "br": lambda _: self._flush_line(),
+            "hr": self._hr,
+            "img": self._img,
+            "li": self._start_item,
+            "ol": partial(self._start_list, True),
+            "pre": self._start_code,
+            "ri:attachment": partial(self._ref, "title", "ri:filename"),
+            "ri:page": self._page_ref,
+            "ri:url": partial(self._ref, "href", "ri:value"),
+            "table": self._start_table,
+            "td": self._start_cell,
+            "th": self._start_cell,
+            "tr": self._start_row,
+            "ul": partial(self._start_list, False),
+        }
+        self._ends: Dict[str, Callable[[], None]] = {
+            "a": self._end_link,
+            "ac:image": self._end_image,
+            "ac:link": self._end_link,
+            "ac:parameter": self._end_parameter,
+            "ac:structured-macro": self._end_macro,
+            "ac:task": self._flush_line,
+            "ac:task-list": self._end_list,
+            "ac:task-status": self._end_status,
+            "blockquote": self._end_quote,
+            "li": self._flush_line,
+            "ol": self._end_list,
+            "pre": self._end_code,
+            "table": self._end_table,
+            "td": self._end_cell,
+            "th": self._end_cell,
+            "ul": self._end_list,
+        }
+        for tag in _SKIPPED_TAGS - {"ac:parameter"}:
+            self._starts[tag] = self._start_skip
+        for tag in ("div", "p", "section"):
+            self._starts[tag] = self._ends[tag] = self._break
+        for tag in ("ac:layout-cell", "ac:layout-section"):
+            self._starts[tag] = self._ends[tag] = self._break
+        for level in range(1, 7):
+            self._starts[f"h{level}"] = partial(self._start_heading, level)
+            self._ends[f"h{level}"] = partial(self._start_heading, 0)
+        for tag, marker in _INLINE_MARKERS.items():
+            self._starts[tag] = partial(self._mark, marker)
+            self._ends[tag] = partial(self._mark, marker, {})
+        self._starts["code"] = partial(self._mark_code, True)
+        self._ends["code"] = partial(self._mark_code, False, {})
+
+    def markdown(self) -> str:
+        """Get the Markdown of the parsed content."""
+        self._end_block()
+        return "\n\n".join(self.blocks)
+
+    def handle_starttag(
+        self, tag: str, attrs: List[Tuple[str, Optional[str]]]
+    ) -> None:
+        if self._skip:
+            if tag in _SKIPPED_TAGS:
+                self._skip += 1
+            return
+        if self._in_cell and tag in _BLOCK_TAGS:
+            self._inline.append(" ")
+            return
+
+        handler = self._starts.get(tag)
+        if handler is not None:
+            handler(dict(attrs))
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._skip:
+            if tag in _SKIPPED_TAGS:
+                self._skip -= 1
+            return
+        if self._in_cell and tag in _BLOCK_TAGS:
+            self._inline.append(" ")
+            return
+
+        handler = self._ends.get(tag)
+        if handler is not None:
+            handler()
+
+    def handle_data(self, data: str) -> None:
+        if self._skip:
+            return
+        if self._param is not None:
+            self._param.append(data)
+        elif self._code is not None:
+            self._code.append(data)
+        elif self._code_span:
+            self._inline.append(data)
+        else:
+            self._inline.append(_INLINE_SPECIAL.sub(r"\\\1", data))
+
+    def _flush_line(self) -> None:
+        """End the current line of text."""
+        text = _WHITESPACE.sub(" ", "".join(self._inline)).strip()
+        self._inline = []
+        if not text:
+            return
+
+        text = _escape_line(text)
+        if self._heading:
+            text = f"{'#' * self._heading} {text}"
+        if self._lists:
+            indent = _LIST_INDENT * (len(self._lists) - 1)
+            text = f"{indent}{self._marker or self._continuations[-1]}{text}"
+            self._marker = ""
+        self._lines.append(text)
+
+    def _end_block(self) -> None:
+        """End the current block of lines."""
+        self._flush_line()
+        if self._lines:
+            self._add_block("\n".join(self._lines))
+            self._lines = []
+
+    def _add_block(self, text: str) -> None:
+        """Add a block, quoted if inside a quote."""
+        if self._quotes:
+            prefix = "> " * self._quotes
+            text = "\n".join(
+                f"{prefix}{line}".rstrip() for line in text.split("\n")
+            )
+        self.blocks.append(text)
+
+    def _break(self, _: Optional[Attributes] = None) -> None:
+        """Handle the start or end of a paragraph."""
+        if self._lists:
+            self._flush_line()
+        else:
+            self._end_block()
+
+    def _start_skip(self, _: Attributes) -> None:
+        self._skip += 1
+
+    def _start_heading(
+        self, level: int, _: Optional[Attributes] = None
+    ) -> None:
+        self._break()
+        self._heading = level
+
+    def _mark(self, marker: str, _: Attributes) -> None:
+        if self._code is None:
+            self._inline.append(marker)
+
+    def _mark_code(self, start: bool, attrs: Attributes) -> None:
+        self._mark("`", attrs)
+        self._code_span = start
+
+    def _hr(self, _: Attributes) -> None:
+        self._end_block()
+        self._add_block("---")
+
+    def _img(self, attrs: Attributes) -> None:
+        if attrs.get("src"):
+            alt = attrs.get("alt") or ""
+            self._inline.append(f"![{alt}]({attrs['src']})")
+
+    def _start_quote(self, _: Optional[Attributes] = None) -> None:
+        self._end_block()
+        self._quotes += 1
+
+    def _end_quote(self) -> None:
+        self._end_block()
+        self._quotes = max(self._quotes - 1, 0)
+
+    def _start_list(self, ordered: bool, _: Attributes) -> None:
+        if self._lists:
+            self._flush_line()
+        else:
+            self._end_block()
+        self._lists.append(1 if ordered else 0)
+        self._continuations.append("  ")
+
+    def _end_list(self) -> None:
+        self._flush_line()
+        if self._lists:
+            self._lists.pop()
+            self._continuations.pop()
+        if not self._lists:
+            self._end_block()
+
+    def _start_item(self, _: Attributes) -> None:
+        self._flush_line()
+        if not self._lists:
+            self._lists.append(0)
+            self._continuations.append("  ")
+
+        number = self._lists[-1]
+        if number:
+            self._marker = f"{number}. "
+            self._lists[-1] += 1
+        else:
+            self._marker = "- "
+        # Paragraphs of the item are aligned with its text, or they would
+        # fall out of the list.
+        self._continuations[-1] = " " * len(self._marker)
+
+    def _start_task(self, attrs: Attributes) -> None:
+        self._start_item(attrs)
+        self._marker = "- [ ] "
+
+    def _start_status(self, _: Attributes) -> None:
+        self._param = []
+
+    def _end_status(self) -> None:
+        if self._param is not None and "".join(self._param) == "complete":
+            self._marker = "- [x] "
+        self._param = None
+
+    def _start_macro(self, attrs: Attributes) -> None:
+        name = attrs.get("ac:name") or ""
+        self._macros.append(name)
+        if name in _CODE_MACROS:
+            self._start_code(attrs)
+        elif name in _QUOTE_MACROS:
+            self._start_quote()
+
+    def _end_macro(self) -> None:
+        name = self._macros.pop() if self._macros else ""
+        if name in _CODE_MACROS:
+            self._end_code()
+        elif name in _QUOTE_MACROS:
+            self._end_quote()
+
+    def _start_parameter(self, attrs: Attributes) -> None:
+        if self._code is not None and attrs.get("ac:name") == "language":
+            self._param = []
+        else:
+            self._skip += 1
+
+    def _end_parameter(self) -> None:
+        if self._param is not None:
+            self._language = "".join(self._param).strip()
+            self._param = None
+
+    def _start_code(self, _: Attributes) -> None:
+        self._code = []
+        self._language = ""
+
+    def _end_code(self) -> None:
+        if self._code is None:
+            return
+        code = "".join(self._code).strip("\n")
+        self._code = None
+        if self._in_cell:
+            self._inline.append(f" `{code}` ")
+            return
+
+        fence = "```"
+        while fence in code:
+            fence += "`"
+        self._end_block()
+        self._add_block(f"{fence}{self._language}\n{code}\n{fence}")
+
+    def _start_table(self, _: Attributes) -> None:
+        self._tables += 1
+        if self._tables == 1:
+            self._end_block()
+            self._rows = []
+        else:
+            self._inline.append(" ")
+
+    def _end_table(self) -> None:
+        self._tables = max(self._tables - 1, 0)
+        if self._tables:
+            return
+
+        self._inline = []
+        table = _format_table(self._rows)
+        if table:
+            self._add_block(table)
+
+    def _start_row(self, _: Attributes) -> None:
+        if self._tables == 1:
+            self._rows.append([])
+
+    def _start_cell(self, _: Attributes) -> None:
+        if self._tables != 1:
+            self._inline.append(" ")
+            return
+        self._inline = []
+        self._in_cell = True
+
+    def _end_cell(self) -> None:
+        if self._tables != 1:
+            self._inline.append(" ")
+            return
+
+        text = _WHITESPACE.sub(" ", "".join(self._inline)).strip()
+        if not self._rows:
+            self._rows.append([])
+        self._rows[-1].append(text.replace("|", "\\|"))
+        self._inline = []
+        self._in_cell = False
+
+    def _start_ref(self, attrs: Attributes) -> None:
+        href = attrs.get("href")
+        target = {"href": href} if href else {}
+        self._refs.append((self._inline, target))
+        self._inline = []
+
+    def _ref(self, key: str, attribute: str, attrs: Attributes) -> None:
+        value = attrs.get(attribute)
+        if self._refs and value:
+            self._refs[-1][1].setdefault(key, value)
+
+    def _page_ref(self, attrs: Attributes) -> None:
+        title = attrs.get("ri:content-title")
+        space_key = attrs.get("ri:space-key") or self.space_key
+        # A page inside an attachment is only where the attachment lives.
+        if not self._refs or not title or "title" in self._refs[-1][1]:
+            return
+        self._refs[-1][1]["title"] = title
+        if space_key:
+            self._refs[-1][1].setdefault(
+                "href",
+                f"{self.base_url}/display/{quote(space_key)}/"
+                f"{quote_plus(title)}",
+            )
+
+    def _end_link(self) -> None:
+        if not self._refs:
+            return
+        text = _WHITESPACE.sub(" ", "".join(self._inline)).strip()
+        self._inline, target = self._refs.pop()
+        href = target.get("href", "")
+        text = text or _INLINE_SPECIAL.sub(r"\\\1", target.get("title", ""))
+        text = text or href
+        self._inline.append(f"[{text}]({href})" if href and text else text)
+
+    def _end_image(self) -> None:
+        if not self._refs:
+            return
+        self._inline, target = self._refs.pop()
+        source = target.get("href") or target.get("title")
+        if source:
+            self._inline.append(f"![{target.get('title', '')}]({source})")
+
+
+def format_markdown(
+    storage: Optional[str], base_url: str = "", space_key: str = ""
+) -> str:
+    """Convert a page body in Confluence storage format to Markdown.
+
+    Text is escaped where Markdown would take it for formatting. Links to
+    other pages point to the pages in Confluence.
+
+    Args:
+        storage (Optional[str]): Page body in storage format.
+        base_url (str, optional): URL of the Confluence wiki the links to
+            pages are resolved against (default is empty, links relative to
+            the wiki).
+        space_key (str, optional): Key of the space of the page, which
+            links to pages without a space refer to (default is empty, such
+            links keep only their text).
+
+    Returns:
+        str: The Markdown.
+    """
+    parser = _MarkdownParser(base_url, space_key)
+    parser.feed(
+        _CDATA.sub(
+            lambda match: html.escape(match.group(1), quote=False),
+            storage or "",
+        )
+    )
+    parser.close()
+    return parser.markdown()
@@ -0,0 +1,302 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Database of metadata shared across spaces and runs.
+
+The metadata commands write one CSV file per space, so questions about many
+spaces, e.g. which owners are unlicensed across the whole site, need every
+file to be loaded. This module upserts the same metadata into indexed
+tables of a single SQLite file instead, so such questions become SQL
+queries.
+
+Rows are keyed by the Confluence site and the IDs of spaces, pages and
+owners, so repeated runs update them in place. Rows which are no longer
+returned by Confluence, such as deleted pages, are removed once all rows of
+their space have been written.
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from itertools import islice
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from swrangler.metrics import metrics
+
+logger = logging.getLogger("swrangler")
+
+# Key and value columns of the tables, apart from the site and the time the
+# rows were last written, which are filled in by the database.
+TABLES: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "spaces": (
+        ("space_key",),
+        (
+            "name",
+            "type",
+            "created_by",
+            "created_at",
+            "url",
+            "owner",
+            "page_count",
+            "last_activity",
+        ),
+    ),
+    "pages": (
+        ("page_id",),
+        (
+            "space_key",
+            "title",
+            "path",
+            "created_at",
+            "last_updated",
+            "last_editor",
+            "owner",
+            "title_in_english",
+            "content_in_english",
+            "viewers",
+            "views",
+            "url",
+        ),
+    ),
+    "owners": (
+        ("space_key", "owner"),
+        (
+            "unlicensed",
+            "pages_owned",
+            "last_contribution",
+            "url",
+        ),
+    ),
+}
+
+# Analytics counts which could not be fetched are unknown rather than
+# cleared, other columns are always written as they are.
+ANALYTICS_COLUMNS = ("viewers", "views")
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS spaces ("
+    "site TEXT NOT NULL, "
+    "space_key TEXT NOT NULL, "
+    "name TEXT, "
+    "type TEXT, "
+    "created_by TEXT, "
+    "created_at TEXT, "
+    "url TEXT, "
+    "owner TEXT, "
+    "page_count INTEGER, "
+    "last_activity TEXT, "
+    "updated_at REAL NOT NULL, "
+    "PRIMARY KEY (site, space_key))",
+    "CREATE TABLE IF NOT EXISTS pages ("
+    "site TEXT NOT NULL, "
+    "page_id TEXT NOT NULL, "
+    "space_key TEXT NOT NULL, "
+    "title TEXT, "
+    "path TEXT, "
+    "created_at TEXT, "
+    "last_updated TEXT, "
+    "last_editor TEXT, "
+    "owner TEXT, "
+    "title_in_english INTEGER, "
+    "content_in_english INTEGER, "
+    "viewers INTEGER, "
+    "views INTEGER, "
+    "url TEXT, "
+    "updated_at REAL NOT NULL, "
+    "PRIMARY KEY (site, page_id))",
+    "CREATE INDEX IF NOT EXISTS pages_space ON pages (site, space_key)",
+    "CREATE INDEX IF NOT EXISTS pages_owner ON pages (site, owner)",
+    "CREATE INDEX IF NOT EXISTS pages_last_updated "
+    "ON pages (site, last_updated)",
+    "CREATE TABLE IF NOT EXISTS owners ("
+    "site TEXT NOT NULL, "
+    "space_key TEXT NOT NULL, "
+    "owner TEXT NOT NULL, "
+    "unlicensed INTEGER, "
+    "pages_owned INTEGER, "
+    "last_contribution TEXT, "
+    "url TEXT, "
+    "updated_at REAL NOT NULL, "
+    "PRIMARY KEY (site, space_key, owner))",
+    "CREATE INDEX IF NOT EXISTS owners_owner ON owners (site, owner)",
+)
+
+
+def _upsert_sql(table: str) -> str:
+    """Build the statement inserting or updating a row of a table.
+
+    Analytics counts which are unknown in the new row, as they could not be
+    fetched, keep the counts written by earlier runs. Other values are
+    replaced, even by NULL.
+    """
+    keys, values = TABLES[table]
+    columns = ("site", *keys, *values, "updated_at")
+    updates = ", ".join(
+        (
+            f"{column} = COALESCE(excluded.{column}, {column})"
+            if column in ANALYTICS_COLUMNS
+            else f"{column} = excluded.{column}"
+        )
+        for column in values
+    )
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT (site, {', '.join(keys)}) DO UPDATE SET {updates}, "
+        "updated_at = excluded.updated_at"
+    )
+
+
+class MetadataDB:
+    """SQLite database of spaces, pages, owners and analytics.
+
+    Attributes:
+        db_path (str): Path to the SQLite file.
+        site (str): The Confluence site the metadata belongs to.
+        batch_size (int): Number of rows written in one transaction.
+    """
+
+    BATCH_SIZE: int = 500
+
+    def __init__(
+        self, db_path: str, site: str, batch_size: int = BATCH_SIZE
+    ) -> None:
+        """Open the database, creating the SQLite file if needed.
+
+        Args:
+            db_path (str): Path to the SQLite file.
+            site (str): The Confluence site the metadata belongs to.
+            batch_size (int, optional): Number of rows written in one
+                transaction (default is 500).
+        """
+        self.db_path = db_path
+        self.site = site
+        self.batch_size = batch_size
+
+        os.makedirs(os.path.dirname(db_path) or os.curdir, exist_ok=True)
+
+        # Runs exporting different spaces may share the database, so wait
+        # for their writes instead of failing.
+        self._connection = sqlite3.connect(db_path, timeout=30)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.executescript(";\n".join(SCHEMA))
+
+    def upsert(self, table: str, records: Iterable[Dict[str, Any]]) -> int:
+        """Insert or update rows of a table.
+
+        Records are written in batches, each in a single transaction, so
+        that they are never all held in memory.
+
+        Args:
+            table (str): Name of the table: spaces, pages or owners.
+            records (Iterable[dict]): Rows keyed by column names. Missing
+                columns are written as NULL, apart from analytics counts
+                which keep their known values.
+
+        Returns:
+            int: Number of rows written.
+        """
+        keys, values = TABLES[table]
+        sql = _upsert_sql(table)
+        rows = (
+            (
+                self.site,
+                *(record[column] for column in keys),
+                *(record.get(column) for column in values),
+            )
+            for record in records
+        )
+
+        count = 0
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            now = time.time()
+            with metrics.stage("db_write"), self._connection:
+                self._connection.executemany(
+                    sql, [(*row, now) for row in batch]
+                )
+            count += len(batch)
+
+        metrics.increment("rows_upserted", count)
+        return count
+
+    def delete(self, table: str, records: Iterable[Dict[str, Any]]) -> int:
+        """Delete rows of a table.
+
+        Args:
+            table (str): Name of the table: spaces, pages or owners.
+            records (Iterable[dict]): Keys of the rows keyed by column
+                names.
+
+        Returns:
+            int: Number of rows deleted.
+        """
+        keys, _ = TABLES[table]
+        condition = " AND ".join(f"{column} = ?" for column in keys)
+        with self._connection:
+            cursor = self._connection.executemany(
+                f"DELETE FROM {table} WHERE site = ? AND {condition}",
+                (
+                    (self.site, *(record[column] for column in keys))
+                    for record in records
+                ),
+            )
+        return cursor.rowcount
+
+    def replace(
+        self,
+        table: str,
+        records: Iterable[Dict[str, Any]],
+        space_key: Optional[str] = None,
+    ) -> int:
+        """Upsert all rows of a table, or of a space, removing the others.
+
+        Args:
+            table (str): Name of the table: spaces, pages or owners.
+            records (Iterable[dict]): All rows of the table or the space.
+            space_key (Optional[str], optional): The key of the space the
+                rows belong to (default is None, the rows of all spaces).
+
+        Returns:
+            int: Number of rows written.
+        """
+        started = time.time()
+        count = self.upsert(table, records)
+
+        sql = f"DELETE FROM {table} WHERE site = ? AND updated_at < ?"
+        params: Tuple[Any, ...] = (self.site, started)
+        if space_key is not None:
+            sql += " AND space_key = ?"
+            params += (space_key,)
+        with self._connection:
+            removed = self._connection.execute(sql, params).rowcount
+
+        if removed:
+            logger.info(f"Removed {removed} stale rows from {table}")
+        logger.info(f"Metadata database updated: {self.db_path}")
+        return count
+
+    def close(self) -> None:
+        """Close the database."""
+        self._connection.close()
+
+    def __enter__(self) -> "MetadataDB":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
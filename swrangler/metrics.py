@@ -0,0 +1,292 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Instrumentation of swrangler commands.
+
+This module provides a process-wide registry of counters and per-stage
+timings, and writers which emit its contents as a JSON summary or as a
+Prometheus textfile.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+if TYPE_CHECKING:  # Importing requests doubles the startup time of the CLI.
+    import requests
+
+logger = logging.getLogger("swrangler")
+
+# Upper bounds of the stage duration histogram buckets, in seconds.
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+
+class Metrics:
+    """Thread-safe registry of counters and stage timings.
+
+    A stage is a named step of a command, such as fetching pages or
+    writing files. Every time a stage runs its wall-clock time and the CPU
+    time of the running thread are accumulated, and its duration is added
+    to a histogram.
+
+    Worker processes collect their own metrics and send them back to the
+    parent with :meth:`drain`, where they are combined with :meth:`merge`.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty Metrics registry."""
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        self._stages: Dict[str, Dict[str, Any]] = {}
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Increase a counter.
+
+        Args:
+            name (str): Name of the counter.
+            value (int, optional): Amount to add (default is 1).
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, wall_time: float, cpu_time: float) -> None:
+        """Record a single run of a stage.
+
+        Args:
+            name (str): Name of the stage.
+            wall_time (float): Wall-clock time of the run in seconds.
+            cpu_time (float): CPU time of the run in seconds.
+        """
+        with self._lock:
+            stage = self._stages.setdefault(name, _empty_stage())
+            stage["count"] += 1
+            stage["wall_time"] += wall_time
+            stage["cpu_time"] += cpu_time
+            for i, bound in enumerate(BUCKETS):
+                if wall_time <= bound:
+                    stage["buckets"][i] += 1
+                    break
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Measure the code run inside the context as a run of a stage.
+
+        Args:
+            name (str): Name of the stage.
+        """
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            self.observe(
+                name,
+                time.perf_counter() - start_wall,
+                time.thread_time() - start_cpu,
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get a copy of all collected metrics.
+
+        Returns:
+            dict: JSON serializable dictionary with ``counters`` and
+                ``stages`` keys.
+        """
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "stages": {
+                    name: dict(stage, buckets=list(stage["buckets"]))
+                    for name, stage in self._stages.items()
+                },
+            }
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """Add metrics collected elsewhere, e.g. in a worker process.
+
+        Args:
+            snapshot (dict): Metrics as returned by :meth:`snapshot`.
+        """
+        with self._lock:
+            for name, value in snapshot["counters"].items():
+                self._counters[name] = self._counters.get(name, 0) + value
+
+            for name, other in snapshot["stages"].items():
+                stage = self._stages.setdefault(name, _empty_stage())
+                stage["count"] += other["count"]
+                stage["wall_time"] += other["wall_time"]
+                stage["cpu_time"] += other["cpu_time"]
+                stage["buckets"] = [
+                    a + b for a, b in zip(stage["buckets"], other["buckets"])
+                ]
+
+    def reset(self) -> None:
+        """Discard all collected metrics."""
+        with self._lock:
+            self._counters = {}
+            self._stages = {}
+
+    def drain(self) -> Dict[str, Any]:
+        """Get all collected metrics and reset the registry.
+
+        Returns:
+            dict: Metrics as returned by :meth:`snapshot`.
+        """
+        snapshot = self.snapshot()
+        self.reset()
+        return snapshot
+
+
+def _empty_stage() -> Dict[str, Any]:
+    """Create the record of a stage that has not run yet."""
+    return {
+        "count": 0,
+        "wall_time": 0.0,
+        "cpu_time": 0.0,
+        "buckets": [0] * len(BUCKETS),
+    }
+
+
+metrics = Metrics()
+
+
+def record_response(  # pylint: disable=unused-argument
+    response: "requests.Response", *args: Any, **kwargs: Any
+) -> None:
+    """Count an HTTP response received from Confluence.
+
+    The signature allows using the function as a ``requests`` response
+    hook. The body of streamed responses is not read, their consumers
+    count the received bytes themselves.
+
+    Args:
+        response (requests.Response): The received response.
+        *args: Ignored positional arguments passed to hooks.
+        **kwargs: Keyword arguments passed to hooks, e.g. ``stream``.
+    """
+    metrics.increment("requests")
+    if not kwargs.get("stream"):
+        metrics.increment("bytes_received", len(response.content or b""))
+    if response.status_code == 429:
+        metrics.increment("rate_limited")
+    elif response.status_code >= 500:
+        metrics.increment("server_errors")
+
+
+def to_prometheus(snapshot: Dict[str, Any]) -> str:
+    """Format metrics in the Prometheus text exposition format.
+
+    Args:
+        snapshot (dict): Metrics as returned by :meth:`Metrics.snapshot`.
+
+    Returns:
+        str: Metrics in the Prometheus text format.
+    """
+    lines: List[str] = []
+
+    for name, value in sorted(snapshot["counters"].items()):
+        metric = f"swrangler_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+
+    stages = sorted(snapshot["stages"].items())
+    for field in ("wall_time", "cpu_time"):
+        metric = f"swrangler_stage_{field.replace('_time', '')}_seconds_total"
+        lines.append(f"# TYPE {metric} counter")
+        for name, stage in stages:
+            lines.append(f'{metric}{{stage="{name}"}} {stage[field]:.6f}')
+
+    metric = "swrangler_stage_duration_seconds"
+    lines.append(f"# TYPE {metric} histogram")
+    for name, stage in stages:
+        cumulative = 0
+        for bound, count in zip(BUCKETS, stage["buckets"]):
+            cumulative += count
+            lines.append(
+                f'{metric}_bucket{{stage="{name}",le="{bound}"}} {cumulative}'
+            )
+        lines.append(
+            f'{metric}_bucket{{stage="{name}",le="+Inf"}} {stage["count"]}'
+        )
+        lines.append(
+            f'{metric}_sum{{stage="{name}"}} {stage["wall_time"]:.6f}'
+        )
+        lines.append(f'{metric}_count{{stage="{name}"}} {stage["count"]}')
+
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomically(file_path: str, content: str) -> None:
+    """Write a file so that readers never see it partially written."""
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(content)
+    os.replace(tmp_path, file_path)
+
+
+def log_summary(snapshot: Dict[str, Any]) -> None:
+    """Log a short summary of the collected metrics.
+
+    Args:
+        snapshot (dict): Metrics as returned by :meth:`Metrics.snapshot`.
+    """
+    if not snapshot["stages"] and not snapshot["counters"]:
+        return
+
+    logger.info(
+        f"{'stage':<16} {'runs':>8} {'wall, s':>9} {'cpu, s':>9} "
+        f"{'runs/s':>9}"
+    )
+    for name, stage in sorted(snapshot["stages"].items()):
+        wall_time = stage["wall_time"]
+        rate = stage["count"] / wall_time if wall_time else 0.0
+        logger.info(
+            f"{name:<16} {stage['count']:>8} {wall_time:>9.3f} "
+            f"{stage['cpu_time']:>9.3f} {rate:>9.1f}"
+        )
+
+    counters = ", ".join(
+        f"{name}={value}" for name, value in sorted(snapshot["counters"].items())
+    )
+    if counters:
+        logger.info(f"Counters: {counters}")
+
+
+def emit(
+    json_file: Optional[str] = None, prometheus_file: Optional[str] = None
+) -> None:
+    """Log the collected metrics and save them to files.
+
+    Args:
+        json_file (Optional[str], optional): Path of the JSON summary
+            (default is None, do not save).
+        prometheus_file (Optional[str], optional): Path of the Prometheus
+            textfile (default is None, do not save).
+    """
+    snapshot = metrics.snapshot()
+    log_summary(snapshot)
+
+    if json_file is not None:
+        data = dict(snapshot, buckets=list(BUCKETS))
+        _write_atomically(json_file, json.dumps(data, indent=4) + "\n")
+        logger.info(f"Metrics saved to {json_file}")
+
+    if prometheus_file is not None:
+        _write_atomically(prometheus_file, to_prometheus(snapshot))
+        logger.info(f"Metrics saved to {prometheus_file}")
@@ -0,0 +1,152 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Content-addressed store of exported files.
+
+Files with identical content, such as pages created from the same template
+or logos attached to many pages, are stored once under the SHA-256 digest
+of their content. Every exported copy is a hard link to the stored object,
+or a symbolic link where hard links are not possible.
+"""
+
+import hashlib
+import logging
+import os
+import stat
+import threading
+
+from swrangler.metrics import metrics
+
+logger = logging.getLogger("swrangler")
+
+# Size of the blocks files are hashed in, in bytes.
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def _hash_file(file_path: str) -> str:
+    """Compute the SHA-256 digest of a file."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ObjectStore:
+    """Store of files keyed by the digest of their content.
+
+    Objects are read-only, so writing to an exported file, which shares the
+    object with other files, fails instead of changing all of them.
+
+    Attributes:
+        directory (str): Directory holding the objects.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """Initialize the ObjectStore.
+
+        Args:
+            directory (str): Directory holding the objects, created if
+                needed.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def object_path(self, digest: str) -> str:
+        """Get the path of an object.
+
+        Args:
+            digest (str): SHA-256 digest of the content of the object.
+
+        Returns:
+            str: Path of the object.
+        """
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def write(self, file_path: str, data: bytes) -> int:
+        """Write a file through the store.
+
+        Args:
+            file_path (str): Path of the exported file.
+            data (bytes): Content of the file.
+
+        Returns:
+            int: Number of bytes written to disk, 0 if the store already
+                held the content.
+        """
+        object_path = self.object_path(hashlib.sha256(data).hexdigest())
+        written = 0
+        if os.path.exists(object_path):
+            metrics.increment("objects_reused")
+        else:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            tmp_path = _tmp_path(object_path)
+            with open(tmp_path, "wb") as file:
+                written = file.write(data)
+            os.chmod(tmp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.replace(tmp_path, object_path)
+            metrics.increment("objects_written")
+
+        self._link(object_path, file_path)
+        return written
+
+    def adopt(self, file_path: str) -> bool:
+        """Move an existing file into the store and link it back.
+
+        Used for files which are too large to be held in memory, such as
+        downloaded attachments.
+
+        Args:
+            file_path (str): Path of the exported file.
+
+        Returns:
+            bool: True if the store already held the content and the file
+                was replaced by a link to it.
+        """
+        object_path = self.object_path(_hash_file(file_path))
+        duplicate = os.path.exists(object_path)
+        if duplicate:
+            metrics.increment("objects_reused")
+        else:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            os.chmod(file_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.replace(file_path, object_path)
+            metrics.increment("objects_written")
+
+        self._link(object_path, file_path)
+        return duplicate
+
+    def _link(self, object_path: str, file_path: str) -> None:
+        """Replace a file with a link to an object."""
+        if os.path.exists(file_path) and os.path.samefile(
+            object_path, file_path
+        ):
+            # Renaming a link over another link to the same file does
+            # nothing, so the temporary link would be left behind.
+            return
+
+        tmp_path = _tmp_path(file_path)
+        try:
+            os.link(object_path, tmp_path)
+        except OSError:
+            # E.g. the store and the file are on different file systems.
+            target = os.path.relpath(object_path, os.path.dirname(file_path))
+            os.symlink(target, tmp_path)
+        os.replace(tmp_path, file_path)
+
+
+def _tmp_path(file_path: str) -> str:
+    """Get a temporary path next to a file unique to the calling thread."""
+    return f"{file_path}.{os.getpid()}-{threading.get_ident()}.tmp"
@@ -24,8 +24,9 @@ import logging
 import os
 from collections import defaultdict
 from datetime import datetime
-from typing import Any, DefaultDict, Dict, List, Tuple
+from typing import Any, DefaultDict, Dict, Iterable, Optional, Tuple
 
+from swrangler.checkpoint import Checkpoint
 from swrangler.common import (
     check_unlicensed_or_deleted,
     format_date,
@@ -34,6 +35,8 @@ from swrangler.common import (
     people_url,
 )
 from swrangler.confluence import Confluence
+from swrangler.metadata_db import MetadataDB
+from swrangler.metrics import metrics
 
 logger = logging.getLogger("swrangler")
 
@@ -81,6 +84,32 @@ class OwnerMetadata:
             cls.OWNER_URL: data[cls.OWNER_URL],
         }
 
+    @classmethod
+    def to_record(
+        cls, owner: str, data: Dict[str, Any], space_key: str
+    ) -> Dict[str, Any]:
+        """Convert owner data to a row of the metadata database.
+
+        Args:
+            owner (str): Owner name.
+            data (dict): Owner data.
+            space_key (str): The key of the Confluence space.
+
+        Returns:
+            dict: Owner metadata keyed by database columns.
+        """
+        last_contribution = datetime.strptime(
+            data[cls.LAST_CONTRIBUTION], "%m/%d/%Y"
+        )
+        return {
+            "space_key": space_key,
+            "owner": owner,
+            "unlicensed": data[cls.UNLICENSED] == "TRUE",
+            "pages_owned": data[cls.PAGES_OWNED],
+            "last_contribution": last_contribution.strftime("%Y-%m-%d"),
+            "url": data[cls.OWNER_URL],
+        }
+
 
 def save_owners_to_csv(
     owner_data: Dict[str, Any],
@@ -105,24 +134,26 @@ def save_owners_to_csv(
         reverse=True,
     )
 
-    with open(csv_path, mode="w", encoding="utf-8", newline="") as file:
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        writer.writeheader()
+    with metrics.stage("write"):
+        with open(csv_path, mode="w", encoding="utf-8", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=fieldnames)
+            writer.writeheader()
 
-        for owner, data in sorted_data:
-            writer.writerow(OwnerMetadata.to_dict(owner, data))
+            for owner, data in sorted_data:
+                writer.writerow(OwnerMetadata.to_dict(owner, data))
+            metrics.increment("bytes_written", file.tell())
 
     logger.info(f"CSV file saved to {csv_path}")
 
 
 def process_pages(
-    pages: List[Dict[str, Any]],
+    pages: Iterable[Dict[str, Any]],
     owner_data: Dict[str, Any],
 ) -> None:
-    """Process a list of pages and update owner metadata.
+    """Process pages and update owner metadata.
 
     Args:
-        pages (list): List of Confluence pages.
+        pages (Iterable[dict]): Confluence pages.
         owner_data (dict): Dictionary to store owner metadata.
     """
     for page in pages:
@@ -151,26 +182,60 @@ def process_pages(
             )
 
 
-def export_owners_metadata(space_key: str, output_dir: str) -> None:
+def export_owners_metadata(
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    space_key: str,
+    output_dir: str,
+    spill_threshold: int = 0,
+    resume: bool = False,
+    api: str = "v1",
+    metadata_db: Optional[str] = None,
+) -> None:
     """Export metadata of page owners from a specified Confluence space.
 
     Args:
         space_key (str): The key of the Confluence space.
         output_dir (str): Directory to save the output files.
+        spill_threshold (int, optional): Number of pages kept in memory
+            before spilling them to a temporary file (default is 0, never
+            spill).
+        resume (bool, optional): Whether to continue from the checkpoint
+            left by an interrupted run (default is False).
+        api (str, optional): REST API version used to fetch pages (default
+            is v1).
+        metadata_db (Optional[str], optional): Path to the SQLite file the
+            metadata is upserted into as well (default is None).
     """
-    client = Confluence()
-
-    pages = client.get_all_pages_in_space(space_key)
-    owner_data: DefaultDict[str, Dict[str, Any]] = defaultdict(
-        lambda: {
-            OwnerMetadata.PAGES_OWNED: 0,
-            OwnerMetadata.LAST_CONTRIBUTION: "01/01/1970",
-            OwnerMetadata.OWNER_URL: "",
-        }
-    )
+    client = Confluence(api=api)
+
+    checkpoint = Checkpoint(output_dir, space_key, "owners-metadata")
+    # The journal holds the bodies of all pages, it is only worth writing
+    # when the run is meant to be resumed.
+    with checkpoint.start(resume, journal=resume):
+        pages = client.get_all_pages_in_space(
+            space_key, spill_threshold=spill_threshold, checkpoint=checkpoint
+        )
+        owner_data: DefaultDict[str, Dict[str, Any]] = defaultdict(
+            lambda: {
+                OwnerMetadata.PAGES_OWNED: 0,
+                OwnerMetadata.LAST_CONTRIBUTION: "01/01/1970",
+                OwnerMetadata.OWNER_URL: "",
+            }
+        )
 
-    process_pages(pages, owner_data)
-    save_owners_to_csv(owner_data, space_key, output_dir)
+        with metrics.stage("aggregate"):
+            process_pages(pages, owner_data)
+        save_owners_to_csv(owner_data, space_key, output_dir)
+        if metadata_db:
+            with MetadataDB(metadata_db, client.base_url) as db:
+                db.replace(
+                    "owners",
+                    (
+                        OwnerMetadata.to_record(owner, data, space_key)
+                        for owner, data in owner_data.items()
+                    ),
+                    space_key,
+                )
 
     logger.info(
         (
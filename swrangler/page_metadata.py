@@ -22,8 +22,24 @@ file.
 import csv
 import logging
 import os
-from typing import Any, Dict, List, Tuple
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import partial
+from typing import (
+    Any,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
+from swrangler.analytics_cache import AnalyticsCache
+from swrangler.checkpoint import Checkpoint
 from swrangler.common import (
     contains_cyrillic,
     format_date,
@@ -32,10 +48,45 @@ from swrangler.common import (
     path,
 )
 from swrangler.confluence import Confluence
+from swrangler.metadata_db import MetadataDB
+from swrangler.metrics import metrics
+from swrangler.retry import CircuitBreakerOptions
 
 logger = logging.getLogger("swrangler")
 
 
+@dataclass(frozen=True)
+class AnalyticsOptions:
+    """Configuration options for fetching page analytics.
+
+    Attributes:
+        deadline (Optional[float]): Time budget for fetching analytics of a
+            space, in seconds. Counts not fetched within the budget are left
+            empty. Default is None, no budget.
+        error_ratio (float): Ratio of failed analytics requests which stops
+            further requests for a while. Default is 0.5.
+        cache_path (Optional[str]): Path to the SQLite file caching counts
+            across runs. Default is None, no cache.
+        cache_ttl (float): Number of seconds a cached count stays fresh.
+            Default is one day.
+        cache_size (int): Maximum number of counts kept in the cache.
+            Default is 1000000.
+        top (Optional[int]): Number of most recently updated pages whose
+            counts are always fetched. Default is None, all pages.
+        sample (Optional[float]): Fraction of the other pages whose counts
+            are fetched as well. Default is None, none of them when ``top``
+            is set and all of them otherwise.
+    """
+
+    deadline: Optional[float] = None
+    error_ratio: float = 0.5
+    cache_path: Optional[str] = None
+    cache_ttl: float = 86400
+    cache_size: int = 1_000_000
+    top: Optional[int] = None
+    sample: Optional[float] = None
+
+
 class PageMetadata:
     """Constants for page metadata fields and utility methods."""
 
@@ -73,13 +124,99 @@ class PageMetadata:
         )
 
 
+def page_to_row(page: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a Confluence page to a row of the CSV file.
+
+    Args:
+        page (dict): Confluence page data.
+
+    Returns:
+        dict: Page metadata keyed by CSV fieldnames.
+    """
+    content = path(page, "body.storage.value")
+    content_is_english = not contains_cyrillic(content)
+    title_is_english = not contains_cyrillic(page["title"])
+    last_updated = path(page, "history.lastUpdated")
+    created_date = path(page, "history.createdDate")
+    owner_name = path(page, "history.ownedBy.displayName")
+
+    return {
+        PageMetadata.PAGE_ID: page["id"],
+        PageMetadata.PAGE_TITLE: get_structured_title(page),
+        PageMetadata.UNIQUE_VIEWERS: page.get("viewers", 0),
+        PageMetadata.TOTAL_VIEWS: page.get("views", 0),
+        PageMetadata.TITLE_IN_ENGLISH: title_is_english,
+        PageMetadata.CONTENT_IN_ENGLISH: content_is_english,
+        PageMetadata.CREATED_DATE: format_date(created_date),
+        PageMetadata.LAST_UPDATED_DATE: format_date(last_updated["when"]),
+        PageMetadata.LAST_EDITOR: path(last_updated, "by.displayName"),
+        PageMetadata.CURRENT_OWNER: owner_name,
+        PageMetadata.PAGE_URL: f"{os.getenv('CONFLUENCE_DOMAIN')}/wiki"
+        + path(page, "_links.webui"),
+    }
+
+
+def page_to_record(page: Dict[str, Any], space_key: str) -> Dict[str, Any]:
+    """Convert a Confluence page to a row of the metadata database.
+
+    Dates are kept in ISO format, so that they sort and compare in SQL.
+
+    Args:
+        page (dict): Confluence page data.
+        space_key (str): The key of the Confluence space.
+
+    Returns:
+        dict: Page metadata keyed by database columns.
+    """
+    last_updated = path(page, "history.lastUpdated")
+    content = path(page, "body.storage.value")
+
+    return {
+        "page_id": page["id"],
+        "space_key": space_key,
+        "title": page["title"],
+        "path": get_structured_title(page),
+        "created_at": path(page, "history.createdDate"),
+        "last_updated": last_updated["when"],
+        "last_editor": path(last_updated, "by.displayName"),
+        "owner": path(page, "history.ownedBy.displayName"),
+        "title_in_english": not contains_cyrillic(page["title"]),
+        "content_in_english": not contains_cyrillic(content),
+        "viewers": page.get("viewers"),
+        "views": page.get("views"),
+        "url": f"{os.getenv('CONFLUENCE_DOMAIN')}/wiki"
+        + path(page, "_links.webui"),
+    }
+
+
+def write_pages_csv(rows: List[Dict[str, Any]], csv_path: str) -> None:
+    """Write rows of page metadata, sorted by title, to a CSV file.
+
+    Args:
+        rows (List[dict]): Page metadata keyed by CSV fieldnames.
+        csv_path (str): Path of the CSV file.
+    """
+    rows.sort(key=lambda x: x[PageMetadata.PAGE_TITLE])
+
+    with metrics.stage("write"):
+        with open(csv_path, mode="w", encoding="utf-8", newline="") as file:
+            writer = csv.DictWriter(
+                file, fieldnames=PageMetadata.get_fieldnames()
+            )
+            writer.writeheader()
+            writer.writerows(rows)
+            metrics.increment("bytes_written", file.tell())
+
+    logger.info(f"CSV file saved to {csv_path}")
+
+
 def save_pages_to_csv(
-    pages: List[Dict[str, Any]], space_key: str, output_dir: str
+    pages: Iterable[Dict[str, Any]], space_key: str, output_dir: str
 ) -> None:
     """Save metadata of Confluence pages to a CSV file.
 
     Args:
-        pages (list): List of Confluence pages.
+        pages (Iterable[dict]): Confluence pages.
         space_key (str): The key of the Confluence space.
         output_dir (str): Directory to save the CSV file.
     """
@@ -88,66 +225,334 @@ def save_pages_to_csv(
 
     rows = []
     for page in pages:
-        content = path(page, "body.storage.value")
-        content_is_english = not contains_cyrillic(content)
-        title_is_english = not contains_cyrillic(page["title"])
-        last_updated = path(page, "history.lastUpdated")
-        created_date = path(page, "history.createdDate")
-        owner_name = path(page, "history.ownedBy.displayName")
-
-        rows.append(
-            {
-                PageMetadata.PAGE_ID: page["id"],
-                PageMetadata.PAGE_TITLE: get_structured_title(page),
-                PageMetadata.UNIQUE_VIEWERS: page.get("viewers", 0),
-                PageMetadata.TOTAL_VIEWS: page.get("views", 0),
-                PageMetadata.TITLE_IN_ENGLISH: title_is_english,
-                PageMetadata.CONTENT_IN_ENGLISH: content_is_english,
-                PageMetadata.CREATED_DATE: format_date(created_date),
-                PageMetadata.LAST_UPDATED_DATE: format_date(
-                    last_updated["when"]
-                ),
-                PageMetadata.LAST_EDITOR: path(last_updated, "by.displayName"),
-                PageMetadata.CURRENT_OWNER: owner_name,
-                PageMetadata.PAGE_URL: f"{os.getenv('CONFLUENCE_DOMAIN')}/wiki"
-                + path(page, "_links.webui"),
-            }
-        )
-
-    rows.sort(key=lambda x: x[PageMetadata.PAGE_TITLE])
+        with metrics.stage("render"):
+            rows.append(page_to_row(page))
 
-    with open(csv_path, mode="w", encoding="utf-8", newline="") as file:
-        writer = csv.DictWriter(file, fieldnames=PageMetadata.get_fieldnames())
-        writer.writeheader()
-        writer.writerows(rows)
+    write_pages_csv(rows, csv_path)
 
-    logger.info(f"CSV file saved to {csv_path}")
 
+def update_pages_csv(
+    pages: Iterable[Dict[str, Any]],
+    deleted: Collection[str],
+    space_key: str,
+    output_dir: str,
+) -> bool:
+    """Apply changes of pages to the CSV file of page metadata of a space.
 
-def export_pages_metadata(space_key: str, output_dir: str) -> None:
-    """Export metadata of pages from a specified Confluence space.
+    Rows of changed pages are replaced, keeping their analytics counts, and
+    rows of deleted pages are removed.
 
     Args:
+        pages (Iterable[dict]): Changed Confluence pages.
+        deleted (Collection[str]): IDs of deleted pages.
         space_key (str): The key of the Confluence space.
-        output_dir (str): Directory to save the output files.
+        output_dir (str): Directory the CSV file was saved to.
+
+    Returns:
+        bool: Whether the CSV file exists and was updated.
     """
-    client = Confluence()
+    csv_path = os.path.join(output_dir, space_key, "csv", "pages-metadata.csv")
+    if not os.path.exists(csv_path):
+        return False
+
+    with open(csv_path, encoding="utf-8", newline="") as file:
+        rows = {row[PageMetadata.PAGE_ID]: row for row in csv.DictReader(file)}
+
+    for page_id in deleted:
+        rows.pop(page_id, None)
+    for page in pages:
+        row = page_to_row(page)
+        previous = rows.get(page["id"])
+        if previous is not None:
+            for column in (
+                PageMetadata.UNIQUE_VIEWERS,
+                PageMetadata.TOTAL_VIEWS,
+            ):
+                row[column] = previous[column]
+        rows[page["id"]] = row
+
+    write_pages_csv(list(rows.values()), csv_path)
+    return True
 
-    pages = client.get_all_pages_in_space(space_key)
-    logger.info("Fetch analytics data for specified pages...")
 
-    content_ids = [page["id"] for page in pages]
+def add_analytics(
+    pages: Iterable[Dict[str, Any]],
+    viewers_counts: Dict[str, Optional[int]],
+    views_counts: Dict[str, Optional[int]],
+) -> Iterator[Dict[str, Any]]:
+    """Attach analytics counts to the pages.
 
-    viewers_counts = client.get_page_analytics(content_ids, "viewers")
+    Pages are updated lazily, one at a time, so that pages spilled to disk
+    are never loaded into memory all at once.
 
-    views_counts = client.get_page_analytics(content_ids, "views")
+    Args:
+        pages (Iterable[dict]): Confluence pages.
+        viewers_counts (dict): Unique viewers keyed by page ID.
+        views_counts (dict): Total views keyed by page ID.
 
+    Yields:
+        dict: Confluence page with ``viewers`` and ``views`` keys set.
+    """
     for page in pages:
         page_id = page["id"]
-        page["viewers"] = viewers_counts.get(page_id, 0)
-        page["views"] = views_counts.get(page_id, 0)
+        page["viewers"] = viewers_counts.get(page_id)
+        page["views"] = views_counts.get(page_id)
+        yield page
+
+
+def prioritize_pages(
+    pages: Iterable[Dict[str, Any]],
+    top: Optional[int] = None,
+    sample: Optional[float] = None,
+) -> List[str]:
+    """Select the pages to fetch analytics for, most important first.
+
+    Pages are ordered from the most to the least recently updated, so that
+    when the time budget runs out the counts of the pages people are most
+    likely to look at are already fetched. The sample is deterministic, so
+    that repeated runs select the same pages and can reuse cached counts.
+
+    Args:
+        pages (Iterable[dict]): Confluence pages.
+        top (Optional[int], optional): Number of most recently updated
+            pages always selected (default is None, all pages).
+        sample (Optional[float], optional): Fraction of the other pages
+            selected as well (default is None, none of them when ``top``
+            is set and all of them otherwise).
+
+    Returns:
+        list: IDs of the selected pages in the order of priority.
+    """
+    updated = [
+        (path(page, "history.lastUpdated.when") or "", page["id"])
+        for page in pages
+    ]
+    updated.sort(reverse=True)
+    content_ids = [content_id for _, content_id in updated]
+
+    if top is None:
+        top = 0 if sample is not None else len(content_ids)
+    if sample is None:
+        sample = 0.0
+
+    threshold = sample * 2**32
+    return content_ids[:top] + [
+        content_id
+        for content_id in content_ids[top:]
+        if zlib.crc32(content_id.encode()) < threshold
+    ]
+
+
+def fetch_analytics(  # pylint: disable=too-many-arguments
+    client: Confluence,
+    content_ids: List[str],
+    views_type: str,
+    checkpoint: Checkpoint,
+    *,
+    deadline: Optional[float] = None,
+    cache: Optional[AnalyticsCache] = None,
+) -> Dict[str, Optional[int]]:
+    """Fetch analytics counts not recorded in the checkpoint yet.
+
+    Counts recorded by a previous run are reused. Pages whose counts could
+    not be fetched before are requested again. With a cache, fresh cached
+    counts are used instead of requesting them, and expired cached counts
+    stand in for the counts which could not be fetched.
+
+    Args:
+        client (Confluence): Confluence client.
+        content_ids (list): List of Confluence page IDs.
+        views_type (str): The type of analytics (viewers or views).
+        checkpoint (Checkpoint): Journal of the command.
+        deadline (Optional[float], optional): Time, as returned by
+            ``time.time()``, after which no more requests are made
+            (default is None, no deadline).
+        cache (Optional[AnalyticsCache], optional): Cache of counts shared
+            across runs (default is None).
+
+    Returns:
+        dict: Analytics counts keyed by page ID.
+    """
+    counts = checkpoint.analytics.get(views_type, {})
+    missing = [
+        content_id
+        for content_id in content_ids
+        if counts.get(content_id) is None
+    ]
+
+    if missing and cache is not None:
+        cached = cache.get(views_type, missing)
+        if cached:
+            logger.info(f"Use {len(cached)} cached {views_type} counts")
+        checkpoint.record_analytics(views_type, dict(cached))
+        missing = [
+            content_id for content_id in missing if content_id not in cached
+        ]
+
+    if missing:
+        # Record counts as batches complete, so an interrupted run keeps
+        # them.
+        fetched = client.get_page_analytics(
+            missing,
+            views_type,
+            deadline,
+            callback=partial(checkpoint.record_analytics, views_type),
+        )
+        if cache is not None:
+            cache.put(views_type, fetched)
+            failed = [key for key, count in fetched.items() if count is None]
+            stale = cache.get(views_type, failed, max_age=float("inf"))
+            if stale:
+                logger.info(
+                    f"Use {len(stale)} expired cached {views_type} counts "
+                    "for pages which could not be fetched"
+                )
+                fetched.update(stale)
+        checkpoint.record_analytics(views_type, fetched)
+
+    return checkpoint.analytics.get(views_type, {})
+
+
+@contextmanager
+def open_cache(
+    client: Confluence, analytics: AnalyticsOptions
+) -> Iterator[Optional[AnalyticsCache]]:
+    """Open the analytics cache configured by the options.
+
+    Args:
+        client (Confluence): Confluence client the counts are fetched with.
+        analytics (AnalyticsOptions): Options for fetching page analytics.
+
+    Yields:
+        Optional[AnalyticsCache]: The cache, None if it is disabled.
+    """
+    if analytics.cache_path is None or analytics.cache_ttl <= 0:
+        yield None
+        return
+
+    with AnalyticsCache(
+        analytics.cache_path,
+        client.base_url,
+        ttl=analytics.cache_ttl,
+        max_entries=analytics.cache_size,
+    ) as cache:
+        yield cache
+
+
+def fetch_all_analytics(
+    client: Confluence,
+    pages: Iterable[Dict[str, Any]],
+    checkpoint: Checkpoint,
+    analytics: AnalyticsOptions,
+) -> Tuple[Dict[str, Optional[int]], Dict[str, Optional[int]]]:
+    """Fetch viewers and views of the pages selected by the options.
+
+    With a time budget, viewers may use up to half of it, so that there is
+    time left for views. Counts not fetched within the budget are left
+    empty.
+
+    Args:
+        client (Confluence): Confluence client.
+        pages (Iterable[dict]): Confluence pages.
+        checkpoint (Checkpoint): Journal of the command.
+        analytics (AnalyticsOptions): Options for fetching page analytics.
+
+    Returns:
+        tuple: Unique viewers and total views keyed by page ID.
+    """
+    content_ids = prioritize_pages(pages, analytics.top, analytics.sample)
+    logger.info(f"Fetch analytics data for {len(content_ids)} pages...")
+
+    viewers_deadline = views_deadline = None
+    if analytics.deadline is not None:
+        start = time.time()
+        viewers_deadline = start + analytics.deadline / 2
+        views_deadline = start + analytics.deadline
+
+    with open_cache(client, analytics) as cache:
+        viewers_counts = fetch_analytics(
+            client,
+            content_ids,
+            "viewers",
+            checkpoint,
+            deadline=viewers_deadline,
+            cache=cache,
+        )
+        views_counts = fetch_analytics(
+            client,
+            content_ids,
+            "views",
+            checkpoint,
+            deadline=views_deadline,
+            cache=cache,
+        )
+
+    return viewers_counts, views_counts
+
+
+def export_pages_metadata(
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    space_key: str,
+    output_dir: str,
+    spill_threshold: int = 0,
+    resume: bool = False,
+    analytics: Optional[AnalyticsOptions] = None,
+    api: str = "v1",
+    metadata_db: Optional[str] = None,
+) -> None:
+    """Export metadata of pages from a specified Confluence space.
+
+    Args:
+        space_key (str): The key of the Confluence space.
+        output_dir (str): Directory to save the output files.
+        spill_threshold (int, optional): Number of pages kept in memory
+            before spilling them to a temporary file (default is 0, never
+            spill).
+        resume (bool, optional): Whether to continue from the checkpoint
+            left by an interrupted run (default is False).
+        analytics (Optional[AnalyticsOptions], optional): Options for
+            fetching page analytics (default is None, the default options).
+        api (str, optional): REST API version used to fetch pages (default
+            is v1).
+        metadata_db (Optional[str], optional): Path to the SQLite file the
+            metadata is upserted into as well (default is None).
+    """
+    analytics = analytics or AnalyticsOptions()
+    client = Confluence(
+        breaker_options=CircuitBreakerOptions(
+            error_ratio=analytics.error_ratio
+        ),
+        api=api,
+    )
+
+    checkpoint = Checkpoint(output_dir, space_key, "pages-metadata")
+    # The journal holds the bodies of all pages, it is only worth writing
+    # when the run is meant to be resumed.
+    with checkpoint.start(resume, journal=resume):
+        pages = client.get_all_pages_in_space(
+            space_key, spill_threshold=spill_threshold, checkpoint=checkpoint
+        )
+        viewers_counts, views_counts = fetch_all_analytics(
+            client, pages, checkpoint, analytics
+        )
+        save_pages_to_csv(
+            add_analytics(pages, viewers_counts, views_counts),
+            space_key,
+            output_dir,
+        )
+        if metadata_db:
+            with MetadataDB(metadata_db, client.base_url) as db:
+                db.replace(
+                    "pages",
+                    (
+                        page_to_record(page, space_key)
+                        for page in add_analytics(
+                            pages, viewers_counts, views_counts
+                        )
+                    ),
+                    space_key,
+                )
 
-    save_pages_to_csv(pages, space_key, output_dir)
     logger.info(
         f"Metadata for {len(pages)} pages downloaded and saved to CSV\n"
     )
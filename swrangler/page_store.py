@@ -0,0 +1,205 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Storage for Confluence pages fetched from a space.
+
+This module provides a list-like container which keeps pages in memory up to
+a configurable threshold and spills them into a temporary SQLite database
+once the threshold is exceeded.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import weakref
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger("swrangler")
+
+
+def _remove_database(connection: sqlite3.Connection, db_path: str) -> None:
+    """Close the connection and remove the temporary database file."""
+    connection.close()
+    try:
+        os.remove(db_path)
+    except FileNotFoundError:
+        pass
+
+
+class PageStore:
+    """A list-like container for Confluence pages.
+
+    Pages are kept in memory until their number exceeds ``spill_threshold``.
+    After that all pages are moved into a temporary SQLite database and
+    decoded on demand, so iterating over a spilled store holds only a small
+    batch of pages in memory at a time. The temporary file is removed when
+    the store is closed or garbage collected.
+
+    Attributes:
+        spill_threshold (int): Number of pages kept in memory before spilling
+            to disk. Zero disables spilling.
+        directory (Optional[str]): Directory for the temporary database.
+            Defaults to the system temporary directory.
+    """
+
+    FETCH_SIZE: int = 100
+
+    def __init__(
+        self, spill_threshold: int = 0, directory: Optional[str] = None
+    ) -> None:
+        """Initialize an empty PageStore.
+
+        Args:
+            spill_threshold (int, optional): Number of pages kept in memory
+                before spilling to disk (default is 0, never spill).
+            directory (Optional[str], optional): Directory for the temporary
+                database (default is None, the system temporary directory).
+        """
+        self.spill_threshold = spill_threshold
+        self.directory = directory
+        self._pages: List[Dict[str, Any]] = []
+        self._size = 0
+        self._connection: Optional[sqlite3.Connection] = None
+        self._finalizer: Optional[weakref.finalize] = None
+
+    @property
+    def spilled(self) -> bool:
+        """bool: Whether the pages have been moved to disk."""
+        return self._connection is not None
+
+    def _spill(self) -> None:
+        """Move all in-memory pages into a temporary SQLite database."""
+        fd, db_path = tempfile.mkstemp(
+            prefix="swrangler-pages-", suffix=".sqlite", dir=self.directory
+        )
+        os.close(fd)
+
+        connection = sqlite3.connect(db_path, check_same_thread=False)
+        # The database is throwaway, so there is no point in paying for
+        # journaling or durable writes.
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.execute(
+            "CREATE TABLE pages (seq INTEGER PRIMARY KEY, data TEXT NOT NULL)"
+        )
+
+        self._connection = connection
+        self._finalizer = weakref.finalize(
+            self, _remove_database, connection, db_path
+        )
+
+        logger.info(
+            f"More than {self.spill_threshold} pages fetched, "
+            f"spill them to {db_path}"
+        )
+
+        pages, self._pages = self._pages, []
+        self._size = 0
+        self._insert(connection, pages)
+
+    def _insert(
+        self, connection: sqlite3.Connection, pages: List[Dict[str, Any]]
+    ) -> None:
+        """Insert pages into the database preserving their order."""
+        with connection:
+            connection.executemany(
+                "INSERT INTO pages (seq, data) VALUES (?, ?)",
+                (
+                    (self._size + offset, json.dumps(page))
+                    for offset, page in enumerate(pages)
+                ),
+            )
+        self._size += len(pages)
+
+    def append(self, page: Dict[str, Any]) -> None:
+        """Append a page to the end of the store.
+
+        Args:
+            page (dict): Confluence page data.
+        """
+        self.extend([page])
+
+    def extend(self, pages: Iterable[Dict[str, Any]]) -> None:
+        """Append pages to the end of the store.
+
+        The iterable is consumed in batches, so extending a spilled store
+        from a generator does not materialize all of its pages at once.
+
+        Args:
+            pages (Iterable[dict]): Confluence pages.
+        """
+        iterator = iter(pages)
+        while batch := list(islice(iterator, self.FETCH_SIZE)):
+            if self._connection is not None:
+                self._insert(self._connection, batch)
+                continue
+
+            self._pages.extend(batch)
+            self._size = len(self._pages)
+            if 0 < self.spill_threshold < self._size:
+                self._spill()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if self._connection is None:
+            yield from self._pages
+            return
+
+        cursor = self._connection.execute(
+            "SELECT data FROM pages ORDER BY seq"
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(self.FETCH_SIZE)
+                if not rows:
+                    break
+                for (data,) in rows:
+                    yield json.loads(data)
+        finally:
+            cursor.close()
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("page index out of range")
+
+        if self._connection is None:
+            return self._pages[index]
+
+        row = self._connection.execute(
+            "SELECT data FROM pages WHERE seq = ?", (index,)
+        ).fetchone()
+        return json.loads(row[0])
+
+    def close(self) -> None:
+        """Release the memory and the temporary database held by the store."""
+        if self._finalizer is not None:
+            self._finalizer()
+        self._connection = None
+        self._finalizer = None
+        self._pages = []
+        self._size = 0
+
+    def __enter__(self) -> "PageStore":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
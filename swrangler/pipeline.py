@@ -0,0 +1,186 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Producer/consumer pipeline of processing stages.
+
+Items produced by the calling thread, e.g. pages as they are fetched, flow
+through stages connected by bounded queues. Every stage runs in its own
+worker threads, so fetching, rendering and writing overlap instead of
+running one after another. A full queue blocks the stage feeding it, which
+bounds the number of items held in memory.
+"""
+
+import logging
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence, TypeVar
+
+from swrangler.metrics import metrics
+
+logger = logging.getLogger("swrangler")
+
+T = TypeVar("T")
+
+# Marks the end of the items of a queue, one per worker of the next stage.
+_DONE = object()
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A processing stage of a pipeline.
+
+    Attributes:
+        name (str): Name of the stage for thread names and metrics.
+        func (Callable): Function processing an item. Its result is passed
+            to the next stage, unless it is None.
+        workers (int): Number of threads running the stage. Default is 1.
+    """
+
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+
+
+class Pipeline:
+    """Stages connected by bounded queues.
+
+    Attributes:
+        stages (Sequence[Stage]): Stages in processing order.
+        queue_size (int): Maximum number of items waiting for a stage.
+    """
+
+    def __init__(self, stages: Sequence[Stage], queue_size: int = 64) -> None:
+        """Initialize the Pipeline.
+
+        Args:
+            stages (Sequence[Stage]): Stages in processing order.
+            queue_size (int, optional): Maximum number of items waiting for
+                a stage (default is 64).
+
+        Raises:
+            ValueError: If there are no stages.
+        """
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage.")
+
+        self.stages = stages
+        self.queue_size = queue_size
+        self._queues: List["queue.Queue[Any]"] = []
+        self._remaining: List[int] = []
+        self._lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+
+    def run(self, produce: Callable[[Callable[[Any], None]], T]) -> T:
+        """Run the pipeline until all produced items are processed.
+
+        Args:
+            produce (Callable): Function called in the current thread with
+                a function feeding an item to the first stage. It blocks
+                while the first stage is busy.
+
+        Returns:
+            The value returned by ``produce``.
+
+        Raises:
+            Exception: The first exception raised by a stage. Items not
+                processed yet are discarded and ``produce`` is stopped by
+                the exception at its next item.
+        """
+        self._queues = [queue.Queue(self.queue_size) for _ in self.stages]
+        self._remaining = [stage.workers for stage in self.stages]
+        self._error = None
+
+        threads = [
+            threading.Thread(
+                target=self._work,
+                args=(index,),
+                name=f"swrangler-{stage.name}-{worker}",
+                daemon=True,
+            )
+            for index, stage in enumerate(self.stages)
+            for worker in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            result = produce(self.put)
+        except BaseException as exc:
+            self._fail(exc)
+            raise
+        finally:
+            self._finish(0)
+            for thread in threads:
+                thread.join()
+
+        if self._error is not None:
+            raise self._error
+        return result
+
+    def put(self, item: Any) -> None:
+        """Feed an item to the first stage.
+
+        Args:
+            item: The item to process.
+
+        Raises:
+            Exception: The exception raised by a stage, if any.
+        """
+        if self._error is not None:
+            raise self._error
+        self._put(0, item)
+
+    def _put(self, index: int, item: Any) -> None:
+        """Put an item into the queue of a stage, measuring stalls."""
+        stage_queue = self._queues[index]
+        if stage_queue.full():
+            with metrics.stage(f"wait_{self.stages[index].name}"):
+                stage_queue.put(item)
+        else:
+            stage_queue.put(item)
+
+    def _work(self, index: int) -> None:
+        """Process the items of a stage until its queue is finished."""
+        stage = self.stages[index]
+        for item in iter(self._queues[index].get, _DONE):
+            if self._error is not None:
+                continue  # Drain the queue, so that nothing blocks.
+
+            try:
+                result = stage.func(item)
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                self._fail(exc)
+                continue
+
+            if result is not None and index + 1 < len(self.stages):
+                self._put(index + 1, result)
+
+        with self._lock:
+            self._remaining[index] -= 1
+            last = self._remaining[index] == 0
+        if last and index + 1 < len(self.stages):
+            self._finish(index + 1)
+
+    def _finish(self, index: int) -> None:
+        """Tell all workers of a stage that no more items will come."""
+        for _ in range(self.stages[index].workers):
+            self._queues[index].put(_DONE)
+
+    def _fail(self, exc: BaseException) -> None:
+        """Record the first failure of the pipeline."""
+        with self._lock:
+            if self._error is None:
+                self._error = exc
@@ -0,0 +1,189 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Registry of the output formats of exported pages.
+
+Every format is rendered by a function converting a Confluence page to the
+content of its file, which is saved with the name of the format as its
+extension. Only the renderers of the requested formats run, so formats
+which are not exported cost nothing.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from swrangler.common import format_text, path
+from swrangler.exceptions import Error
+from swrangler.markdown import format_markdown
+from swrangler.template import html_template
+
+RenderFunc = Callable[[Dict[str, Any]], str]
+
+# Web UI path of a page, which starts with the key of its space.
+_SPACE_URL = re.compile(r"^/spaces/([^/]+)")
+
+
+@dataclass(frozen=True)
+class Renderer:
+    """A renderer of an output format.
+
+    Attributes:
+        name (str): Name of the format, also the extension of its files.
+        func (Callable): Function rendering a page to the content of its
+            file.
+        stage (str): Name of the stage the rendering is timed as. Default
+            is ``render``.
+    """
+
+    name: str
+    func: RenderFunc
+    stage: str = "render"
+
+
+# Renderers by the name of their format.
+RENDERERS: Dict[str, Renderer] = {}
+
+# Formats exported unless others are requested.
+DEFAULT_FORMATS = ("html", "json", "txt")
+
+
+def register(
+    name: str, stage: str = "render"
+) -> Callable[[RenderFunc], RenderFunc]:
+    """Register a function as the renderer of a format.
+
+    Args:
+        name (str): Name of the format, also the extension of its files.
+        stage (str, optional): Name of the stage the rendering is timed as
+            (default is render).
+
+    Returns:
+        Callable: Decorator registering the function.
+    """
+
+    def decorator(func: RenderFunc) -> RenderFunc:
+        RENDERERS[name] = Renderer(name, func, stage)
+        return func
+
+    return decorator
+
+
+def get_renderers(formats: Iterable[str]) -> List[Renderer]:
+    """Get the renderers of formats.
+
+    Args:
+        formats (Iterable[str]): Names of the formats. Duplicates are
+            ignored.
+
+    Returns:
+        List[Renderer]: Renderers in the order of their formats.
+
+    Raises:
+        Error: If a format is unknown or no format is given.
+    """
+    names = list(dict.fromkeys(formats))
+    unknown = [name for name in names if name not in RENDERERS]
+    if unknown:
+        raise Error(
+            f"Unknown output formats: {', '.join(unknown)}. "
+            f"Available formats: {', '.join(sorted(RENDERERS))}"
+        )
+    if not names:
+        raise Error("At least one output format is required")
+
+    return [RENDERERS[name] for name in names]
+
+
+def rendered_text(page: Dict[str, Any], files: List[Tuple[str, str]]) -> str:
+    """Get the plain text of a rendered page.
+
+    Args:
+        page (dict): Confluence page.
+        files (list): Formats and contents of the rendered files of the
+            page.
+
+    Returns:
+        str: The text rendered for the ``txt`` format, if it was rendered,
+            otherwise the text rendered anew.
+    """
+    for name, content in files:
+        if name == "txt":
+            return content
+    return render_txt(page)
+
+
+@register("html")
+def render_html(page: Dict[str, Any]) -> str:
+    """Render a page to an HTML document.
+
+    Args:
+        page (dict): Confluence page.
+
+    Returns:
+        str: The HTML document.
+    """
+    return html_template(
+        title=page["title"], content=path(page, "body.storage.value")
+    )
+
+
+@register("json", stage="encode")
+def render_json(page: Dict[str, Any]) -> str:
+    """Render a page, as returned by the API, to JSON.
+
+    Args:
+        page (dict): Confluence page.
+
+    Returns:
+        str: The page as JSON.
+    """
+    return json.dumps(page, ensure_ascii=False, indent=4)
+
+
+@register("txt")
+def render_txt(page: Dict[str, Any]) -> str:
+    """Render the body of a page to plain text.
+
+    Args:
+        page (dict): Confluence page.
+
+    Returns:
+        str: The plain text.
+    """
+    return format_text(path(page, "body.storage.value"))
+
+
+@register("md")
+def render_md(page: Dict[str, Any]) -> str:
+    """Render a page to a Markdown document.
+
+    Args:
+        page (dict): Confluence page.
+
+    Returns:
+        str: The Markdown document, headed by the title of the page.
+    """
+    space_key = path(page, "space.key")
+    if not space_key:
+        match = _SPACE_URL.match(path(page, "_links.webui") or "")
+        space_key = match.group(1) if match else ""
+    body = format_markdown(
+        path(page, "body.storage.value"),
+        path(page, "_links.base") or "",
+        space_key,
+    )
+    return f"# {page['title']}\n\n{body}".rstrip()
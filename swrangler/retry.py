@@ -0,0 +1,391 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Retry policy for Confluence API requests.
+
+This module provides the retry options shared by all requests made to
+Confluence, an iterative engine which retries a call on rate limits,
+server errors and network failures, and a circuit breaker which stops
+calling an endpoint that keeps failing.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+import requests
+
+from swrangler.exceptions import CircuitOpenError
+from swrangler.metrics import metrics
+
+logger = logging.getLogger("swrangler")
+
+T = TypeVar("T")
+
+# HTTP status codes worth retrying: rate limiting and transient server errors.
+RETRYABLE_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+
+
+@dataclass(frozen=True)
+class DefaultRetryOptions:
+    """Default configuration options for retry logic in API requests.
+
+    Attributes:
+        max_retries (int): The maximum number of retry attempts. Default is 4.
+        last_retry_delay (int): The base delay of the backoff, in
+            milliseconds. Default is 5000 ms.
+        max_retry_delay (int): The maximum delay between retry attempts, in
+            milliseconds. Default is 30000 ms.
+        jitter_multiplier_range (Tuple[float, float]): A tuple specifying the
+            range for jitter multiplier of the ``exponential`` strategy. The
+            first element is the minimum multiplier, and the second element
+            is the maximum multiplier. Default is (0.7, 1.3).
+        strategy (str): The backoff strategy: ``full`` for exponential
+            backoff with full jitter, ``decorrelated`` for decorrelated
+            jitter or ``exponential`` for exponential backoff scaled by
+            a multiplier from ``jitter_multiplier_range``. Default is
+            ``full``.
+        deadline (Optional[int]): The maximum time a request may take
+            including all retries, in milliseconds. A retry which would end
+            after the deadline is not attempted. Default is None, no
+            deadline.
+    """
+
+    max_retries: int = 4
+    last_retry_delay: int = 5000
+    max_retry_delay: int = 30000
+    jitter_multiplier_range: Tuple[float, float] = (0.7, 1.3)
+    strategy: str = "full"
+    deadline: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class CircuitBreakerOptions:
+    """Configuration options for circuit breakers.
+
+    Attributes:
+        error_ratio (float): The ratio of failed requests among the recent
+            ones which opens the circuit. Default is 0.5.
+        window (int): The number of recent requests the ratio is computed
+            over. Default is 20.
+        min_requests (int): The minimum number of recent requests needed to
+            open the circuit. Default is 10.
+        cooldown (int): The time the circuit stays open before a trial
+            request is let through, in milliseconds. Default is 30000 ms.
+    """
+
+    error_ratio: float = 0.5
+    window: int = 20
+    min_requests: int = 10
+    cooldown: int = 30000
+
+
+class CircuitBreaker:
+    """Circuit breaker for a single Confluence endpoint.
+
+    The breaker is closed while requests succeed. Once the ratio of failed
+    requests among the recent ones reaches the configured threshold, it
+    opens and rejects all requests. After the cooldown a single trial
+    request is let through: its success closes the breaker, its failure
+    opens it again.
+
+    The breaker is thread-safe. It can be pickled, so every worker process
+    gets its own copy.
+
+    Attributes:
+        name (str): Name of the endpoint for log messages.
+        options (CircuitBreakerOptions): Breaker options.
+    """
+
+    CLOSED: str = "closed"
+    OPEN: str = "open"
+    HALF_OPEN: str = "half-open"
+
+    def __init__(
+        self, name: str, options: Optional[CircuitBreakerOptions] = None
+    ) -> None:
+        """Initialize a closed CircuitBreaker.
+
+        Args:
+            name (str): Name of the endpoint for log messages.
+            options (Optional[CircuitBreakerOptions], optional): Breaker
+                options (default is None, the default options).
+        """
+        self.name = name
+        self.options = options or CircuitBreakerOptions()
+        self._lock = threading.Lock()
+        self._outcomes: Deque[bool] = deque(maxlen=self.options.window)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+
+    @property
+    def state(self) -> str:
+        """str: Current state of the breaker."""
+        return self._state
+
+    def allow(self) -> bool:
+        """Check whether a request may be made.
+
+        Returns:
+            bool: False while the breaker is open.
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+
+            cooldown = self.options.cooldown / 1000
+            if (
+                self._state == self.OPEN
+                and time.monotonic() - self._opened_at >= cooldown
+            ):
+                # Let a single trial request through.
+                self._state = self.HALF_OPEN
+                return True
+
+            return False
+
+    def record(self, success: bool) -> None:
+        """Record the outcome of a request.
+
+        Args:
+            success (bool): Whether the request succeeded.
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                if success:
+                    logger.info(f"Circuit for {self.name} closed")
+                    self._state = self.CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if (
+                self._state == self.CLOSED
+                and len(self._outcomes) >= self.options.min_requests
+                and failures / len(self._outcomes) >= self.options.error_ratio
+            ):
+                self._open()
+
+    def call(self, func: Callable[[], T]) -> T:
+        """Call a function making a request and record its outcome.
+
+        Args:
+            func (Callable): Function making the request.
+
+        Returns:
+            The value returned by the function.
+
+        Raises:
+            CircuitOpenError: If the breaker is open.
+        """
+        if not self.allow():
+            metrics.increment("circuit_rejected")
+            raise CircuitOpenError(f"Circuit for {self.name} is open")
+
+        try:
+            result = func()
+        except requests.RequestException as exc:
+            # Client errors say nothing about the health of the endpoint.
+            self.record(not is_retryable(exc))
+            raise
+
+        self.record(True)
+        return result
+
+    def _open(self) -> None:
+        """Open the breaker. Must be called with the lock held."""
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        metrics.increment("circuit_opened")
+        logger.warning(
+            f"Too many failed requests to {self.name}, stop requesting it "
+            f"for {self.options.cooldown / 1000:.0f}s"
+        )
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class Backoff:
+    """Delays between consecutive attempts of a single request.
+
+    Attributes:
+        options (DefaultRetryOptions): Retry options.
+    """
+
+    STRATEGIES: Tuple[str, ...] = ("full", "decorrelated", "exponential")
+
+    def __init__(self, options: DefaultRetryOptions) -> None:
+        """Initialize the Backoff.
+
+        Args:
+            options (DefaultRetryOptions): Retry options.
+
+        Raises:
+            ValueError: If the strategy is unknown.
+        """
+        if options.strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown backoff strategy: {options.strategy}")
+
+        self.options = options
+        self._previous = float(options.last_retry_delay)
+
+    def next_delay(self, attempt: int) -> float:
+        """Calculate the delay before the next attempt.
+
+        Args:
+            attempt (int): Number of the failed attempt, starting at 0.
+
+        Returns:
+            float: Delay in seconds.
+        """
+        base = self.options.last_retry_delay
+        cap = self.options.max_retry_delay
+
+        if self.options.strategy == "decorrelated":
+            delay = min(cap, random.uniform(base, self._previous * 3))
+            self._previous = delay
+        elif self.options.strategy == "exponential":
+            delay = min(base * 2**attempt, cap) * random.uniform(
+                *self.options.jitter_multiplier_range
+            )
+        else:
+            delay = random.uniform(0, min(base * 2**attempt, cap))
+
+        return delay / 1000
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Get the delay requested by the server in a Retry-After header.
+
+    Args:
+        exc (BaseException): Exception raised by the request.
+
+    Returns:
+        Optional[float]: Delay in seconds, None if the server did not
+            request one.
+    """
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+
+    try:
+        return max(0.0, float(response.headers["Retry-After"]))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Check whether a failed request is worth retrying.
+
+    Args:
+        exc (BaseException): Exception raised by the request.
+
+    Returns:
+        bool: True for rate limits, transient server errors, timeouts and
+            connection errors.
+    """
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+
+    response = getattr(exc, "response", None)
+    return (
+        isinstance(exc, requests.HTTPError)
+        and response is not None
+        and response.status_code in RETRYABLE_STATUS_CODES
+    )
+
+
+def call_with_retry(
+    func: Callable[[], T],
+    options: DefaultRetryOptions,
+    description: str,
+    breaker: Optional[CircuitBreaker] = None,
+    deadline: Optional[float] = None,
+) -> T:
+    """Call a function retrying it on transient failures.
+
+    When the server sends a Retry-After header its delay is used instead of
+    the backoff, so the client never sleeps longer than it has been asked
+    to. The last exception is re-raised when retries are exhausted, when
+    the deadline would be exceeded or when the failure is not transient.
+
+    Args:
+        func (Callable): Function making the request.
+        options (DefaultRetryOptions): Retry options.
+        description (str): Description of the request for log messages.
+        breaker (Optional[CircuitBreaker], optional): Circuit breaker of the
+            endpoint. Every attempt is recorded in it (default is None).
+        deadline (Optional[float], optional): Time, as returned by
+            ``time.time()``, after which no retry is attempted. Combined
+            with the deadline of the retry options (default is None).
+
+    Returns:
+        The value returned by the function.
+
+    Raises:
+        CircuitOpenError: If the circuit breaker rejects an attempt.
+    """
+    backoff = Backoff(options)
+    if options.deadline is not None:
+        request_deadline = time.time() + options.deadline / 1000
+        deadline = min(deadline or request_deadline, request_deadline)
+
+    call = func if breaker is None else partial(breaker.call, func)
+
+    attempt = 0
+    while True:
+        try:
+            return call()
+        except requests.RequestException as exc:
+            if not is_retryable(exc) or attempt >= options.max_retries:
+                raise
+
+            if breaker is not None and breaker.state == breaker.OPEN:
+                # No point in waiting for a retry which will be rejected.
+                metrics.increment("circuit_rejected")
+                raise CircuitOpenError(
+                    f"Circuit for {breaker.name} is open"
+                ) from exc
+
+            delay = retry_after(exc)
+            if delay is None:
+                delay = backoff.next_delay(attempt)
+
+            if deadline is not None and time.time() + delay > deadline:
+                logger.debug(f"Deadline exceeded for {description}")
+                raise
+
+            attempt += 1
+            metrics.increment("retries")
+            logger.debug(
+                f"Retry {description} in {delay:.2f}s "
+                f"({attempt}/{options.max_retries}): {exc}"
+            )
+            time.sleep(delay)
@@ -0,0 +1,272 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Full-text search index of exported pages.
+
+The index is an SQLite database with an FTS5 table holding the title,
+structured title, owner and plain text of every page and blog post
+exported with ``export-space --search-index``. It is shared by all spaces
+exported to the same output directory and queried by ``swrangler search``.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from swrangler.common import get_structured_title, path
+from swrangler.exceptions import Error
+from swrangler.metrics import metrics
+from swrangler.renderers import rendered_text
+
+logger = logging.getLogger("swrangler")
+
+# Name of the index file in the output directory.
+SEARCH_INDEX_FILE = "search.sqlite"
+
+# Columns of the search results.
+RESULT_COLUMNS = (
+    "space_key",
+    "page_id",
+    "type",
+    "title",
+    "path",
+    "owner",
+    "snippet",
+)
+
+
+class SearchIndex:
+    """Full-text index of pages keyed by space key and page ID.
+
+    Pages are indexed in batches, each written in a single transaction.
+    Indexing a page again replaces its previous entry. The index is
+    thread-safe.
+
+    Attributes:
+        db_path (str): Path to the SQLite file.
+        batch_size (int): Number of pages written together.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 500) -> None:
+        """Open the index, creating the SQLite file if needed.
+
+        Args:
+            db_path (str): Path to the SQLite file.
+            batch_size (int, optional): Number of pages written together
+                (default is 500).
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._pending: List[Tuple[Any, ...]] = []
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Pages are indexed by a pipeline stage, not by the thread opening
+        # the index; the lock serializes access.
+        self._connection = sqlite3.connect(
+            db_path, timeout=30, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "id INTEGER PRIMARY KEY, "
+                "space_key TEXT NOT NULL, "
+                "page_id TEXT NOT NULL, "
+                "UNIQUE (space_key, page_id))"
+            )
+            self._connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5("
+                "space_key UNINDEXED, page_id UNINDEXED, type UNINDEXED, "
+                "title, path, owner, text, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            )
+
+    def add(self, space_key: str, page: Dict[str, Any], text: str) -> None:
+        """Queue a page for indexing, writing the batch once it is full.
+
+        Args:
+            space_key (str): The key of the Confluence space.
+            page (dict): Confluence page.
+            text (str): Plain text of the page.
+        """
+        row = (
+            space_key,
+            page["id"],
+            page.get("type", "page"),
+            page["title"],
+            get_structured_title(page),
+            path(page, "history.ownedBy.displayName") or "",
+            text,
+        )
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._write()
+
+    def index(
+        self,
+        space_key: str,
+        rendered: Tuple[Dict[str, Any], List[Tuple[str, str]]],
+    ) -> Tuple[Dict[str, Any], List[Tuple[str, str]]]:
+        """Index a rendered page.
+
+        The plain text rendered for the ``txt`` format is reused, if it was
+        requested.
+
+        Args:
+            space_key (str): The key of the Confluence space.
+            rendered (tuple): The page and the extensions and contents of
+                its files.
+
+        Returns:
+            tuple: The rendered page, unchanged.
+        """
+        page, files = rendered
+        with metrics.stage("index"):
+            self.add(space_key, page, rendered_text(page, files))
+        return rendered
+
+    def flush(self) -> None:
+        """Write the queued pages."""
+        with self._lock:
+            self._write()
+
+    def _write(self) -> None:
+        """Write the queued pages in a single transaction."""
+        if not self._pending:
+            return
+
+        rows, self._pending = self._pending, []
+        keys = [row[:2] for row in rows]
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO documents (space_key, page_id) "
+                "VALUES (?, ?)",
+                keys,
+            )
+            self._connection.executemany(
+                "DELETE FROM search WHERE rowid = ("
+                "SELECT id FROM documents WHERE space_key = ? AND page_id = ?)",
+                keys,
+            )
+            self._connection.executemany(
+                "INSERT INTO search (rowid, space_key, page_id, type, title, "
+                "path, owner, text) "
+                "SELECT id, ?, ?, ?, ?, ?, ?, ? FROM documents "
+                "WHERE space_key = ? AND page_id = ?",
+                (row + row[:2] for row in rows),
+            )
+        metrics.increment("pages_indexed", len(rows))
+
+    def remove_space(self, space_key: str) -> None:
+        """Remove all pages of a space from the index.
+
+        Args:
+            space_key (str): The key of the Confluence space.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM search WHERE rowid IN ("
+                "SELECT id FROM documents WHERE space_key = ?)",
+                (space_key,),
+            )
+            self._connection.execute(
+                "DELETE FROM documents WHERE space_key = ?", (space_key,)
+            )
+
+    def remove_pages(self, space_key: str, page_ids: Iterable[str]) -> None:
+        """Remove pages of a space from the index.
+
+        Args:
+            space_key (str): The key of the Confluence space.
+            page_ids (Iterable[str]): IDs of the pages.
+        """
+        keys = [(space_key, page_id) for page_id in page_ids]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "DELETE FROM search WHERE rowid = ("
+                "SELECT id FROM documents WHERE space_key = ? AND page_id = ?)",
+                keys,
+            )
+            self._connection.executemany(
+                "DELETE FROM documents WHERE space_key = ? AND page_id = ?",
+                keys,
+            )
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        space_keys: Optional[Sequence[str]] = None,
+        highlight: Tuple[str, str] = ("[", "]"),
+    ) -> List[Dict[str, str]]:
+        """Search the index.
+
+        Matches in titles rank above matches in structured titles, owners
+        and text.
+
+        Args:
+            query (str): FTS5 query, e.g. ``deploy AND kubernetes`` or
+                ``"release notes"``.
+            limit (int, optional): Maximum number of results (default is
+                20).
+            space_keys (Optional[Sequence[str]], optional): Keys of the
+                spaces to search in (default is None, all spaces).
+            highlight (Tuple[str, str], optional): Markers put around
+                matches in snippets (default is square brackets).
+
+        Returns:
+            List[Dict[str, str]]: Best matching pages first, with the keys
+                listed in :data:`RESULT_COLUMNS`.
+
+        Raises:
+            Error: If the query is invalid.
+        """
+        sql = (
+            "SELECT space_key, page_id, type, title, path, owner, "
+            "snippet(search, 6, ?, ?, '...', 16) "
+            "FROM search WHERE search MATCH ?"
+        )
+        params: List[Any] = [*highlight, query]
+        if space_keys:
+            sql += f" AND space_key IN ({','.join('?' * len(space_keys))})"
+            params.extend(space_keys)
+        sql += " ORDER BY bm25(search, 0, 0, 0, 10, 5, 2, 1) LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            try:
+                rows = self._connection.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as exc:
+                raise Error(f"Invalid search query {query!r}: {exc}") from exc
+
+        return [dict(zip(RESULT_COLUMNS, row)) for row in rows]
+
+    def close(self) -> None:
+        """Write the queued pages and close the index."""
+        self.flush()
+        self._connection.close()
+
+    def __enter__(self) -> "SearchIndex":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
@@ -0,0 +1,332 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Long-lived server running swrangler commands.
+
+``swrangler serve`` listens on a Unix socket and runs the commands sent by
+``swrangler submit`` one after another in a single process. Modules are
+imported, credentials are loaded and connections to Confluence are opened
+once instead of once per command.
+
+Clients send a single JSON line with the arguments and the working
+directory of the command. The server answers with JSON lines carrying the
+output of the command and, last, its exit code.
+"""
+
+import io
+import json
+import logging
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from swrangler.exceptions import Error
+
+logger = logging.getLogger("swrangler")
+
+
+def default_socket_path() -> str:
+    """Get the default location of the server socket.
+
+    Returns:
+        str: Path inside ``$XDG_RUNTIME_DIR`` or ``~/.cache/swrangler``.
+    """
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "swrangler"
+    )
+    return os.path.join(runtime_dir, "swrangler.sock")
+
+
+@dataclass
+class Job:
+    """A command submitted to the server.
+
+    Attributes:
+        args (List[str]): Command line arguments of the command.
+        cwd (str): Working directory of the command.
+        messages (queue.Queue): Output of the command followed by its exit
+            code, as sent to the client.
+    """
+
+    args: List[str]
+    cwd: str
+    messages: "queue.Queue[Dict[str, Any]]" = field(
+        default_factory=queue.Queue
+    )
+
+
+class _JobStream(io.TextIOBase):
+    """Text stream forwarding the output of a job to its client."""
+
+    def __init__(self, job: Job, name: str) -> None:
+        super().__init__()
+        self.job = job
+        self.name = name
+
+    def write(self, text: str) -> int:
+        if not isinstance(text, str):
+            # Like other text streams, so that click does not take it for
+            # a binary stream.
+            raise TypeError(f"Expected str, got {type(text).__name__}")
+        if text:
+            self.job.messages.put({"stream": self.name, "data": text})
+        return len(text)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Queue a job and stream its output back to the client."""
+
+    server: "Server"
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+            job = Job([str(arg) for arg in request["args"]], request["cwd"])
+        except (KeyError, TypeError, ValueError) as exc:
+            self._send({"stream": "stderr", "data": f"Invalid job: {exc}\n"})
+            self._send({"exit_code": 2})
+            return
+
+        if self.server.check is not None:
+            try:
+                self.server.check(job.args)
+            except Error as exc:
+                self._send({"stream": "stderr", "data": f"Error: {exc}\n"})
+                self._send({"exit_code": 2})
+                return
+
+        self.server.jobs.put(job)
+        while True:
+            message = job.messages.get()
+            try:
+                self._send(message)
+            except OSError:
+                pass  # The client is gone, let the job finish anyway.
+            if "exit_code" in message:
+                break
+
+    def _send(self, message: Dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+class Server(socketserver.ThreadingUnixStreamServer):
+    """Server running submitted commands one at a time.
+
+    Connections are handled concurrently, but jobs are queued and run in
+    order by a single worker thread, as commands change the working
+    directory and the output streams of the process.
+
+    Attributes:
+        socket_path (str): Path of the Unix socket.
+        runner (Callable): Function running a command.
+        check (Optional[Callable]): Function rejecting commands which must
+            not run in the server.
+        jobs (queue.Queue): Jobs waiting to be run.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str,
+        runner: Callable[[List[str]], int],
+        check: Optional[Callable[[List[str]], None]] = None,
+    ) -> None:
+        """Initialize the Server and bind its socket.
+
+        Args:
+            socket_path (str): Path of the Unix socket, created if needed.
+            runner (Callable): Function running a command given its
+                arguments and returning its exit code.
+            check (Optional[Callable], optional): Function called with the
+                arguments of every submitted command before it is queued,
+                raising an Error to reject it (default is None, accept all
+                commands).
+
+        Raises:
+            Error: If another server listens on the socket.
+        """
+        self.socket_path = socket_path
+        self.runner = runner
+        self.check = check
+        self.jobs: "queue.Queue[Optional[Job]]" = queue.Queue()
+
+        directory = os.path.dirname(socket_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _remove_stale_socket(socket_path)
+
+        super().__init__(socket_path, _Handler)
+
+    def server_bind(self) -> None:
+        # Jobs run with the credentials of the server, so only its owner
+        # may submit them.
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+
+    def serve_forever(self, poll_interval: float = 0.5) -> None:
+        worker = threading.Thread(
+            target=self._run_jobs, name="swrangler-jobs", daemon=True
+        )
+        worker.start()
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self.jobs.put(None)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def _run_jobs(self) -> None:
+        """Run queued jobs until a None job is queued."""
+        for job in iter(self.jobs.get, None):
+            job.messages.put({"exit_code": run_job(job, self.runner)})
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    """Remove the socket left by a server which did not exit cleanly."""
+    if not os.path.exists(socket_path):
+        return
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            os.remove(socket_path)
+            return
+
+    raise Error(f"Another server is listening on {socket_path}")
+
+
+def run_job(job: Job, runner: Callable[[List[str]], int]) -> int:
+    """Run a job in the current process.
+
+    The output of the command is forwarded to the client of the job. The
+    working directory and the handlers of the logger are restored once
+    the command finishes.
+
+    Args:
+        job (Job): The job to run.
+        runner (Callable): Function running a command given its arguments
+            and returning its exit code.
+
+    Returns:
+        int: Exit code of the command.
+    """
+    # Imported here, as clients only submit jobs.
+    from swrangler.logger import setup_logger
+    from swrangler.metrics import metrics
+
+    logger.info(f"Running job: {' '.join(job.args)}")
+    handlers, level = logger.handlers, logger.level
+    cwd = os.getcwd()
+    stdout, stderr = _JobStream(job, "stdout"), _JobStream(job, "stderr")
+
+    metrics.reset()
+    try:
+        os.chdir(job.cwd)
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            # Errors in the arguments are logged before the command sets
+            # up the logger itself.
+            setup_logger()
+            exit_code = int(runner(job.args) or 0)
+    except Exception:  # pylint: disable=broad-exception-caught
+        stderr.write(traceback.format_exc())
+        exit_code = 1
+    finally:
+        os.chdir(cwd)
+        logger.handlers, logger.level = handlers, level
+
+    logger.info(f"Job finished with exit code {exit_code}")
+    return exit_code
+
+
+def serve(
+    socket_path: str,
+    runner: Callable[[List[str]], int],
+    check: Optional[Callable[[List[str]], None]] = None,
+) -> None:
+    """Run submitted commands until interrupted.
+
+    Args:
+        socket_path (str): Path of the Unix socket.
+        runner (Callable): Function running a command given its arguments
+            and returning its exit code.
+        check (Optional[Callable], optional): Function raising an Error for
+            commands which must not run in the server (default is None,
+            accept all commands).
+
+    Raises:
+        Error: If another server listens on the socket.
+    """
+    from swrangler.confluence import keep_sessions
+
+    keep_sessions()
+    # Exit cleanly, removing the socket, when stopped by a service manager.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with Server(socket_path, runner, check) as server:
+        logger.info(f"Listening on {socket_path}")
+        server.serve_forever()
+
+
+def submit(args: List[str], socket_path: str) -> int:
+    """Run a command in the server and print its output.
+
+    Args:
+        args (List[str]): Command line arguments of the command.
+        socket_path (str): Path of the Unix socket of the server.
+
+    Returns:
+        int: Exit code of the command.
+
+    Raises:
+        Error: If the server is not running or the connection is lost.
+    """
+    streams = {"stdout": sys.stdout, "stderr": sys.stderr}
+    request = {"args": args, "cwd": os.getcwd()}
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError as exc:
+            raise Error(
+                f"Failed to connect to the server at {socket_path}: {exc}"
+            ) from exc
+
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as responses:
+            for line in responses:
+                message = json.loads(line)
+                if "exit_code" in message:
+                    return int(message["exit_code"])
+                stream = streams[message["stream"]]
+                stream.write(message["data"])
+                stream.flush()
+
+    raise Error(f"The server at {socket_path} closed the connection")
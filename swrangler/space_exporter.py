@@ -15,60 +15,681 @@
 
 """Tools for exporting Confluence spaces.
 
-This module provides functions to export Confluence space pages to HTML and
-JSON files.
+This module provides functions to export Confluence space pages and blog
+posts to HTML and JSON files, and to download their attachments.
 """
 
-import json
+import contextlib
 import logging
-from typing import Any, Dict, List
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 
-from swrangler.common import format_text, mk_path, path
+from swrangler.checkpoint import Checkpoint
+from swrangler.chunks import (
+    DEFAULT_CHUNK_SIZE,
+    ChunkWriter,
+    keep_chunks,
+    remove_chunks,
+)
+from swrangler.common import get_page_path, mk_path, path
 from swrangler.confluence import Confluence
-from swrangler.template import html_template
+from swrangler.exceptions import Error
+from swrangler.file_writer import FileWriter
+from swrangler.metrics import metrics
+from swrangler.object_store import ObjectStore
+from swrangler.pipeline import Pipeline, Stage
+from swrangler.renderers import DEFAULT_FORMATS, get_renderers
+from swrangler.search_index import SEARCH_INDEX_FILE, SearchIndex
 
 logger = logging.getLogger("swrangler")
 
+T = TypeVar("T")
+
+# Subdirectory of the space directory holding blog posts.
+BLOG_DIR = "blog"
+
+# Subdirectory of the space directory holding attachments.
+ATTACHMENTS_DIR = "attachments"
+
+# Name of the file holding the chunks of pages and blog posts of a space.
+CHUNKS_FILE = "chunks.ndjson"
+
+# Subdirectory of the output directory holding deduplicated content.
+OBJECTS_DIR = ".objects"
+
+
+@dataclass(frozen=True)
+class ExportOptions:  # pylint: disable=too-many-instance-attributes
+    """Options for exporting content besides pages and of the pipeline.
+
+    Attributes:
+        blog_posts (bool): Whether to export blog posts. Default is False.
+        attachments (bool): Whether to download the attachments of pages
+            and blog posts. Default is False.
+        jobs (int): Maximum number of concurrent attachment downloads.
+            Default is 4.
+        dedup (bool): Whether to store identical files once, in a store
+            shared by all spaces of the output directory, and export hard
+            links to them. Default is False.
+        render_jobs (int): Number of threads rendering pages while they
+            are being fetched. Default is 1.
+        write_jobs (int): Number of threads writing the files of rendered
+            pages. Default is 2.
+        durability (str): ``none``, ``batch`` or ``full``, see
+            :class:`FileWriter`. Default is ``none``.
+        atomic_writes (bool): Whether to write files to temporary files
+            renamed over the targets. Default is False.
+        formats (Sequence[str]): Formats to export pages and blog posts in.
+            Default is HTML, JSON and plain text.
+        chunks (bool): Whether to write the plain text of pages and blog
+            posts split into chunks to an NDJSON file. Default is False.
+        chunk_size (int): Maximum size of a chunk in characters. Default
+            is 4000.
+        search_index (bool): Whether to index pages and blog posts in the
+            full-text search index of the output directory. Default is
+            False.
+    """
+
+    blog_posts: bool = False
+    attachments: bool = False
+    jobs: int = 4
+    dedup: bool = False
+    render_jobs: int = 1
+    write_jobs: int = 2
+    durability: str = "none"
+    atomic_writes: bool = False
+    formats: Sequence[str] = DEFAULT_FORMATS
+    chunks: bool = False
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    search_index: bool = False
+
+
+def write_file(
+    file_path: str,
+    data: str,
+    store: Optional[ObjectStore] = None,
+    writer: Optional[FileWriter] = None,
+) -> int:
+    """Write an exported text file.
+
+    Args:
+        file_path (str): Path of the file.
+        data (str): Content of the file.
+        store (Optional[ObjectStore], optional): Store to write the content
+            to, the file becomes a link to it (default is None, write the
+            file itself).
+        writer (Optional[FileWriter], optional): Writer flushing the file
+            according to its durability (default is None, leave flushing
+            to the operating system).
+
+    Returns:
+        int: Number of bytes written to disk.
+    """
+    content = data.encode("utf-8")
+    if store is None:
+        return (writer or FileWriter()).write(file_path, content)
+
+    size = store.write(file_path, content)
+    if writer is not None:
+        writer.written(file_path)
+    return size
+
+
+class PageExporter:
+    """Renders and writes pages while they are being fetched.
+
+    Pages flow through a pipeline of a render stage, which converts them to
+    the requested formats, and a write stage, which saves the files.
+    Both stages run in their own threads, so fetching, rendering and
+    writing overlap.
+
+    Attributes:
+        space_key (str): The key of the Confluence space.
+        output_dir (str): Directory to save the output files.
+        subdir (str): Subdirectory of the space directory to save the
+            files in.
+        checkpoint (Optional[Checkpoint]): Journal to record saved pages in.
+        store (Optional[ObjectStore]): Store to deduplicate the files with.
+        writer (Optional[FileWriter]): Writer of the files.
+        renderers (List[Renderer]): Renderers of the exported formats.
+    """
+
+    def __init__(
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        space_key: str,
+        output_dir: str,
+        subdir: str = "",
+        checkpoint: Optional[Checkpoint] = None,
+        store: Optional[ObjectStore] = None,
+        writer: Optional[FileWriter] = None,
+        formats: Sequence[str] = DEFAULT_FORMATS,
+    ) -> None:
+        """Initialize the PageExporter.
+
+        Args:
+            space_key (str): The key of the Confluence space.
+            output_dir (str): Directory to save the output files.
+            subdir (str, optional): Subdirectory of the space directory to
+                save the files in (default is empty, the space directory).
+            checkpoint (Optional[Checkpoint], optional): Journal to record
+                saved pages in. Pages completed by a previous run are
+                skipped (default is None).
+            store (Optional[ObjectStore], optional): Store to deduplicate
+                the files with (default is None).
+            writer (Optional[FileWriter], optional): Writer of the files
+                (default is None, a writer leaving flushing to the operating
+                system).
+            formats (Sequence[str], optional): Formats to export pages in
+                (default is HTML, JSON and plain text).
+
+        Raises:
+            Error: If a format is unknown.
+        """
+        self.space_key = space_key
+        self.output_dir = output_dir
+        self.subdir = subdir
+        self.checkpoint = checkpoint
+        self.store = store
+        self.writer = writer or FileWriter()
+        self.renderers = get_renderers(formats)
+
+    def render(
+        self, page: Dict[str, Any]
+    ) -> Optional[Tuple[Dict[str, Any], List[Tuple[str, str]]]]:
+        """Render a page to the content of its files.
+
+        Args:
+            page (dict): Confluence page.
+
+        Returns:
+            Optional[tuple]: The page and the extensions and contents of
+                its files, None if the page was saved by a previous run.
+        """
+        if self.checkpoint is not None and (
+            page["id"] in self.checkpoint.completed
+        ):
+            return None
+
+        files = []
+        for renderer in self.renderers:
+            with metrics.stage(renderer.stage):
+                files.append((renderer.name, renderer.func(page)))
+
+        return page, files
+
+    def write(
+        self, rendered: Tuple[Dict[str, Any], List[Tuple[str, str]]]
+    ) -> None:
+        """Write the files of a rendered page.
+
+        Args:
+            rendered (tuple): The page and the extensions and contents of
+                its files, as returned by :meth:`render`.
+        """
+        page, files = rendered
+        with metrics.stage("write"):
+            for extension, data in files:
+                file_path = mk_path(
+                    os.path.join(self.subdir, extension),
+                    self.space_key,
+                    self.output_dir,
+                    page,
+                )
+                metrics.increment(
+                    "bytes_written",
+                    write_file(
+                        f"{file_path}.{extension}",
+                        data,
+                        self.store,
+                        self.writer,
+                    ),
+                )
+
+        metrics.increment("pages_written")
+        if self.checkpoint is not None:
+            self.checkpoint.mark_completed(page["id"])
+
+    def export(
+        self,
+        fetch: Callable[[Callable[[Iterable[Dict[str, Any]]], None]], T],
+        render_jobs: int = 1,
+        write_jobs: int = 2,
+        stages: Sequence[Stage] = (),
+    ) -> T:
+        """Save pages as they are fetched.
+
+        Args:
+            fetch (Callable): Function fetching the pages. It is called with
+                a callback which it must call with every batch of pages.
+            render_jobs (int, optional): Number of threads rendering pages
+                (default is 1).
+            write_jobs (int, optional): Number of threads writing files
+                (default is 2).
+            stages (Sequence[Stage], optional): Stages run between
+                rendering and writing, given and returning rendered pages
+                (default is none).
+
+        Returns:
+            The value returned by ``fetch``.
+        """
+
+        def produce(put: Callable[[Any], None]) -> T:
+            def callback(pages: Iterable[Dict[str, Any]]) -> None:
+                for page in pages:
+                    put(page)
+
+            return fetch(callback)
+
+        logger.info("Render pages...")
+        pipeline = Pipeline(
+            [
+                Stage("render", self.render, render_jobs),
+                *stages,
+                Stage("write", self.write, write_jobs),
+            ]
+        )
+        return pipeline.run(produce)
+
 
 def save_pages_to_files(
-    pages: List[Dict[str, Any]], space_key: str, output_dir: str
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    pages: Iterable[Dict[str, Any]],
+    space_key: str,
+    output_dir: str,
+    checkpoint: Optional[Checkpoint] = None,
+    subdir: str = "",
+    store: Optional[ObjectStore] = None,
 ) -> None:
     """Save Confluence pages to HTML, JSON and text files.
 
     Args:
-        pages (list): List of Confluence pages.
+        pages (Iterable[dict]): Confluence pages.
         space_key (str): The key of the Confluence space.
         output_dir (str): Directory to save the output files.
+        checkpoint (Optional[Checkpoint], optional): Journal to record saved
+            pages in. Pages completed by a previous run are skipped
+            (default is None).
+        subdir (str, optional): Subdirectory of the space directory to save
+            the files in (default is empty, the space directory).
+        store (Optional[ObjectStore], optional): Store to deduplicate the
+            files with (default is None).
     """
-    logger.info("Render pages...")
-    for page in pages:
-        html_path = mk_path("html", space_key, output_dir, page)
-        json_path = mk_path("json", space_key, output_dir, page)
-        text_path = mk_path("txt", space_key, output_dir, page)
+    exporter = PageExporter(space_key, output_dir, subdir, checkpoint, store)
+    exporter.export(lambda callback: callback(pages))
+
 
-        body_value = path(page, "body.storage.value")
-        content = html_template(title=page["title"], content=body_value)
+def container_paths(
+    pages: Iterable[Dict[str, Any]], subdir: str = ""
+) -> Dict[str, str]:
+    """Map IDs of pages to their paths relative to the space directory.
 
-        with open(f"{html_path}.html", "w", encoding="utf-8") as file:
-            file.write(content)
+    Args:
+        pages (Iterable[dict]): Confluence pages or blog posts.
+        subdir (str, optional): Subdirectory of the space directory the
+            pages are saved in (default is empty, the space directory).
+
+    Returns:
+        dict: Paths keyed by page ID.
+    """
+    return {page["id"]: get_page_path(subdir, page) for page in pages}
 
-        with open(f"{json_path}.json", "w", encoding="utf-8") as file:
-            json.dump(page, file, ensure_ascii=False, indent=4)
 
-        plain_text = format_text(body_value)
-        with open(f"{text_path}.txt", "w", encoding="utf-8") as file:
-            file.write(plain_text)
+def plan_downloads(
+    attachments: Iterable[Dict[str, Any]],
+    containers: Dict[str, str],
+    attachments_dir: str,
+) -> List[Tuple[Dict[str, Any], str]]:
+    """Get the files to save attachments to, largest attachments first.
 
+    Attachments are saved in a directory tree mirroring the pages they
+    belong to. Downloads run concurrently and start in the returned order,
+    so a large attachment is never left downloading alone at the end.
 
-def export_space(space_key: str, output_dir: str) -> None:
+    Args:
+        attachments (Iterable[dict]): Attachments of the space.
+        containers (dict): Paths of pages and blog posts relative to the
+            space directory keyed by their IDs. Attachments of other
+            containers are saved in a directory named after its ID.
+        attachments_dir (str): Directory to save the attachments in.
+
+    Returns:
+        list: Attachments and the paths of their files.
+    """
+    downloads = []
+    for attachment in attachments:
+        container_id = path(attachment, "container.id") or "unknown"
+        directory = os.path.join(
+            attachments_dir, containers.get(container_id, container_id)
+        )
+        file_name = attachment["title"].replace("/", "-")
+        downloads.append((attachment, os.path.join(directory, file_name)))
+
+    downloads.sort(
+        key=lambda download: path(download[0], "extensions.fileSize") or 0,
+        reverse=True,
+    )
+    return downloads
+
+
+def _download(
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    client: Confluence,
+    attachment: Dict[str, Any],
+    file_path: str,
+    store: Optional[ObjectStore] = None,
+    writer: Optional[FileWriter] = None,
+) -> None:
+    """Download an attachment creating its directory."""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    size = client.download_attachment(attachment, file_path)
+    if store is not None and store.adopt(file_path):
+        metrics.increment("bytes_deduplicated", size)
+    if writer is not None:
+        writer.written(file_path)
+
+
+def download_attachments(
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    client: Confluence,
+    downloads: List[Tuple[Dict[str, Any], str]],
+    jobs: int = 4,
+    checkpoint: Optional[Checkpoint] = None,
+    store: Optional[ObjectStore] = None,
+    writer: Optional[FileWriter] = None,
+) -> None:
+    """Download attachments concurrently.
+
+    A failed download does not stop the others.
+
+    Args:
+        client (Confluence): Confluence client.
+        downloads (list): Attachments and the paths of their files, as
+            returned by :func:`plan_downloads`.
+        jobs (int, optional): Maximum number of concurrent downloads
+            (default is 4).
+        checkpoint (Optional[Checkpoint], optional): Journal to record
+            downloaded attachments in. Attachments completed by a previous
+            run are skipped (default is None).
+        store (Optional[ObjectStore], optional): Store to deduplicate the
+            attachments with (default is None).
+        writer (Optional[FileWriter], optional): Writer flushing the
+            downloaded files (default is None, leave flushing to the
+            operating system).
+
+    Raises:
+        Error: If any attachment could not be downloaded.
+    """
+    if checkpoint is not None:
+        downloads = [
+            (attachment, file_path)
+            for attachment, file_path in downloads
+            if attachment["id"] not in checkpoint.completed
+        ]
+
+    total_size = sum(
+        path(attachment, "extensions.fileSize") or 0
+        for attachment, _ in downloads
+    )
+    logger.info(
+        f"Download {len(downloads)} attachments "
+        f"({total_size / 2**20:.1f} MiB) using {jobs} workers..."
+    )
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(
+                _download, client, attachment, file_path, store, writer
+            ): attachment
+            for attachment, file_path in downloads
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Error as exc:
+                logger.error(str(exc))
+                failed += 1
+                continue
+
+            metrics.increment("attachments_written")
+            if checkpoint is not None:
+                checkpoint.mark_completed(futures[future]["id"])
+
+    if failed:
+        raise Error(f"Failed to download {failed} attachments")
+
+
+def open_store(
+    output_dir: str, options: ExportOptions
+) -> Optional[ObjectStore]:
+    """Open the store deduplicating exported files, if requested.
+
+    Args:
+        output_dir (str): Directory to save the output files.
+        options (ExportOptions): Options of the export.
+
+    Returns:
+        Optional[ObjectStore]: The store shared by all spaces of the output
+            directory, None without deduplication.
+    """
+    if not options.dedup:
+        return None
+    return ObjectStore(os.path.join(output_dir, OBJECTS_DIR))
+
+
+@contextlib.contextmanager
+def open_text_stages(
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    space_key: str,
+    output_dir: str,
+    options: ExportOptions,
+    keep: bool = False,
+    writer: Optional[FileWriter] = None,
+    removed: Collection[str] = (),
+    completed: Optional[Collection[str]] = None,
+    flushes: Optional[List[Callable[[], None]]] = None,
+) -> Iterator[List[Stage]]:
+    """Open the requested outputs fed with the plain text of pages.
+
+    Args:
+        space_key (str): The key of the Confluence space.
+        output_dir (str): Directory to save the output files.
+        options (ExportOptions): Options of the export.
+        keep (bool, optional): Whether to keep the chunks and index entries
+            written before, e.g. by an interrupted run, instead of starting
+            over (default is False).
+        writer (Optional[FileWriter], optional): Writer flushing the files
+            once closed (default is None).
+        removed (Collection[str], optional): IDs of pages whose kept chunks
+            and index entries are removed, e.g. as they are written again
+            (default is none).
+        completed (Optional[Collection[str]], optional): IDs of the only
+            pages whose kept chunks are kept, e.g. those completed by an
+            interrupted run (default is None, all pages).
+        flushes (Optional[List[Callable]], optional): List the functions
+            flushing the opened outputs are appended to (default is None).
+
+    Yields:
+        List[Stage]: Pipeline stages feeding the outputs, run between
+            rendering and writing.
+    """
+    stages: List[Stage] = []
+    with contextlib.ExitStack() as stack:
+        if options.chunks:
+            chunks_path = os.path.join(
+                mk_path("", space_key, output_dir), CHUNKS_FILE
+            )
+            if keep:
+                if completed is not None:
+                    keep_chunks(chunks_path, completed)
+                remove_chunks(chunks_path, removed)
+            chunks = stack.enter_context(
+                ChunkWriter(
+                    chunks_path, options.chunk_size, append=keep, writer=writer
+                )
+            )
+            stages.append(Stage("chunk", chunks.chunk))
+            if flushes is not None:
+                flushes.append(chunks.flush)
+
+        if options.search_index:
+            index = stack.enter_context(
+                SearchIndex(os.path.join(output_dir, SEARCH_INDEX_FILE))
+            )
+            if keep:
+                index.remove_pages(space_key, removed)
+            else:
+                index.remove_space(space_key)
+            stages.append(Stage("index", partial(index.index, space_key)))
+            if flushes is not None:
+                flushes.append(index.flush)
+
+        yield stages
+
+
+def export_space(
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    # pylint: disable=too-many-locals
+    space_key: str,
+    output_dir: str,
+    spill_threshold: int = 0,
+    resume: bool = False,
+    api: str = "v1",
+    options: Optional[ExportOptions] = None,
+) -> None:
     """Export all pages from a specified Confluence space.
 
     Args:
         space_key (str): The key of the Confluence space to export.
         output_dir (str): Directory to save the output files.
+        spill_threshold (int, optional): Number of pages kept in memory
+            before spilling them to a temporary file (default is 0, never
+            spill).
+        resume (bool, optional): Whether to continue from the checkpoint
+            left by an interrupted run (default is False).
+        api (str, optional): REST API version used to fetch pages (default
+            is v1).
+        options (Optional[ExportOptions], optional): Options for exporting
+            content besides pages (default is None, pages only).
     """
-    client = Confluence()
+    options = options or ExportOptions()
+    client = Confluence(api=api)
+    containers: Dict[str, str] = {}
+    store = open_store(output_dir, options)
+    writer = FileWriter(options.durability, options.atomic_writes)
+
+    # Files, chunks and index entries are flushed before the journal counts
+    # their pages as completed, as completed pages are not written again.
+    flushes: List[Callable[[], None]] = [writer.flush]
+
+    def flush_outputs() -> None:
+        for flush in flushes:
+            flush()
+
+    # The journal of pages is kept until blog posts and attachments are
+    # exported as well, so that resuming skips all completed work. Completed
+    # pages are on disk already, so the journal does without their bodies.
+    checkpoint = Checkpoint(
+        output_dir,
+        space_key,
+        "export-space",
+        before_flush=flush_outputs,
+        bodies=False,
+    )
+    posts_checkpoint = Checkpoint(
+        output_dir,
+        space_key,
+        "export-space-blogposts",
+        before_flush=flush_outputs,
+        bodies=False,
+    )
+    if options.blog_posts:
+        # Started before the chunks are opened, which keep the chunks of
+        # the blog posts completed by an interrupted run as well.
+        posts_checkpoint.start(resume)
+
+    with checkpoint.start(resume), writer, open_text_stages(
+        space_key,
+        output_dir,
+        options,
+        # Keep the chunks and index entries of the pages completed by an
+        # interrupted run. The chunks of other pages are written again.
+        keep=bool(checkpoint.completed),
+        writer=writer,
+        completed=checkpoint.completed | posts_checkpoint.completed,
+        flushes=flushes,
+    ) as stages:
+        pages = PageExporter(
+            space_key,
+            output_dir,
+            checkpoint=checkpoint,
+            store=store,
+            writer=writer,
+            formats=options.formats,
+        ).export(
+            lambda callback: client.get_all_pages_in_space(
+                space_key,
+                spill_threshold=spill_threshold,
+                checkpoint=checkpoint,
+                callback=callback,
+            ),
+            options.render_jobs,
+            options.write_jobs,
+            stages,
+        )
+        logger.info(f"Total {len(pages)} pages downloaded.\n")
+        if options.attachments:
+            containers.update(container_paths(pages))
+
+        if options.blog_posts:
+            with posts_checkpoint, writer:
+                posts = PageExporter(
+                    space_key,
+                    output_dir,
+                    BLOG_DIR,
+                    posts_checkpoint,
+                    store,
+                    writer,
+                    options.formats,
+                ).export(
+                    lambda callback: client.get_all_pages_in_space(
+                        space_key,
+                        spill_threshold=spill_threshold,
+                        checkpoint=posts_checkpoint,
+                        content_type="blogpost",
+                        callback=callback,
+                    ),
+                    options.render_jobs,
+                    options.write_jobs,
+                    stages,
+                )
+            logger.info(f"Total {len(posts)} blog posts downloaded.\n")
+            if options.attachments:
+                containers.update(container_paths(posts, BLOG_DIR))
 
-    pages = client.get_all_pages_in_space(space_key)
-    save_pages_to_files(pages, space_key, output_dir)
-    logger.info(f"Total {len(pages)} pages downloaded.\n")
+        if options.attachments:
+            downloads = plan_downloads(
+                client.get_all_attachments_in_space(space_key),
+                containers,
+                mk_path(ATTACHMENTS_DIR, space_key, output_dir),
+            )
+            download_attachments(
+                client, downloads, options.jobs, checkpoint, store, writer
+            )
+            logger.info(f"Total {len(downloads)} attachments downloaded.\n")
@@ -22,10 +22,13 @@ file.
 import csv
 import logging
 import os
-from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
 from swrangler.common import format_date, path
 from swrangler.confluence import Confluence
+from swrangler.metadata_db import MetadataDB
+from swrangler.metrics import metrics
 
 logger = logging.getLogger("swrangler")
 
@@ -39,15 +42,22 @@ class SpaceMetadata:
     CREATED_BY: str = "Created By"
     CREATED_DATE: str = "Created Date"
     SPACE_URL: str = "Space URL"
+    SPACE_OWNER: str = "Space Owner"
+    PAGE_COUNT: str = "Page Count"
+    LAST_ACTIVITY: str = "Last Activity"
 
     @classmethod
-    def get_fieldnames(cls) -> Tuple[str, ...]:
+    def get_fieldnames(cls, enriched: bool = False) -> Tuple[str, ...]:
         """Get the fieldnames for the CSV file.
 
+        Args:
+            enriched (bool, optional): Whether to include the columns filled
+                by the enrichment stage (default is False).
+
         Returns:
             tuple: Fieldnames for the CSV file.
         """
-        return (
+        fieldnames: Tuple[str, ...] = (
             cls.SPACE_KEY,
             cls.SPACE_NAME,
             cls.SPACE_TYPE,
@@ -55,22 +65,121 @@ class SpaceMetadata:
             cls.CREATED_DATE,
             cls.SPACE_URL,
         )
+        if enriched:
+            fieldnames += (
+                cls.SPACE_OWNER,
+                cls.PAGE_COUNT,
+                cls.LAST_ACTIVITY,
+            )
+        return fieldnames
 
+    @classmethod
+    def summary_to_dict(
+        cls, space: Dict[str, Any], summary: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Convert a space summary to the enriched columns for CSV writing.
 
-def export_spaces_metadata(output_dir: str) -> None:
-    """Export metadata of all Confluence spaces.
+        Args:
+            space (dict): Confluence space data.
+            summary (dict): Space summary, empty if enrichment failed.
+
+        Returns:
+            dict: Dictionary with the enriched columns.
+        """
+        last_activity = summary.get("last_activity")
+        return {
+            cls.SPACE_OWNER: path(
+                space, "homepage.history.ownedBy.displayName", ""
+            ),
+            cls.PAGE_COUNT: summary.get("page_count", ""),
+            cls.LAST_ACTIVITY: (
+                format_date(last_activity) if last_activity else ""
+            ),
+        }
+
+    @classmethod
+    def to_record(
+        cls, space: Dict[str, Any], summary: Dict[str, Any], base_url: str
+    ) -> Dict[str, Any]:
+        """Convert a space to a row of the metadata database.
+
+        Args:
+            space (dict): Confluence space data.
+            summary (dict): Space summary, empty if the space was not
+                enriched.
+            base_url (str): Base URL of the Confluence site.
+
+        Returns:
+            dict: Space metadata keyed by database columns.
+        """
+        return {
+            "space_key": space["key"],
+            "name": space["name"],
+            "type": space["type"],
+            "created_by": path(
+                space, "history.createdBy.displayName", "Confluence"
+            ),
+            "created_at": path(space, "history.createdDate"),
+            "url": base_url + path(space, "_links.webui"),
+            "owner": path(space, "homepage.history.ownedBy.displayName"),
+            "page_count": summary.get("page_count"),
+            "last_activity": summary.get("last_activity"),
+        }
+
+
+def enrich_spaces(
+    client: Confluence, spaces: List[Dict[str, Any]], jobs: int
+) -> Dict[str, Dict[str, Any]]:
+    """Fetch page counts and last activity of spaces concurrently.
+
+    Lookups are I/O bound, so they run in a bounded pool of threads sharing
+    the same client. A failure to enrich one space is logged and leaves its
+    columns empty instead of aborting the whole export.
 
     Args:
-        output_dir (str): Directory to save the CSV file.
-    """
-    client = Confluence()
+        client (Confluence): Confluence client.
+        spaces (list): List of Confluence spaces.
+        jobs (int): Maximum number of concurrent requests.
 
-    spaces = client.get_all_spaces()
+    Returns:
+        dict: Space summaries keyed by space key.
+    """
+    logger.info(f"Enrich {len(spaces)} spaces using {jobs} workers...")
+
+    def summarize(space_key: str) -> Dict[str, Any]:
+        try:
+            return client.get_space_summary(space_key)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            logger.warning(f"Failed to enrich space {space_key}: {exc}")
+            return {}
+
+    space_keys = [space["key"] for space in spaces]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        summaries = executor.map(summarize, space_keys)
+        return dict(zip(space_keys, summaries))
+
+
+def save_spaces_to_csv(
+    spaces: List[Dict[str, Any]],
+    summaries: Dict[str, Dict[str, Any]],
+    base_url: str,
+    output_dir: str,
+    enrich: bool = False,
+) -> None:
+    """Save metadata of Confluence spaces to a CSV file.
 
+    Args:
+        spaces (list): List of Confluence spaces.
+        summaries (dict): Space summaries keyed by space key.
+        base_url (str): Base URL of the Confluence site.
+        output_dir (str): Directory to save the CSV file.
+        enrich (bool, optional): Whether to add the columns filled by the
+            enrichment stage (default is False).
+    """
     csv_path = os.path.join(output_dir, "all-spaces.csv")
     os.makedirs(output_dir, exist_ok=True)
 
-    fieldnames = SpaceMetadata.get_fieldnames()
+    fieldnames = SpaceMetadata.get_fieldnames(enrich)
     with open(csv_path, mode="w", encoding="utf-8", newline="") as file:
         writer = csv.DictWriter(file, fieldnames=fieldnames)
         writer.writeheader()
@@ -82,17 +191,61 @@ def export_spaces_metadata(output_dir: str) -> None:
             )
 
             created_date = format_date(path(space, "history.createdDate"))
-            space_url = client.base_url + path(space, "_links.webui")
-
-            writer.writerow(
-                {
-                    SpaceMetadata.SPACE_KEY: space["key"],
-                    SpaceMetadata.SPACE_NAME: space["name"],
-                    SpaceMetadata.SPACE_TYPE: space["type"],
-                    SpaceMetadata.CREATED_BY: created_by,
-                    SpaceMetadata.CREATED_DATE: created_date,
-                    SpaceMetadata.SPACE_URL: space_url,
-                }
-            )
+            space_url = base_url + path(space, "_links.webui")
+
+            row = {
+                SpaceMetadata.SPACE_KEY: space["key"],
+                SpaceMetadata.SPACE_NAME: space["name"],
+                SpaceMetadata.SPACE_TYPE: space["type"],
+                SpaceMetadata.CREATED_BY: created_by,
+                SpaceMetadata.CREATED_DATE: created_date,
+                SpaceMetadata.SPACE_URL: space_url,
+            }
+
+            if enrich:
+                row.update(
+                    SpaceMetadata.summary_to_dict(
+                        space, summaries.get(space["key"], {})
+                    )
+                )
+
+            writer.writerow(row)
+        metrics.increment("bytes_written", file.tell())
 
     logger.info(f"CSV file saved to {csv_path}")
+
+
+def export_spaces_metadata(
+    output_dir: str,
+    enrich: bool = False,
+    jobs: int = 8,
+    metadata_db: Optional[str] = None,
+) -> None:
+    """Export metadata of all Confluence spaces.
+
+    Args:
+        output_dir (str): Directory to save the CSV file.
+        enrich (bool, optional): Whether to add page counts, last activity
+            and owners of spaces (default is False).
+        jobs (int, optional): Maximum number of concurrent requests used
+            by the enrichment stage (default is 8).
+        metadata_db (Optional[str], optional): Path to the SQLite file the
+            metadata is upserted into as well (default is None).
+    """
+    client = Confluence()
+
+    spaces = client.get_all_spaces()
+    summaries = enrich_spaces(client, spaces, jobs) if enrich else {}
+
+    save_spaces_to_csv(spaces, summaries, client.base_url, output_dir, enrich)
+    if metadata_db:
+        with MetadataDB(metadata_db, client.base_url) as db:
+            db.replace(
+                "spaces",
+                (
+                    SpaceMetadata.to_record(
+                        space, summaries.get(space["key"], {}), client.base_url
+                    )
+                    for space in spaces
+                ),
+            )
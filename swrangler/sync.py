@@ -0,0 +1,492 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Incremental sync of exported spaces.
+
+Exporting a space fetches every page of it. Syncing asks Confluence only
+for the content modified since the last successful sync of the space, with
+a CQL ``lastmodified`` query, and applies the changes to the exported
+files, chunks and search index entries and to the metadata of pages.
+Deleted content is detected with a listing of IDs, which is much cheaper
+than fetching the content itself. Requests for page bodies thus grow with
+the number of changes, not with the size of the space.
+
+The state of the sync of a space, the time its last successful sync started
+and the version and path of every synced page and blog post, is kept in
+``<output_dir>/<SPACE-KEY>/.sync.json``. The first sync of a space fetches
+all of its content.
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+)
+
+from swrangler.common import get_page_path, path
+from swrangler.confluence import Confluence
+from swrangler.file_writer import FileWriter
+from swrangler.metadata_db import MetadataDB
+from swrangler.page_metadata import page_to_record, update_pages_csv
+from swrangler.page_store import PageStore
+from swrangler.renderers import RENDERERS
+from swrangler.space_exporter import (
+    BLOG_DIR,
+    ExportOptions,
+    PageExporter,
+    open_store,
+    open_text_stages,
+)
+
+logger = logging.getLogger("swrangler")
+
+# Name of the file holding the state of the sync of a space.
+SYNC_STATE_FILE = ".sync.json"
+
+# Format of the time the last sync started.
+CURSOR_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# CQL compares dates to the minute and in the time zone of the user, so
+# changes are queried from a day before the last sync. Content synced
+# already is skipped by its version.
+CURSOR_OVERLAP = timedelta(days=1)
+
+# Number of pages fetched by ID with one query.
+ID_BATCH_SIZE = 100
+
+# Number of IDs requested at a time when listing the content of a space.
+LIST_LIMIT = 1000
+
+
+def content_path(content: Dict[str, Any]) -> str:
+    """Get the path of the files of a page relative to a format directory.
+
+    Args:
+        content (dict): Page or blog post with its ancestors.
+
+    Returns:
+        str: Path of the files without extension.
+    """
+    return get_page_path("", content)
+
+
+@dataclass
+class SyncState:
+    """State of the sync of a space.
+
+    Attributes:
+        cursor (Optional[str]): Time the last successful sync started, in
+            UTC. None before the first sync.
+        content (Dict[str, Dict[str, Any]]): Type, version and path of the
+            files of synced pages and blog posts, keyed by ID.
+    """
+
+    cursor: Optional[str] = None
+    content: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, file_path: str) -> "SyncState":
+        """Load the state from a file.
+
+        Args:
+            file_path (str): Path of the state file.
+
+        Returns:
+            SyncState: The loaded state, an empty one if the file does not
+                exist.
+        """
+        if not os.path.exists(file_path):
+            return cls()
+
+        with open(file_path, encoding="utf-8") as file:
+            state = json.load(file)
+        return cls(state["cursor"], state["content"])
+
+    def stale(self, changes: "Changes") -> Iterator[Dict[str, Any]]:
+        """Get the synced content whose files are outdated.
+
+        Args:
+            changes (Changes): Changes since the last sync.
+
+        Yields:
+            dict: Synced state of deleted content and of content whose path
+                changed.
+        """
+        for content_id, synced in self.content.items():
+            content = changes.changed.get(content_id)
+            if content_id in changes.deleted or (
+                content is not None and content_path(content) != synced["path"]
+            ):
+                yield synced
+
+    def apply(self, changes: "Changes", cursor: str) -> None:
+        """Record changes as synced.
+
+        Args:
+            changes (Changes): Changes since the last sync.
+            cursor (str): Time the sync started, in UTC.
+        """
+        for content_id in changes.deleted:
+            del self.content[content_id]
+        for content_id, content in changes.changed.items():
+            self.content[content_id] = {
+                "type": content["type"],
+                "version": path(content, "version.number"),
+                "path": content_path(content),
+            }
+        self.cursor = cursor
+
+    def save(self, file_path: str) -> None:
+        """Atomically write the state to a file.
+
+        Args:
+            file_path (str): Path of the state file.
+        """
+        os.makedirs(os.path.dirname(file_path) or os.curdir, exist_ok=True)
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"cursor": self.cursor, "content": self.content}, file)
+        os.replace(tmp_path, file_path)
+
+
+@dataclass
+class Changes:
+    """Changes of the content of a space since its last sync.
+
+    Attributes:
+        changed (Dict[str, Dict[str, Any]]): Created, modified and moved
+            pages and blog posts keyed by ID, with their versions and
+            ancestors but without their bodies.
+        deleted (Set[str]): IDs of deleted pages and blog posts.
+    """
+
+    changed: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    deleted: Set[str] = field(default_factory=set)
+
+
+def _search(
+    client: Confluence,
+    cql: str,
+    expand: Optional[str] = None,
+    limit: int = 100,
+) -> Iterator[Dict[str, Any]]:
+    """Search content with a CQL query, one result at a time."""
+    for results in client.search_content(cql, expand, limit):
+        yield from results
+
+
+def _is_changed(
+    content: Dict[str, Any], synced: Optional[Dict[str, Any]]
+) -> bool:
+    """Check whether a page or blog post differs from its synced state."""
+    return (
+        synced is None
+        or synced["version"] != path(content, "version.number")
+        or synced["path"] != content_path(content)
+    )
+
+
+def find_changes(
+    client: Confluence,
+    space_key: str,
+    content_types: Sequence[str],
+    state: SyncState,
+) -> Changes:
+    """Find the content of a space changed since its last sync.
+
+    The content modified since the last sync is listed with its versions
+    and ancestors, and the content whose version or path differs from the
+    synced state is kept. Pages below moved or renamed pages are changed as
+    well, as their paths change with them.
+
+    Args:
+        client (Confluence): Confluence client.
+        space_key (str): The key of the Confluence space.
+        content_types (Sequence[str]): Types of the synced content,
+            ``page`` and ``blogpost``.
+        state (SyncState): State of the last sync.
+
+    Returns:
+        Changes: Changed and deleted content.
+    """
+    scope = f'space = "{space_key}" and type in ({", ".join(content_types)})'
+    cql = scope
+    if state.cursor is not None:
+        since = datetime.strptime(state.cursor, CURSOR_FORMAT) - CURSOR_OVERLAP
+        cql += f' and lastmodified >= "{since:%Y-%m-%d %H:%M}"'
+
+    logger.info(f"Find changes of {space_key} space...")
+    changes = Changes()
+    for content in _search(client, cql, "version,ancestors"):
+        if _is_changed(content, state.content.get(content["id"])):
+            changes.changed[content["id"]] = content
+
+    synced = {
+        content_id
+        for content_id, entry in state.content.items()
+        if entry["type"] in content_types
+    }
+    if not synced:
+        return changes
+
+    current = {
+        content["id"] for content in _search(client, scope, limit=LIST_LIMIT)
+    }
+    changes.deleted = synced - current
+    for content_id in set(changes.changed) - current:
+        del changes.changed[content_id]  # Deleted since it was listed.
+
+    moved = [
+        content_id
+        for content_id, content in changes.changed.items()
+        if content_id in synced
+        and content["type"] == "page"
+        and content_path(content) != state.content[content_id]["path"]
+    ]
+    for page_id in moved:
+        descendants = f"ancestor = {page_id} and type = page"
+        for content in _search(client, descendants, "version,ancestors"):
+            changes.changed.setdefault(content["id"], content)
+
+    return changes
+
+
+def remove_files(
+    output_dir: str, space_key: str, synced: Dict[str, Any]
+) -> None:
+    """Remove the exported files of a page or blog post in all formats.
+
+    Directories left empty, such as the directory of a page without
+    children, are removed as well.
+
+    Args:
+        output_dir (str): Directory the space was exported to.
+        space_key (str): The key of the Confluence space.
+        synced (dict): Synced state of the page or blog post.
+    """
+    subdir = BLOG_DIR if synced["type"] == "blogpost" else ""
+    for extension in RENDERERS:
+        format_dir = os.path.join(output_dir, space_key, subdir, extension)
+        directory = os.path.join(format_dir, synced["path"])
+        file_path = f"{directory}.{extension}"
+        if os.path.lexists(file_path):
+            os.remove(file_path)
+
+        while (
+            directory != format_dir
+            and os.path.isdir(directory)
+            and not os.listdir(directory)
+        ):
+            os.rmdir(directory)
+            directory = os.path.dirname(directory)
+
+
+def fetch_content(
+    client: Confluence,
+    content_ids: List[str],
+    callback: Callable[[List[Dict[str, Any]]], None],
+    pages: Optional[PageStore] = None,
+) -> None:
+    """Fetch pages or blog posts with their bodies by ID.
+
+    Args:
+        client (Confluence): Confluence client.
+        content_ids (List[str]): IDs of the pages or blog posts.
+        callback (Callable): Function called with every batch of content.
+        pages (Optional[PageStore], optional): Store to collect the content
+            in as well (default is None).
+    """
+    for start in range(0, len(content_ids), ID_BATCH_SIZE):
+        batch = content_ids[start : start + ID_BATCH_SIZE]
+        for results in client.search_content(
+            f"id in ({','.join(batch)})",
+            Confluence.CONTENT_EXPAND,
+            ID_BATCH_SIZE,
+            "changed content",
+        ):
+            if pages is not None:
+                pages.extend(results)
+            callback(results)
+
+
+def export_changes(
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    client: Confluence,
+    space_key: str,
+    output_dir: str,
+    options: ExportOptions,
+    changes: Changes,
+    keep: bool,
+    spill_threshold: int = 0,
+) -> PageStore:
+    """Export changed pages and blog posts.
+
+    Args:
+        client (Confluence): Confluence client.
+        space_key (str): The key of the Confluence space.
+        output_dir (str): Directory the space was exported to.
+        options (ExportOptions): Options of the export.
+        changes (Changes): Changed and deleted content.
+        keep (bool): Whether to keep the chunks and search index entries of
+            unchanged content.
+        spill_threshold (int, optional): Number of pages kept in memory
+            before spilling them to a temporary file (default is 0, never
+            spill).
+
+    Returns:
+        PageStore: The changed pages, without blog posts.
+    """
+    pages = PageStore(spill_threshold)
+    store = open_store(output_dir, options)
+    writer = FileWriter(options.durability, options.atomic_writes)
+    removed = set(changes.changed) | changes.deleted
+
+    with writer, open_text_stages(
+        space_key, output_dir, options, keep, writer, removed
+    ) as stages:
+        for content_type, subdir in (("page", ""), ("blogpost", BLOG_DIR)):
+            content_ids = [
+                content_id
+                for content_id, content in changes.changed.items()
+                if content["type"] == content_type
+            ]
+            if not content_ids:
+                continue
+
+            PageExporter(
+                space_key,
+                output_dir,
+                subdir,
+                store=store,
+                writer=writer,
+                formats=options.formats,
+            ).export(
+                partial(
+                    fetch_content,
+                    client,
+                    content_ids,
+                    pages=pages if content_type == "page" else None,
+                ),
+                options.render_jobs,
+                options.write_jobs,
+                stages,
+            )
+
+    return pages
+
+
+def update_metadata(
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    client: Confluence,
+    space_key: str,
+    output_dir: str,
+    pages: Iterable[Dict[str, Any]],
+    deleted: Collection[str],
+    metadata_db: Optional[str] = None,
+) -> None:
+    """Apply changes of pages to their metadata.
+
+    The CSV file of page metadata is updated if ``pages-metadata`` saved
+    one for the space.
+
+    Args:
+        client (Confluence): Confluence client.
+        space_key (str): The key of the Confluence space.
+        output_dir (str): Directory the metadata was saved to.
+        pages (Iterable[dict]): Changed pages.
+        deleted (Collection[str]): IDs of deleted pages and blog posts.
+        metadata_db (Optional[str], optional): Path to the SQLite file of
+            metadata to update as well (default is None).
+    """
+    update_pages_csv(pages, deleted, space_key, output_dir)
+    if not metadata_db:
+        return
+
+    with MetadataDB(metadata_db, client.base_url) as db:
+        db.upsert("pages", (page_to_record(page, space_key) for page in pages))
+        db.delete("pages", ({"page_id": page_id} for page_id in deleted))
+
+
+def sync_space(
+    space_key: str,
+    output_dir: str,
+    options: Optional[ExportOptions] = None,
+    spill_threshold: int = 0,
+    metadata_db: Optional[str] = None,
+) -> None:
+    """Apply the changes of a space since its last sync to its export.
+
+    The state of the sync is saved once all changes are applied, so an
+    interrupted sync is repeated by the next one.
+
+    Args:
+        space_key (str): The key of the Confluence space.
+        output_dir (str): Directory the space is exported to.
+        options (Optional[ExportOptions], optional): Options of the export,
+            attachments are not synced (default is None, pages only).
+        spill_threshold (int, optional): Number of pages kept in memory
+            before spilling them to a temporary file (default is 0, never
+            spill).
+        metadata_db (Optional[str], optional): Path to the SQLite file of
+            metadata to update as well (default is None).
+    """
+    options = options or ExportOptions()
+    client = Confluence()
+    state_path = os.path.join(output_dir, space_key, SYNC_STATE_FILE)
+    state = SyncState.load(state_path)
+    started = datetime.now(timezone.utc).strftime(CURSOR_FORMAT)
+
+    content_types = ("page", "blogpost") if options.blog_posts else ("page",)
+    changes = find_changes(client, space_key, content_types, state)
+    logger.info(
+        f"Found {len(changes.changed)} changed and {len(changes.deleted)} "
+        f"deleted pages and blog posts in {space_key}"
+    )
+
+    # Files are removed before any are written, so that pages which swap
+    # their paths do not remove each other's files.
+    for synced in state.stale(changes):
+        remove_files(output_dir, space_key, synced)
+
+    pages = export_changes(
+        client,
+        space_key,
+        output_dir,
+        options,
+        changes,
+        state.cursor is not None,
+        spill_threshold,
+    )
+    update_metadata(
+        client, space_key, output_dir, pages, changes.deleted, metadata_db
+    )
+
+    state.apply(changes, started)
+    state.save(state_path)
+
+    logger.info(f"Total {len(changes.changed)} pages and blog posts synced.\n")
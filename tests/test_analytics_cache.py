@@ -0,0 +1,74 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+
+from swrangler.analytics_cache import AnalyticsCache
+
+
+@pytest.fixture
+def cache(tmpdir):
+    with AnalyticsCache(
+        str(tmpdir.join("cache", "analytics.sqlite")), "https://a.net"
+    ) as cache:
+        yield cache
+
+
+def test_put_and_get(cache):
+    cache.put("views", {"1": 10, "2": None, "3": 0})
+
+    assert cache.get("views", ["1", "2", "3", "4"]) == {"1": 10, "3": 0}
+    assert cache.get("viewers", ["1"]) == {}
+
+
+def test_get_many_ids(cache):
+    counts = {str(i): i for i in range(AnalyticsCache.BATCH_SIZE * 2 + 1)}
+    cache.put("views", counts)
+
+    assert cache.get("views", list(counts)) == counts
+
+
+def test_expired_counts(cache, mocker):
+    clock = mocker.patch("swrangler.analytics_cache.time.time")
+    clock.return_value = 1000
+    cache.put("views", {"1": 10})
+
+    clock.return_value = 1000 + cache.ttl + 1
+    assert cache.get("views", ["1"]) == {}
+    assert cache.get("views", ["1"], max_age=float("inf")) == {"1": 10}
+
+
+def test_sites_are_separate(tmpdir):
+    db_path = str(tmpdir.join("analytics.sqlite"))
+    with AnalyticsCache(db_path, "https://a.net") as cache:
+        cache.put("views", {"1": 10})
+    with AnalyticsCache(db_path, "https://b.net") as cache:
+        assert cache.get("views", ["1"]) == {}
+    with AnalyticsCache(db_path, "https://a.net") as cache:
+        assert cache.get("views", ["1"]) == {"1": 10}
+
+
+def test_lru_eviction(tmpdir, mocker):
+    clock = mocker.patch("swrangler.analytics_cache.time.time")
+    db_path = str(tmpdir.join("analytics.sqlite"))
+    with AnalyticsCache(db_path, "https://a.net", max_entries=2) as cache:
+        clock.return_value = 1
+        cache.put("views", {"1": 1, "2": 2})
+        clock.return_value = 2
+        cache.get("views", ["1"])
+        clock.return_value = 3
+        cache.put("views", {"3": 3})
+
+        assert cache.get("views", ["1", "2", "3"]) == {"1": 1, "3": 3}
@@ -0,0 +1,123 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+import os
+import sys
+
+from swrangler.bench import (
+    BenchmarkResult,
+    build_argv,
+    report,
+    run_benchmark,
+    spawn,
+)
+from swrangler.fake_server import FakeServerOptions
+
+
+def test_build_argv():
+    argv = build_argv("export-space", ["A", "B"], "out", ["--resume"])
+    assert argv == [
+        sys.executable,
+        "-m",
+        "swrangler",
+        "-q",
+        "export-space",
+        "--space-key",
+        "A,B",
+        "--output-dir",
+        "out",
+        "--resume",
+    ]
+
+    argv = build_argv("spaces-metadata", ["A"], "out")
+    assert "--space-key" not in argv
+
+    argv = build_argv("pages-metadata", ["A"], "out")
+    assert "--analytics-cache" not in argv
+
+
+def test_run_benchmark():
+    options = FakeServerOptions(pages=120, body_size=100)
+    results = run_benchmark(["owners-metadata"], options)
+
+    assert len(results) == 1
+    result = results[0]
+    assert result.exit_code == 0
+    assert result.items == 120
+    assert result.requests == 2  # 100 pages per request
+    assert result.peak_rss > 0
+    assert result.items_per_second > 0
+
+
+def test_report_saves_json(tmpdir):
+    result = BenchmarkResult(
+        command="export-space",
+        exit_code=0,
+        wall_time=2.0,
+        items=100,
+        requests=10,
+        failures=0,
+        bytes_received=1024,
+        peak_rss=2**20,
+    )
+    output_file = str(tmpdir.join("bench.json"))
+    report([result], FakeServerOptions(), output_file)
+
+    with open(output_file, encoding="utf-8") as file:
+        data = json.load(file)
+
+    assert data["results"][0]["items_per_second"] == 50.0
+    assert data["results"][0]["requests_per_second"] == 5.0
+    assert data["options"]["pages"] == 1000
+
+
+def test_run_benchmark_apis():
+    options = FakeServerOptions(pages=120, body_size=100)
+    results = run_benchmark(["owners-metadata"], options, apis=["v1", "v2"])
+
+    assert [result.api for result in results] == ["v1", "v2"]
+    assert all(result.exit_code == 0 for result in results)
+    # The space ID, a single batch of pages and a batch of users.
+    assert results[1].requests == 3
+
+
+def test_spawn_without_wait4(monkeypatch):
+    monkeypatch.delattr(os, "wait4")
+    exit_code, wall_time, peak_rss = spawn(
+        [sys.executable, "-c", "raise SystemExit(3)"], dict(os.environ)
+    )
+
+    assert exit_code == 3
+    assert wall_time > 0
+    assert peak_rss is None
+
+
+def test_report_without_peak_rss(caplog):
+    result = BenchmarkResult(
+        command="export-space",
+        exit_code=0,
+        wall_time=1.0,
+        items=1,
+        requests=1,
+        failures=0,
+        bytes_received=0,
+        peak_rss=None,
+    )
+    with caplog.at_level("INFO", logger="swrangler"):
+        report([result], FakeServerOptions())
+
+    assert caplog.records[-1].getMessage().endswith("n/a")
@@ -0,0 +1,162 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import threading
+
+import pytest
+
+from swrangler.checkpoint import Checkpoint
+
+
+def test_checkpoint_round_trip(tmpdir):
+    checkpoint = Checkpoint(str(tmpdir), "TEST", "export-space").start(False)
+    checkpoint.record_pages([{"id": "1"}, {"id": "2"}], {"start": 2})
+    checkpoint.mark_completed("1")
+    checkpoint.record_analytics("views", {"1": 10})
+    checkpoint.flush()
+
+    resumed = Checkpoint(str(tmpdir), "TEST", "export-space").start(True)
+
+    assert resumed.cursor == {"start": 2}
+    assert not resumed.pagination_done
+    assert resumed.completed == {"1"}
+    assert resumed.analytics == {"views": {"1": 10}}
+    assert resumed.pages_count == 2
+    assert [page["id"] for page in resumed.iter_pages()] == ["1", "2"]
+
+
+def test_checkpoint_drops_uncommitted_pages(tmpdir):
+    checkpoint = Checkpoint(str(tmpdir), "TEST", "export-space").start(False)
+    checkpoint.record_pages([{"id": "1"}], {"start": 1})
+    checkpoint.flush()
+
+    # Simulate a crash between appending pages and flushing the state.
+    checkpoint.record_pages([{"id": "2"}], {"start": 2})
+
+    resumed = Checkpoint(str(tmpdir), "TEST", "export-space").start(True)
+
+    assert resumed.cursor == {"start": 1}
+    assert [page["id"] for page in resumed.iter_pages()] == ["1"]
+
+
+def test_checkpoint_flushes_every_few_batches(tmpdir):
+    checkpoint = Checkpoint(
+        str(tmpdir), "TEST", "export-space", flush_batches=2
+    ).start(False)
+
+    checkpoint.record_pages([{"id": "1"}], {"start": 1})
+    assert not os.path.exists(checkpoint.state_path)
+
+    checkpoint.record_pages([{"id": "2"}], {"start": 2})
+    resumed = Checkpoint(str(tmpdir), "TEST", "export-space").start(True)
+    assert resumed.cursor == {"start": 2}
+    assert resumed.pages_count == 2
+
+
+def test_checkpoint_without_bodies_resumes_from_incomplete_batch(tmpdir):
+    checkpoint = Checkpoint(
+        str(tmpdir), "TEST", "export-space", bodies=False
+    ).start(False)
+    body = {"storage": {"value": "<p>Hello</p>"}}
+    checkpoint.record_pages(
+        [{"id": "1", "body": body}, {"id": "2", "body": body}],
+        {"start": 2},
+        {"start": 0},
+    )
+    checkpoint.record_pages([{"id": "3", "body": body}], None, {"start": 2})
+    for page_id in ("1", "2"):
+        checkpoint.mark_completed(page_id)
+    checkpoint.flush()
+
+    with open(checkpoint.pages_path, encoding="utf-8") as file:
+        assert "Hello" not in file.read()
+
+    resumed = Checkpoint(
+        str(tmpdir), "TEST", "export-space", bodies=False
+    ).start(True)
+
+    # Page 3 is not completed, it is fetched again with its body.
+    assert resumed.cursor == {"start": 2}
+    assert not resumed.pagination_done
+    assert resumed.pages_count == 2
+    assert list(resumed.iter_pages()) == [{"id": "1"}, {"id": "2"}]
+
+
+def test_checkpoint_without_journal_writes_nothing(tmpdir):
+    checkpoint = Checkpoint(str(tmpdir), "TEST", "pages-metadata")
+    with pytest.raises(KeyboardInterrupt):
+        with checkpoint.start(False, journal=False):
+            checkpoint.record_pages([{"id": "1"}], None)
+            checkpoint.record_analytics("views", {"1": 10})
+            checkpoint.flush()
+            raise KeyboardInterrupt
+
+    assert checkpoint.pages_count == 1
+    assert checkpoint.analytics == {"views": {"1": 10}}
+    assert not os.path.exists(checkpoint.directory)
+
+
+def test_checkpoint_without_resume_starts_from_scratch(tmpdir):
+    checkpoint = Checkpoint(str(tmpdir), "TEST", "export-space").start(False)
+    checkpoint.record_pages([{"id": "1"}], None)
+
+    fresh = Checkpoint(str(tmpdir), "TEST", "export-space").start(False)
+
+    assert fresh.cursor is None
+    assert not fresh.pagination_done
+    assert list(fresh.iter_pages()) == []
+
+
+def test_checkpoint_is_removed_on_success(tmpdir):
+    checkpoint = Checkpoint(str(tmpdir), "TEST", "export-space")
+    with checkpoint.start(False):
+        checkpoint.record_pages([{"id": "1"}], None)
+
+    assert not os.path.exists(checkpoint.directory)
+
+
+def test_checkpoint_is_kept_on_interrupt(tmpdir):
+    checkpoint = Checkpoint(str(tmpdir), "TEST", "export-space")
+    with pytest.raises(KeyboardInterrupt):
+        with checkpoint.start(False):
+            checkpoint.record_pages([{"id": "1"}], {"start": 1})
+            checkpoint.mark_completed("1")
+            raise KeyboardInterrupt
+
+    resumed = Checkpoint(str(tmpdir), "TEST", "export-space").start(True)
+    assert resumed.completed == {"1"}
+
+
+def test_checkpoint_is_thread_safe(tmpdir):
+    checkpoint = Checkpoint(str(tmpdir), "AIR", "export-space", 0)
+    checkpoint.start(False)
+
+    def complete(start):
+        for page_id in range(start, start + 200):
+            checkpoint.mark_completed(str(page_id))
+
+    threads = [
+        threading.Thread(target=complete, args=(start,))
+        for start in range(0, 800, 200)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    resumed = Checkpoint(str(tmpdir), "AIR", "export-space").start(True)
+    assert len(resumed.completed) == 800
@@ -0,0 +1,163 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+
+import pytest
+
+from swrangler.chunks import (
+    ChunkWriter,
+    keep_chunks,
+    remove_chunks,
+    split_text,
+)
+
+
+def chunks_of(text, size):
+    return [text[start:end] for start, end in split_text(text, size)]
+
+
+def test_split_text_packs_paragraphs():
+    text = "aaa\n\nbbb\n\ncccc\n\ndd"
+
+    assert chunks_of(text, 8) == ["aaa\n\nbbb", "cccc\n\ndd"]
+    assert chunks_of(text, 100) == [text]
+
+
+def test_split_text_splits_long_paragraphs_at_lines_and_words():
+    text = "aaa\nbbb\nccc\n\nd\n\nwords words words\n\n" + "x" * 9
+
+    assert chunks_of(text, 7) == [
+        "aaa\nbbb",
+        "ccc",
+        "d",
+        "words",
+        "words",
+        "words",
+        "xxxxxxx",
+        "xx",
+    ]
+
+
+@pytest.mark.parametrize("size", [1, 5, 40, 200])
+def test_split_text_offsets(size):
+    text = "\n\n".join(
+        "\n".join(f"line {i} of paragraph {p}" for i in range(p))
+        for p in range(1, 8)
+    )
+
+    spans = split_text(text, size)
+
+    assert all(end - start <= size for start, end in spans)
+    assert all(
+        previous[1] <= current[0] for previous, current in zip(spans, spans[1:])
+    )
+    # Only whitespace between chunks is dropped.
+    assert "".join(
+        "".join(text[start:end].split()) for start, end in spans
+    ) == "".join(text.split())
+
+
+@pytest.mark.parametrize("text", ["", " \n\n "])
+def test_split_text_blank(text):
+    assert split_text(text) == []
+
+
+def test_split_text_invalid_size():
+    with pytest.raises(ValueError, match="must be positive"):
+        split_text("text", 0)
+
+
+def test_chunk_writer(tmpdir):
+    file_path = str(tmpdir.join("chunks.ndjson"))
+    page = {
+        "id": "123",
+        "title": "Page",
+        "ancestors": [{"title": "Parent"}],
+        "body": {"storage": {"value": "<p>ignored</p>"}},
+    }
+    rendered = (page, [("html", "<p>...</p>"), ("txt", "first\n\nsecond")])
+
+    with ChunkWriter(file_path, size=6) as writer:
+        assert writer.chunk(rendered) == rendered
+
+    with open(file_path, encoding="utf-8") as file:
+        records = [json.loads(line) for line in file]
+    assert records == [
+        {
+            "page_id": "123",
+            "type": "page",
+            "title": "Page",
+            "path": "/Parent/Page",
+            "chunk": 0,
+            "start": 0,
+            "end": 5,
+            "text": "first",
+        },
+        {
+            "page_id": "123",
+            "type": "page",
+            "title": "Page",
+            "path": "/Parent/Page",
+            "chunk": 1,
+            "start": 7,
+            "end": 13,
+            "text": "second",
+        },
+    ]
+
+
+def test_chunk_writer_renders_text(tmpdir):
+    file_path = str(tmpdir.join("chunks.ndjson"))
+    page = {
+        "id": "123",
+        "title": "Page",
+        "ancestors": [],
+        "body": {"storage": {"value": "<p>Hello</p>"}},
+    }
+
+    with ChunkWriter(file_path) as writer:
+        writer.chunk((page, [("json", "{}")]))
+    with ChunkWriter(file_path, append=True) as writer:
+        writer.chunk((page, [("json", "{}")]))
+
+    with open(file_path, encoding="utf-8") as file:
+        records = [json.loads(line) for line in file]
+    assert [record["text"] for record in records] == ["Hello", "Hello"]
+
+
+def test_remove_chunks(tmpdir):
+    file_path = tmpdir.join("chunks.ndjson")
+    file_path.write(
+        "".join(
+            json.dumps({"page_id": page_id, "chunk": 0}) + "\n"
+            for page_id in ("1", "2", "3")
+        )
+    )
+
+    assert remove_chunks(str(file_path), {"1", "3"}) == 2
+    assert file_path.read().splitlines() == [
+        json.dumps({"page_id": "2", "chunk": 0})
+    ]
+    assert remove_chunks(str(tmpdir.join("missing.ndjson")), {"1"}) == 0
+
+
+def test_keep_chunks_drops_cut_off_record(tmpdir):
+    file_path = tmpdir.join("chunks.ndjson")
+    lines = [json.dumps({"page_id": page_id}) for page_id in "123"]
+    file_path.write("\n".join(lines))
+
+    assert keep_chunks(str(file_path), {"1", "3"}) == 2
+    assert file_path.read().splitlines() == lines[:1]
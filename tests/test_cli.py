@@ -13,10 +13,21 @@
 # You should have received a copy of the GNU General Public License
 # along with this file.  If not, see <https://www.gnu.org/licenses/>.
 
+import json
+import os
+import subprocess
+import sys
 from unittest import mock
 
+import pytest
+
+import swrangler
 from swrangler.cli import main
 from swrangler.exceptions import Error
+from swrangler.metrics import metrics
+from swrangler.page_metadata import AnalyticsOptions
+from swrangler.search_index import SearchIndex
+from swrangler.space_exporter import ExportOptions
 
 
 def test_main_no_args(monkeypatch):
@@ -37,7 +48,14 @@ def test_main_export(monkeypatch, mocker):
     with mock.patch("swrangler.space_exporter.export_space") as command_mock:
         command_mock.return_value = None
         main()
-        command_mock.assert_called_once_with("TEST", "output")
+        command_mock.assert_called_once_with(
+            "TEST",
+            "output",
+            spill_threshold=0,
+            resume=False,
+            api="v1",
+            options=ExportOptions(),
+        )
 
 
 def test_main_pages_metadata(monkeypatch, mocker):
@@ -50,20 +68,97 @@ def test_main_pages_metadata(monkeypatch, mocker):
     with mock.patch("swrangler.page_metadata.export_pages_metadata") as mck:
         mck.return_value = None
         main()
-        mck.assert_called_once_with("TEST", "output")
+        mck.assert_called_once_with(
+            "TEST",
+            "output",
+            spill_threshold=0,
+            resume=False,
+            analytics=AnalyticsOptions(),
+            api="v1",
+            metadata_db=None,
+        )
 
 
 def test_main_owners_metadata(monkeypatch, mocker):
     """Test calling main with owners-metadata command."""
     monkeypatch.setattr(
         "sys.argv",
-        ["swrangler", "owners-metadata", "-s", "TEST", "-o", "output"],
+        [
+            "swrangler",
+            "owners-metadata",
+            "-s",
+            "TEST",
+            "-o",
+            "output",
+            "--api",
+            "v2",
+        ],
     )
 
     with mock.patch("swrangler.owner_metadata.export_owners_metadata") as mck:
         mck.return_value = None
         main()
-        mck.assert_called_once_with("TEST", "output")
+        mck.assert_called_once_with(
+            "TEST",
+            "output",
+            spill_threshold=0,
+            resume=False,
+            api="v2",
+            metadata_db=None,
+        )
+
+
+def test_main_export_formats(monkeypatch, mocker):
+    """Test selecting the formats of exported pages."""
+    monkeypatch.setattr(
+        "sys.argv",
+        ["swrangler", "export-space", "-s", "TEST", "--formats", "txt,json"],
+    )
+
+    with mock.patch("swrangler.space_exporter.export_space") as command_mock:
+        main()
+        options = command_mock.call_args.kwargs["options"]
+        assert options.formats == ("txt", "json")
+
+
+def test_main_export_unknown_format(monkeypatch, capsys):
+    """Test rejecting unknown formats of exported pages."""
+    monkeypatch.setattr(
+        "sys.argv",
+        ["swrangler", "export-space", "-s", "TEST", "--formats", "pdf"],
+    )
+
+    with mock.patch("swrangler.space_exporter.export_space") as command_mock:
+        assert main() == 2
+        command_mock.assert_not_called()
+    assert "Unknown output formats: pdf" in capsys.readouterr().err
+
+
+def test_main_search(monkeypatch, tmpdir, capsys):
+    """Test searching exported pages."""
+    output_dir = str(tmpdir)
+    with SearchIndex(os.path.join(output_dir, "search.sqlite")) as index:
+        page = {"id": "1", "title": "Guide", "ancestors": []}
+        index.add("AIR", page, "How to deploy the service.")
+    metrics.reset()
+    monkeypatch.setattr(
+        "sys.argv", ["swrangler", "search", "deploy", "-o", output_dir]
+    )
+
+    main()
+
+    assert capsys.readouterr().out == (
+        "/Guide (AIR, page 1)\n    How to deploy the service.\n"
+    )
+
+
+def test_main_search_without_index(monkeypatch, tmpdir):
+    """Test searching without a search index."""
+    monkeypatch.setattr(
+        "sys.argv", ["swrangler", "search", "deploy", "-o", str(tmpdir)]
+    )
+
+    assert main() == 1
 
 
 def test_main_keyboard_interrupt(monkeypatch, mocker):
@@ -91,3 +186,202 @@ def test_main_error(monkeypatch, mocker):
     ):
         exit_code = main()
         assert exit_code == 1
+
+
+def test_main_spaces_metadata(monkeypatch, mocker):
+    """Test calling main with spaces-metadata command."""
+    monkeypatch.setattr(
+        "sys.argv",
+        [
+            "swrangler",
+            "spaces-metadata",
+            "-o",
+            "output",
+            "--enrich",
+            "-j",
+            "4",
+            "--metadata-db",
+            "metadata.sqlite",
+        ],
+    )
+
+    with mock.patch("swrangler.space_metadata.export_spaces_metadata") as mck:
+        mck.return_value = None
+        main()
+        mck.assert_called_once_with(
+            "output", enrich=True, jobs=4, metadata_db="metadata.sqlite"
+        )
+
+
+def test_main_export_resume(monkeypatch, mocker):
+    """Test calling main with export command and --resume."""
+    monkeypatch.setattr(
+        "sys.argv",
+        ["swrangler", "export-space", "-s", "TEST", "--resume"],
+    )
+
+    with mock.patch("swrangler.space_exporter.export_space") as command_mock:
+        command_mock.return_value = None
+        main()
+        command_mock.assert_called_once_with(
+            "TEST",
+            "output",
+            spill_threshold=0,
+            resume=True,
+            api="v1",
+            options=ExportOptions(),
+        )
+
+
+def test_main_export_sync(monkeypatch, mocker):
+    """Test calling main with export command and --sync."""
+    monkeypatch.setattr(
+        "sys.argv",
+        [
+            "swrangler",
+            "export-space",
+            "-s",
+            "TEST",
+            "--sync",
+            "--metadata-db",
+            "metadata.sqlite",
+        ],
+    )
+
+    with mock.patch("swrangler.sync.sync_space") as command_mock:
+        command_mock.return_value = None
+        main()
+        command_mock.assert_called_once_with(
+            "TEST",
+            "output",
+            ExportOptions(),
+            spill_threshold=0,
+            metadata_db="metadata.sqlite",
+        )
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--sync", "--resume"],
+        ["--sync", "--attachments"],
+        ["--sync", "--api", "v2"],
+        ["--metadata-db", "metadata.sqlite"],
+    ],
+)
+def test_main_export_sync_invalid_options(monkeypatch, args):
+    """Test rejecting options which do not apply to syncing."""
+    monkeypatch.setattr(
+        "sys.argv", ["swrangler", "export-space", "-s", "TEST", *args]
+    )
+
+    with mock.patch("swrangler.sync.sync_space") as command_mock:
+        assert main() == 2
+        command_mock.assert_not_called()
+
+
+def test_main_bench(monkeypatch, mocker):
+    """Test calling main with bench command."""
+    monkeypatch.setattr(
+        "sys.argv",
+        ["swrangler", "bench", "-c", "export-space", "--pages", "10"],
+    )
+
+    with mock.patch("swrangler.bench.run_benchmark") as mck:
+        with mock.patch("swrangler.bench.report"):
+            mck.return_value = []
+            main()
+
+    commands, options = mck.call_args[0]
+    assert commands == ("export-space",)
+    assert options.pages == 10
+
+
+def test_main_metrics_file(monkeypatch, mocker, tmpdir):
+    """Test saving metrics of a command."""
+    metrics_file = str(tmpdir.join("metrics.json"))
+    monkeypatch.setattr(
+        "sys.argv",
+        [
+            "swrangler",
+            "--metrics-file",
+            metrics_file,
+            "owners-metadata",
+            "-s",
+            "TEST",
+        ],
+    )
+
+    with mock.patch("swrangler.owner_metadata.export_owners_metadata"):
+        main()
+
+    with open(metrics_file, encoding="utf-8") as file:
+        assert set(json.load(file)) == {"counters", "stages", "buckets"}
+
+
+def test_main_pages_metadata_analytics_options(monkeypatch, mocker):
+    """Test calling pages-metadata with analytics options."""
+    monkeypatch.setattr(
+        "sys.argv",
+        [
+            "swrangler",
+            "pages-metadata",
+            "-s",
+            "TEST",
+            "--analytics-deadline",
+            "60",
+            "--analytics-error-ratio",
+            "0.2",
+            "--analytics-cache",
+            "cache.sqlite",
+            "--analytics-ttl",
+            "0",
+            "--analytics-top",
+            "100",
+        ],
+    )
+
+    with mock.patch("swrangler.page_metadata.export_pages_metadata") as mck:
+        main()
+        assert mck.call_args.kwargs["analytics"] == AnalyticsOptions(
+            deadline=60,
+            error_ratio=0.2,
+            cache_path="cache.sqlite",
+            cache_ttl=0,
+            top=100,
+        )
+
+
+# Dependencies which take most of the startup time, but are only needed
+# once a command talks to Confluence or writes its output.
+HEAVY_MODULES = ("atlassian", "bs4", "dotenv", "requests", "urllib3")
+SOURCE_DIR = os.path.dirname(os.path.dirname(swrangler.__file__))
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--help"],
+        ["--version"],
+        ["pages-metadata", "--help"],
+        ["submit", "--help"],
+    ],
+)
+def test_startup_imports(args, tmpdir):
+    """Test that the CLI starts without importing heavy dependencies."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "swrangler", *args],
+        capture_output=True,
+        check=False,
+        cwd=str(tmpdir),
+        env=dict(os.environ, HOME=str(tmpdir), PYTHONPATH=SOURCE_DIR),
+        text=True,
+    )
+
+    imported = {
+        line.rsplit("|", 1)[1].strip().split(".")[0]
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+    assert "swrangler" in imported, result.stderr
+    assert not imported.intersection(HEAVY_MODULES)
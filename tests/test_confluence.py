@@ -13,10 +13,23 @@
 # You should have received a copy of the GNU General Public License
 # along with this file.  If not, see <https://www.gnu.org/licenses/>.
 
+import pickle
+from unittest.mock import MagicMock
+
 import pytest
+import requests
 
-from swrangler.confluence import Confluence, DefaultRetryOptions
-from swrangler.exceptions import ConfigurationError
+from swrangler.checkpoint import Checkpoint
+from swrangler.common import path
+from swrangler.confluence import (
+    AnalyticsClient,
+    Confluence,
+    DefaultRetryOptions,
+    _fetch_analytics_batch,
+    _init_analytics_worker,
+)
+from swrangler.exceptions import ConfigurationError, Error
+from swrangler.fake_server import FakeConfluenceServer, FakeServerOptions
 
 
 def test_get_all_pages_in_space(mock_response, mocker, confluence):
@@ -101,3 +114,367 @@ def test_sanitise_retry_options_invalid():
     with pytest.raises(ValueError) as excinfo:
         confluence._sanitise_retry_options(invalid_options)
     assert str(excinfo.value) == "jitter_multiplier_range must be (min, max)."
+
+
+def test_get_all_pages_in_space_spills_to_disk(
+    mock_response_with_next, mocker, confluence
+):
+    mocker.patch(
+        "atlassian.Confluence.get_space_content",
+        side_effect=[
+            mock_response_with_next[0].json(),
+            mock_response_with_next[1].json(),
+        ],
+    )
+    pages = confluence.get_all_pages_in_space("TEST", spill_threshold=1)
+
+    assert pages.spilled
+    assert len(pages) == 2
+    assert [page["title"] for page in pages] == ["Test Page 1", "Test Page 2"]
+    pages.close()
+
+
+@pytest.fixture
+def space_summaries(monkeypatch):
+    summaries = {}
+    monkeypatch.setattr("swrangler.confluence._SPACE_SUMMARIES", summaries)
+    return summaries
+
+
+def test_get_space_summary_is_cached(mocker, confluence, space_summaries):
+    mock_cql = mocker.patch(
+        "atlassian.Confluence.cql",
+        return_value={
+            "results": [{"lastModified": "2024-05-01T10:00:00.000Z"}],
+            "totalSize": 42,
+        },
+    )
+
+    summary = confluence.get_space_summary("TEST")
+    # Clients created later, e.g. for the next command, reuse it.
+    assert Confluence().get_space_summary("TEST") is summary
+
+    assert summary == {
+        "page_count": 42,
+        "last_activity": "2024-05-01T10:00:00.000Z",
+    }
+    assert mock_cql.call_count == 1
+    assert list(space_summaries) == [(confluence.base_url, "TEST")]
+
+
+def test_get_space_summary_expires(
+    mocker, monkeypatch, confluence, space_summaries
+):
+    mock_cql = mocker.patch(
+        "atlassian.Confluence.cql",
+        return_value={"results": [], "totalSize": 3},
+    )
+    clock = mocker.patch("swrangler.confluence.time.monotonic")
+    clock.return_value = 100
+    confluence.get_space_summary("TEST")
+
+    monkeypatch.setenv("CONFLUENCE_DOMAIN", "https://other.atlassian.net")
+    Confluence().get_space_summary("TEST")
+    assert mock_cql.call_count == 2
+
+    clock.return_value = 100 + Confluence.SPACE_SUMMARY_TTL
+    confluence.get_space_summary("TEST")
+    assert mock_cql.call_count == 3
+
+
+def test_get_space_summary_empty_space(mocker, confluence, space_summaries):
+    mocker.patch(
+        "atlassian.Confluence.cql",
+        return_value={"results": [], "totalSize": 0},
+    )
+
+    summary = confluence.get_space_summary("EMPTY")
+
+    assert summary == {"page_count": 0, "last_activity": None}
+
+
+def test_get_all_pages_in_space_resumes_from_checkpoint(
+    mock_response_with_next, mocker, confluence, tmpdir
+):
+    checkpoint = Checkpoint(str(tmpdir), "TEST", "export-space").start(False)
+    checkpoint.record_pages(
+        mock_response_with_next[0].json()["results"], {"start": 1}
+    )
+
+    mock_get = mocker.patch(
+        "atlassian.Confluence.get_space_content",
+        return_value=mock_response_with_next[1].json(),
+    )
+    pages = confluence.get_all_pages_in_space("TEST", checkpoint=checkpoint)
+
+    mock_get.assert_called_once_with("TEST", start=1)
+    assert [page["title"] for page in pages] == ["Test Page 1", "Test Page 2"]
+    assert checkpoint.pagination_done
+    assert checkpoint.pages_count == 2
+
+
+def test_get_all_pages_in_space_retries_server_errors(
+    mock_response, mocker, confluence
+):
+    response = requests.Response()
+    response.status_code = 503
+    mock_get = mocker.patch(
+        "atlassian.Confluence.get_space_content",
+        side_effect=[
+            requests.HTTPError("Service Unavailable", response=response),
+            mock_response.json(),
+        ],
+    )
+    mock_sleep = mocker.patch("swrangler.retry.time.sleep")
+
+    pages = confluence.get_all_pages_in_space("TEST")
+
+    assert len(pages) == 1
+    assert mock_get.call_count == 2
+    assert mock_sleep.call_count == 1
+
+
+def test_get_all_pages_in_space_gives_up(mocker, confluence):
+    mocker.patch(
+        "atlassian.Confluence.get_space_content",
+        side_effect=requests.ConnectionError("Connection refused"),
+    )
+    mocker.patch("swrangler.retry.time.sleep")
+
+    with pytest.raises(Error, match="Connection refused"):
+        confluence.get_all_pages_in_space("TEST")
+
+
+def test_fetch_page_views_retries_rate_limits(mocker, confluence):
+    rate_limited = MagicMock(status_code=429, headers={"Retry-After": "1"})
+    rate_limited.raise_for_status.side_effect = requests.HTTPError(
+        response=rate_limited
+    )
+    ok = MagicMock(status_code=200)
+    ok.json.return_value = {"count": 7}
+    mocker.patch("requests.Session.get", side_effect=[rate_limited, ok])
+    mock_sleep = mocker.patch("swrangler.retry.time.sleep")
+
+    assert confluence.fetch_page_views("123", "views") == ("123", 7)
+    mock_sleep.assert_called_once_with(1.0)
+
+
+def test_fetch_page_views_after_deadline(mocker, confluence):
+    mock_get = mocker.patch("requests.Session.get")
+
+    assert confluence.fetch_page_views("123", "views", deadline=0) == (
+        "123",
+        None,
+    )
+    mock_get.assert_not_called()
+
+
+def test_fetch_page_views_circuit_open(mocker, confluence):
+    mock_get = mocker.patch("requests.Session.get")
+    mocker.patch.object(
+        confluence.analytics.breaker, "allow", return_value=False
+    )
+
+    assert confluence.fetch_page_views("123", "views") == ("123", None)
+    mock_get.assert_not_called()
+
+
+def test_get_page_analytics(monkeypatch):
+    options = FakeServerOptions(pages=50, body_size=10)
+    with FakeConfluenceServer(options) as server:
+        monkeypatch.setenv("CONFLUENCE_DOMAIN", server.url)
+        confluence = Confluence(
+            retry_options=DefaultRetryOptions(max_retries=0)
+        )
+        content_ids = [
+            server.content.page_id(0, i) for i in range(options.pages)
+        ]
+        batches = []
+
+        views = confluence.get_page_analytics(
+            content_ids, "views", callback=batches.append
+        )
+
+    assert views == {
+        content_id: server.content.views(content_id, "views")
+        for content_id in content_ids
+    }
+    assert len(batches) == 4  # The probed page and three batches.
+    assert sum(len(batch) for batch in batches) == options.pages
+
+
+def test_get_page_analytics_no_pages(confluence):
+    assert confluence.get_page_analytics([], "views") == {}
+
+
+def test_process_context_is_small(confluence):
+    context = confluence.analytics.context
+
+    assert len(pickle.dumps(context)) < len(pickle.dumps(confluence)) / 4
+    assert pickle.loads(pickle.dumps(context)) == context
+
+
+def test_init_analytics_worker(monkeypatch):
+    options = FakeServerOptions(pages=3, body_size=10)
+    with FakeConfluenceServer(options) as server:
+        monkeypatch.setenv("CONFLUENCE_DOMAIN", server.url)
+        confluence = Confluence()
+        content_ids = [
+            server.content.page_id(0, i) for i in range(options.pages)
+        ]
+
+        _init_analytics_worker(confluence.analytics.context)
+        results, worker_metrics = _fetch_analytics_batch(content_ids, "views")
+
+    assert results == {
+        content_id: server.content.views(content_id, "views")
+        for content_id in content_ids
+    }
+    assert worker_metrics["counters"]["requests"] == options.pages
+
+
+def test_get_page_analytics_unavailable(monkeypatch):
+    options = FakeServerOptions(pages=50, body_size=10, analytics=False)
+    with FakeConfluenceServer(options) as server:
+        monkeypatch.setenv("CONFLUENCE_DOMAIN", server.url)
+        confluence = Confluence()
+        content_ids = [
+            server.content.page_id(0, i) for i in range(options.pages)
+        ]
+
+        views = confluence.get_page_analytics(content_ids, "views")
+        viewers = confluence.get_page_analytics(content_ids, "viewers")
+
+        assert server.requests_count == AnalyticsClient.PROBE_SIZE
+
+    assert views == {}
+    assert viewers == {}
+    assert confluence.analytics.available is False
+
+
+def test_probe_ignores_other_failures(mocker, confluence):
+    mocker.patch(
+        "requests.Session.get",
+        side_effect=requests.ConnectionError("Connection refused"),
+    )
+    mocker.patch("swrangler.retry.time.sleep")
+
+    assert confluence.analytics.probe(["123", "124"], "views") == {}
+    assert confluence.analytics.available is True
+
+
+def test_probe_skips_missing_pages(monkeypatch):
+    options = FakeServerOptions(pages=30, body_size=10)
+    with FakeConfluenceServer(options) as server:
+        monkeypatch.setenv("CONFLUENCE_DOMAIN", server.url)
+        confluence = Confluence(
+            retry_options=DefaultRetryOptions(max_retries=0)
+        )
+        content_ids = ["deleted"] + [
+            server.content.page_id(0, i) for i in range(options.pages)
+        ]
+
+        views = confluence.get_page_analytics(content_ids, "views")
+
+        # Every page, including the probed ones, is requested once.
+        assert server.requests_count == len(content_ids)
+
+    assert confluence.analytics.available is True
+    assert views.pop("deleted") is None
+    assert views == {
+        content_id: server.content.views(content_id, "views")
+        for content_id in content_ids[1:]
+    }
+
+
+def test_get_all_pages_in_space_v2(monkeypatch):
+    options = FakeServerOptions(pages=600, body_size=10, fanout=3)
+    with FakeConfluenceServer(options) as server:
+        monkeypatch.setenv("CONFLUENCE_DOMAIN", server.url)
+        space_key = server.content.space_key(0)
+
+        v1_pages = list(
+            Confluence(api="v1").get_all_pages_in_space(space_key)
+        )
+        server.reset_stats()
+        v2_pages = list(
+            Confluence(api="v2").get_all_pages_in_space(space_key)
+        )
+
+        # The space ID, 3 batches of 250 pages and a batch of users.
+        assert server.requests_count == 5
+
+    assert len(v2_pages) == len(v1_pages) == options.pages
+    for v1_page, v2_page in zip(v1_pages, v2_pages):
+        for key in ("id", "title", "ancestors", "body", "_links"):
+            assert v2_page[key] == v1_page[key]
+        for key in (
+            "history.createdDate",
+            "history.lastUpdated.when",
+            "history.lastUpdated.by.displayName",
+            "history.ownedBy.accountId",
+            "history.ownedBy.displayName",
+            "version.number",
+        ):
+            assert path(v2_page, key) == path(v1_page, key)
+
+
+def test_get_all_pages_in_space_v2_resume_v1_checkpoint(tmpdir, confluence):
+    checkpoint = Checkpoint(str(tmpdir), "TEST", "export-space").start(False)
+    checkpoint.record_pages([{"id": "1"}], {"start": 1, "limit": 100})
+
+    confluence.api = "v2"
+    with pytest.raises(Error, match="another API version"):
+        confluence.get_all_pages_in_space("TEST", checkpoint=checkpoint)
+
+
+def test_unknown_api():
+    with pytest.raises(ValueError, match="api must be one of"):
+        Confluence(api="v3")
+
+
+@pytest.mark.parametrize("api", ["v1", "v2"])
+def test_get_all_blog_posts_in_space(monkeypatch, api):
+    options = FakeServerOptions(pages=3, body_size=10, blog_posts=30)
+    with FakeConfluenceServer(options) as server:
+        monkeypatch.setenv("CONFLUENCE_DOMAIN", server.url)
+        posts = Confluence(api=api).get_all_pages_in_space(
+            server.content.space_key(0), content_type="blogpost"
+        )
+
+    assert len(posts) == 30
+    assert posts[0]["type"] == "blogpost"
+    assert posts[0]["title"] == "Blog post 0"
+    assert posts[0]["ancestors"] == []
+
+
+def test_download_attachment_failure(monkeypatch, tmpdir):
+    options = FakeServerOptions(pages=3, attachments=1)
+    with FakeConfluenceServer(options) as server:
+        monkeypatch.setenv("CONFLUENCE_DOMAIN", server.url)
+        confluence = Confluence(
+            retry_options=DefaultRetryOptions(max_retries=0)
+        )
+        attachment = server.content.attachment(0, 1)
+        file_path = str(tmpdir.join("file.bin"))
+
+        with pytest.raises(Error, match="Failed to download file-1.bin"):
+            confluence.download_attachment(attachment, file_path)
+
+    assert not tmpdir.listdir()
+
+
+@pytest.mark.parametrize("api, batches", [("v1", 4), ("v2", 2)])
+def test_get_all_pages_in_space_callback(monkeypatch, api, batches):
+    options = FakeServerOptions(pages=350, body_size=10)
+    received = []
+    with FakeConfluenceServer(options) as server:
+        monkeypatch.setenv("CONFLUENCE_DOMAIN", server.url)
+        pages = Confluence(api=api).get_all_pages_in_space(
+            server.content.space_key(0), callback=received.append
+        )
+
+    assert len(received) == batches
+    assert [page for batch in received for page in batch] == list(pages)
+    # Pages of the v2 API are passed once their ancestors are known.
+    assert received[-1][-1]["ancestors"]
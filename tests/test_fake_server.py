@@ -0,0 +1,85 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import pytest
+import requests
+
+from swrangler.fake_server import FakeConfluenceServer, FakeServerOptions
+
+
+@pytest.fixture
+def fake_server():
+    options = FakeServerOptions(spaces=2, pages=30, body_size=100)
+    with FakeConfluenceServer(options) as server:
+        yield server
+
+
+def test_fake_server_paginates_pages(fake_server):
+    url = f"{fake_server.url}/rest/api/space/BENCH1/content/page"
+    data = requests.get(url, params={"limit": 25}, timeout=5).json()
+
+    assert len(data["results"]) == 25
+    assert data["results"][0]["id"] == "20000000"
+    assert data["_links"]["next"].endswith("limit=25&start=25")
+
+    data = requests.get(
+        url, params={"limit": 25, "start": 25}, timeout=5
+    ).json()
+
+    assert len(data["results"]) == 5
+    assert "next" not in data["_links"]
+    assert fake_server.requests_count == 2
+
+
+def test_fake_server_builds_page_tree(fake_server):
+    page = fake_server.content.page(0, 25)
+
+    assert [parent["title"] for parent in page["ancestors"]] == [
+        "Page 0",
+        "Page 2",
+    ]
+
+
+def test_fake_server_serves_analytics_with_wiki_prefix(fake_server):
+    url = f"{fake_server.url}/wiki/rest/api/analytics/content/10000007/views"
+    response = requests.get(url, timeout=5)
+
+    assert response.status_code == 200
+    assert response.json() == {"count": 7 * 13 * 3}
+
+
+def test_fake_server_unknown_route(fake_server):
+    url = f"{fake_server.url}/rest/api/space/UNKNOWN/content/page"
+    response = requests.get(url, timeout=5)
+
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize(
+    "options,status",
+    [
+        (FakeServerOptions(rate_limit_rate=1.0, retry_after=3), 429),
+        (FakeServerOptions(error_rate=1.0), 500),
+    ],
+)
+def test_fake_server_injects_failures(options, status):
+    with FakeConfluenceServer(options) as server:
+        response = requests.get(f"{server.url}/rest/api/space", timeout=5)
+
+    assert response.status_code == status
+    assert server.failures_count == 1
+    if status == 429:
+        assert response.headers["Retry-After"] == "3"
@@ -0,0 +1,106 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+
+import pytest
+
+from swrangler.checkpoint import Checkpoint
+from swrangler.file_writer import FileWriter
+
+
+@pytest.fixture
+def fsyncs(mocker):
+    return mocker.patch("swrangler.file_writer.os.fsync")
+
+
+def test_invalid_durability():
+    with pytest.raises(ValueError, match="durability must be one of"):
+        FileWriter("sometimes")
+
+
+def test_write_without_durability(tmpdir, fsyncs):
+    writer = FileWriter()
+
+    assert writer.write(str(tmpdir.join("a.txt")), b"page") == 4
+    writer.flush()
+
+    assert tmpdir.join("a.txt").read_binary() == b"page"
+    fsyncs.assert_not_called()
+
+
+def test_atomic_write_replaces_links(tmpdir):
+    first = tmpdir.join("a.txt")
+    second = tmpdir.join("b.txt")
+    first.write_binary(b"template")
+    os.link(str(first), str(second))
+
+    FileWriter(atomic=True).write(str(first), b"changed")
+
+    assert first.read_binary() == b"changed"
+    assert second.read_binary() == b"template"
+    assert sorted(name.basename for name in tmpdir.listdir()) == [
+        "a.txt",
+        "b.txt",
+    ]
+
+
+def test_full_durability_flushes_every_file(tmpdir, fsyncs):
+    writer = FileWriter("full")
+    for i in range(3):
+        writer.write(str(tmpdir.join(f"{i}.txt")), b"page")
+
+    # Every file and its directory, after the rename.
+    assert fsyncs.call_count == 6
+    assert not [name for name in tmpdir.listdir() if name.ext == ".tmp"]
+
+
+def test_batch_durability_flushes_in_batches(tmpdir, fsyncs):
+    directories = [tmpdir.mkdir("a"), tmpdir.mkdir("b")]
+    with FileWriter("batch", batch_size=4) as writer:
+        for i in range(5):
+            directory = directories[i % 2]
+            writer.write(str(directory.join(f"{i}.txt")), b"page")
+
+        # 4 files and their 2 directories.
+        assert fsyncs.call_count == 6
+
+    # The last file and its directory.
+    assert fsyncs.call_count == 8
+
+
+def test_written_flushes_files_written_by_others(tmpdir, fsyncs):
+    path = tmpdir.join("file.bin")
+    path.write_binary(b"attachment")
+
+    FileWriter("full").written(str(path))
+
+    assert fsyncs.call_count == 2
+
+
+def test_checkpoint_flushes_writer_first(tmpdir, mocker):
+    writer = FileWriter("batch")
+    flush = mocker.spy(writer, "flush")
+    checkpoint = Checkpoint(
+        str(tmpdir), "AIR", "export-space", before_flush=writer.flush
+    )
+
+    with checkpoint.start(False):
+        writer.write(str(tmpdir.join("a.txt")), b"page")
+        checkpoint.mark_completed("1")
+        checkpoint.flush()
+
+    assert flush.call_count >= 1
+    assert not writer._pending  # pylint: disable=protected-access
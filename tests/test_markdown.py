@@ -0,0 +1,210 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+
+from swrangler.markdown import format_markdown
+
+
+def test_format_markdown_text():
+    storage = (
+        "<h2>Title &amp; more</h2>"
+        "<p>Hello <strong>world</strong>, <em>see</em> "
+        '<a href="https://example.com">the\nsite</a>.</p>'
+        "<p>First line<br/>second&nbsp;line</p>"
+    )
+
+    assert format_markdown(storage) == (
+        "## Title & more\n\n"
+        "Hello **world**, *see* [the site](https://example.com).\n\n"
+        "First line\nsecond line"
+    )
+
+
+@pytest.mark.parametrize("storage", [None, "", "<p> </p>"])
+def test_format_markdown_empty(storage):
+    assert format_markdown(storage) == ""
+
+
+def test_format_markdown_lists():
+    storage = (
+        "<ul><li>one</li><li><p>two</p><ol><li>a</li><li>b</li></ol></li>"
+        "</ul><p>after</p>"
+    )
+
+    assert format_markdown(storage) == (
+        "- one\n- two\n    1. a\n    2. b\n\nafter"
+    )
+
+
+def test_format_markdown_list_paragraphs_align_with_item_text():
+    storage = (
+        "<ol><li><p>one</p></li><li><p>two</p><p>more</p>"
+        "<ul><li><p>a</p><p>b</p></li></ul><p>last</p></li></ol>"
+    )
+
+    assert format_markdown(storage) == (
+        "1. one\n2. two\n   more\n    - a\n      b\n   last"
+    )
+
+
+def test_format_markdown_code_block():
+    storage = (
+        "<p>Before</p>"
+        '<ac:structured-macro ac:name="code">'
+        '<ac:parameter ac:name="language">python</ac:parameter>'
+        '<ac:parameter ac:name="title">Example</ac:parameter>'
+        "<ac:plain-text-body><![CDATA[if a < b:\n"
+        "    print('<b>')]]></ac:plain-text-body>"
+        "</ac:structured-macro>"
+    )
+
+    assert format_markdown(storage) == (
+        "Before\n\n```python\nif a < b:\n    print('<b>')\n```"
+    )
+
+
+def test_format_markdown_code_block_with_fence():
+    storage = (
+        '<ac:structured-macro ac:name="noformat">'
+        "<ac:plain-text-body><![CDATA[```]]></ac:plain-text-body>"
+        "</ac:structured-macro>"
+    )
+
+    assert format_markdown(storage) == "````\n```\n````"
+
+
+def test_format_markdown_table():
+    storage = (
+        "<table><tbody>"
+        "<tr><th>Name</th><th>Value</th></tr>"
+        "<tr><td><p>a|b</p><p>c</p></td><td><code>x</code></td></tr>"
+        "<tr><td>short</td></tr>"
+        "</tbody></table>"
+    )
+
+    assert format_markdown(storage) == (
+        "| Name | Value |\n"
+        "| --- | --- |\n"
+        "| a\\|b c | `x` |\n"
+        "| short |  |"
+    )
+
+
+def test_format_markdown_confluence_links_and_images():
+    storage = (
+        "<p>See <ac:link><ri:page ri:content-title=\"Other\"/></ac:link>, "
+        "<ac:link><ri:page ri:content-title=\"Other\"/>"
+        "<ac:plain-text-link-body><![CDATA[that page]]>"
+        "</ac:plain-text-link-body></ac:link> and "
+        '<ac:link><ri:url ri:value="https://example.com"/></ac:link>.</p>'
+        '<p><ac:image><ri:attachment ri:filename="logo.png"/></ac:image></p>'
+    )
+
+    assert format_markdown(storage) == (
+        "See Other, that page and "
+        "[https://example.com](https://example.com).\n\n"
+        "![logo.png](logo.png)"
+    )
+
+
+def test_format_markdown_page_links():
+    storage = (
+        '<p><ac:link><ri:page ri:content-title="Other page"/></ac:link> and '
+        '<ac:link><ri:page ri:space-key="DOC" ri:content-title="Guide"/>'
+        "<ac:plain-text-link-body><![CDATA[the guide]]>"
+        "</ac:plain-text-link-body></ac:link></p>"
+        '<p><ac:image><ri:attachment ri:filename="logo.png">'
+        '<ri:page ri:content-title="Other page"/>'
+        "</ri:attachment></ac:image></p>"
+    )
+
+    assert format_markdown(storage, "https://acme.net/wiki", "ENG") == (
+        "[Other page](https://acme.net/wiki/display/ENG/Other+page) and "
+        "[the guide](https://acme.net/wiki/display/DOC/Guide)\n\n"
+        "![logo.png](logo.png)"
+    )
+
+
+@pytest.mark.parametrize(
+    "storage, expected",
+    [
+        ("<p>1. not list</p>", "1\\. not list"),
+        ("<p>10) not list</p>", "10\\) not list"),
+        ("<p># not heading</p>", "\\# not heading"),
+        ("<p>&gt; not quote</p>", "\\> not quote"),
+        ("<p>- not item</p>", "\\- not item"),
+        ("<p>+ not item</p>", "\\+ not item"),
+        ("<p>---</p>", "\\---"),
+        ("<ul><li>1. one</li></ul>", "- 1\\. one"),
+        ("<p>In 2024. Or - and + and #1</p>", "In 2024. Or - and + and #1"),
+    ],
+)
+def test_format_markdown_escapes_line_starts(storage, expected):
+    assert format_markdown(storage) == expected
+
+
+@pytest.mark.parametrize(
+    "storage, expected",
+    [
+        ("<p>a*b*c</p>", "a\\*b\\*c"),
+        ("<p>snake_case_name</p>", "snake\\_case\\_name"),
+        ("<p>a `b` c</p>", "a \\`b\\` c"),
+        ("<p>[a](b)</p>", "\\[a\\](b)"),
+        ("<p>&lt;br&gt;</p>", "\\<br>"),
+        ("<p>~~a~~</p>", "\\~\\~a\\~\\~"),
+        ("<p>C:\\temp</p>", "C:\\\\temp"),
+        ("<p><strong>a*b</strong></p>", "**a\\*b**"),
+    ],
+)
+def test_format_markdown_escapes_inline_text(storage, expected):
+    assert format_markdown(storage) == expected
+
+
+def test_format_markdown_does_not_escape_code():
+    storage = (
+        "<p><code>*a_b* [c] &lt;d&gt;</code></p>"
+        '<ac:structured-macro ac:name="code">'
+        "<ac:plain-text-body><![CDATA[# a_b *c*\n1. [d]]]>"
+        "</ac:plain-text-body></ac:structured-macro>"
+    )
+
+    assert format_markdown(storage) == (
+        "`*a_b* [c] <d>`\n\n```\n# a_b *c*\n1. [d]\n```"
+    )
+
+
+def test_format_markdown_macros():
+    storage = (
+        '<ac:structured-macro ac:name="info">'
+        '<ac:parameter ac:name="title">Note</ac:parameter>'
+        "<ac:rich-text-body><p>Careful</p><p>Really</p></ac:rich-text-body>"
+        "</ac:structured-macro>"
+        '<ac:structured-macro ac:name="toc">'
+        '<ac:parameter ac:name="maxLevel">2</ac:parameter>'
+        "</ac:structured-macro>"
+        "<ac:task-list>"
+        "<ac:task><ac:task-id>1</ac:task-id>"
+        "<ac:task-status>complete</ac:task-status>"
+        "<ac:task-body>Done</ac:task-body></ac:task>"
+        "<ac:task><ac:task-id>2</ac:task-id>"
+        "<ac:task-status>incomplete</ac:task-status>"
+        "<ac:task-body>To do</ac:task-body></ac:task>"
+        "</ac:task-list>"
+    )
+
+    assert format_markdown(storage) == (
+        "> Careful\n\n> Really\n\n- [x] Done\n- [ ] To do"
+    )
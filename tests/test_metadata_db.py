@@ -0,0 +1,114 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+import sqlite3
+
+import pytest
+
+from swrangler.metadata_db import MetadataDB
+
+
+@pytest.fixture
+def db_path(tmpdir):
+    return str(tmpdir.join("db", "metadata.sqlite"))
+
+
+def select(db_path, sql):
+    with sqlite3.connect(db_path) as connection:
+        return connection.execute(sql).fetchall()
+
+
+def test_upsert_in_batches(db_path):
+    records = (
+        {"page_id": str(i), "space_key": "AIR", "title": f"Page {i}"}
+        for i in range(7)
+    )
+    with MetadataDB(db_path, "https://a.net", batch_size=3) as db:
+        assert db.upsert("pages", records) == 7
+
+    assert select(db_path, "SELECT COUNT(*) FROM pages") == [(7,)]
+
+
+def test_upsert_keeps_known_values(db_path):
+    with MetadataDB(db_path, "https://a.net") as db:
+        db.upsert(
+            "pages",
+            [{"page_id": "1", "space_key": "AIR", "title": "A", "views": 5}],
+        )
+        db.upsert(
+            "pages",
+            [{"page_id": "1", "space_key": "AIR", "title": "B", "views": None}],
+        )
+
+    rows = select(db_path, "SELECT title, views FROM pages")
+    assert rows == [("B", 5)]
+
+
+def test_upsert_clears_values(db_path):
+    with MetadataDB(db_path, "https://a.net") as db:
+        db.upsert(
+            "spaces",
+            [{"space_key": "AIR", "owner": "John Doe", "page_count": 3}],
+        )
+        db.upsert(
+            "spaces",
+            [{"space_key": "AIR", "owner": None, "page_count": 0}],
+        )
+
+    rows = select(db_path, "SELECT owner, page_count FROM spaces")
+    assert rows == [(None, 0)]
+
+
+def test_replace_removes_stale_rows_of_space(db_path, mocker):
+    clock = mocker.patch("swrangler.metadata_db.time.time")
+    with MetadataDB(db_path, "https://a.net") as db:
+        clock.return_value = 1
+        db.upsert(
+            "owners",
+            [
+                {"space_key": "AIR", "owner": "John Doe"},
+                {"space_key": "AIR", "owner": "Jane Doe"},
+                {"space_key": "SEA", "owner": "Jane Doe"},
+            ],
+        )
+        clock.return_value = 2
+        db.replace("owners", [{"space_key": "AIR", "owner": "John Doe"}], "AIR")
+
+    rows = select(db_path, "SELECT space_key, owner FROM owners ORDER BY 1")
+    assert rows == [("AIR", "John Doe"), ("SEA", "Jane Doe")]
+
+
+def test_sites_are_separate(db_path):
+    with MetadataDB(db_path, "https://a.net") as db:
+        db.upsert("spaces", [{"space_key": "AIR", "name": "Air"}])
+    with MetadataDB(db_path, "https://b.net") as db:
+        db.replace("spaces", [{"space_key": "AIR", "name": "Other"}])
+
+    rows = select(db_path, "SELECT site, name FROM spaces ORDER BY 1")
+    assert rows == [("https://a.net", "Air"), ("https://b.net", "Other")]
+
+
+def test_delete(db_path):
+    with MetadataDB(db_path, "https://a.net") as db:
+        db.upsert(
+            "pages",
+            [
+                {"page_id": "1", "space_key": "AIR"},
+                {"page_id": "2", "space_key": "AIR"},
+            ],
+        )
+        assert db.delete("pages", [{"page_id": "1"}, {"page_id": "3"}]) == 1
+
+    assert select(db_path, "SELECT page_id FROM pages") == [("2",)]
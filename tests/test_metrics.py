@@ -0,0 +1,129 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+from unittest.mock import MagicMock
+
+from swrangler.metrics import (
+    BUCKETS,
+    Metrics,
+    emit,
+    metrics,
+    record_response,
+    to_prometheus,
+)
+
+
+def test_stage_records_runs():
+    registry = Metrics()
+
+    with registry.stage("render"):
+        pass
+    with registry.stage("render"):
+        pass
+
+    stage = registry.snapshot()["stages"]["render"]
+    assert stage["count"] == 2
+    assert stage["wall_time"] >= 0
+    assert sum(stage["buckets"]) == 2
+
+
+def test_observe_uses_histogram_buckets():
+    registry = Metrics()
+    registry.observe("write", 0.02, 0.01)
+    registry.observe("write", 3600, 1)
+
+    stage = registry.snapshot()["stages"]["write"]
+    assert stage["buckets"][BUCKETS.index(0.05)] == 1
+    # Durations above the last bucket are only in the total count.
+    assert sum(stage["buckets"]) == 1
+    assert stage["count"] == 2
+
+
+def test_merge_and_drain():
+    worker = Metrics()
+    worker.increment("requests", 3)
+    worker.observe("analytics", 0.2, 0.01)
+
+    parent = Metrics()
+    parent.increment("requests")
+    parent.merge(worker.drain())
+    parent.merge(worker.drain())
+
+    snapshot = parent.snapshot()
+    assert snapshot["counters"] == {"requests": 4}
+    assert snapshot["stages"]["analytics"]["count"] == 1
+    assert worker.snapshot() == {"counters": {}, "stages": {}}
+
+
+def test_record_response():
+    metrics.reset()
+    for status_code in (200, 429, 500):
+        response = MagicMock(status_code=status_code, content=b"{}")
+        record_response(response)
+
+    assert metrics.drain()["counters"] == {
+        "requests": 3,
+        "bytes_received": 6,
+        "rate_limited": 1,
+        "server_errors": 1,
+    }
+
+
+def test_record_response_does_not_read_streams():
+    metrics.reset()
+    response = MagicMock(status_code=200)
+    record_response(response, stream=True)
+
+    assert metrics.drain()["counters"] == {"requests": 1}
+    assert not response.content.__len__.called
+
+
+def test_to_prometheus():
+    registry = Metrics()
+    registry.increment("requests", 2)
+    registry.observe("pagination", 0.3, 0.1)
+
+    text = to_prometheus(registry.snapshot())
+
+    assert "swrangler_requests_total 2\n" in text
+    assert 'swrangler_stage_wall_seconds_total{stage="pagination"}' in text
+    assert (
+        'swrangler_stage_duration_seconds_bucket{stage="pagination",le="0.5"}'
+        " 1\n"
+    ) in text
+    assert (
+        'swrangler_stage_duration_seconds_bucket{stage="pagination",le="0.1"}'
+        " 0\n"
+    ) in text
+    assert 'swrangler_stage_duration_seconds_count{stage="pagination"} 1\n' in text
+
+
+def test_emit(tmpdir):
+    metrics.reset()
+    metrics.increment("pages_fetched", 10)
+    json_file = str(tmpdir.join("metrics.json"))
+    prometheus_file = str(tmpdir.join("metrics.prom"))
+
+    emit(json_file, prometheus_file)
+    metrics.reset()
+
+    with open(json_file, encoding="utf-8") as file:
+        data = json.load(file)
+    assert data["counters"] == {"pages_fetched": 10}
+    assert data["buckets"] == list(BUCKETS)
+
+    with open(prometheus_file, encoding="utf-8") as file:
+        assert "swrangler_pages_fetched_total 10" in file.read()
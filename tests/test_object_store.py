@@ -0,0 +1,82 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+
+from swrangler.object_store import ObjectStore
+
+
+def test_write_stores_content_once(tmpdir):
+    store = ObjectStore(str(tmpdir.join(".objects")))
+    first = str(tmpdir.join("a.txt"))
+    second = str(tmpdir.join("b.txt"))
+
+    assert store.write(first, b"template") == 8
+    assert store.write(second, b"template") == 0
+
+    assert os.path.samefile(first, second)
+    with open(second, "rb") as file:
+        assert file.read() == b"template"
+
+
+def test_write_replaces_existing_file(tmpdir):
+    store = ObjectStore(str(tmpdir.join(".objects")))
+    first = str(tmpdir.join("a.txt"))
+    second = str(tmpdir.join("b.txt"))
+    store.write(first, b"old")
+    store.write(second, b"old")
+
+    store.write(first, b"new")
+
+    with open(first, "rb") as file:
+        assert file.read() == b"new"
+    with open(second, "rb") as file:
+        assert file.read() == b"old"
+
+
+def test_adopt(tmpdir):
+    store = ObjectStore(str(tmpdir.join(".objects")))
+    first = tmpdir.join("a.bin")
+    second = tmpdir.join("b.bin")
+    first.write_binary(b"logo")
+    second.write_binary(b"logo")
+
+    assert store.adopt(str(first)) is False
+    assert store.adopt(str(second)) is True
+
+    assert os.path.samefile(str(first), str(second))
+    assert second.read_binary() == b"logo"
+
+
+def test_falls_back_to_symlinks(mocker, tmpdir):
+    mocker.patch("os.link", side_effect=OSError("Invalid cross-device link"))
+    store = ObjectStore(str(tmpdir.join(".objects")))
+    file_path = str(tmpdir.join("a.txt"))
+
+    store.write(file_path, b"template")
+
+    assert os.path.islink(file_path)
+    with open(file_path, "rb") as file:
+        assert file.read() == b"template"
+
+
+def test_write_same_content_again(tmpdir):
+    store = ObjectStore(str(tmpdir.join(".objects")))
+    file_path = str(tmpdir.join("a.txt"))
+    store.write(file_path, b"template")
+
+    assert store.write(file_path, b"template") == 0
+
+    assert sorted(os.listdir(str(tmpdir))) == [".objects", "a.txt"]
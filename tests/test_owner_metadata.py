@@ -13,6 +13,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this file.  If not, see <https://www.gnu.org/licenses/>.
 
+import sqlite3
 from collections import defaultdict
 
 from swrangler.common import people_url
@@ -95,3 +96,43 @@ def test_export_owners_metadata(mocker, tmpdir, mock_response_with_account_id):
 
     assert csv_file.exists()
     assert mock_get.call_count == 1
+
+
+def test_owner_to_record():
+    data = {
+        OwnerMetadata.UNLICENSED: "TRUE",
+        OwnerMetadata.PAGES_OWNED: 3,
+        OwnerMetadata.LAST_CONTRIBUTION: "07/11/2024",
+        OwnerMetadata.OWNER_URL: people_url("5b8e8643632a6b2c8f80b884"),
+    }
+
+    record = OwnerMetadata.to_record("Jane Doe (Unlicensed)", data, "AIR")
+
+    assert record["space_key"] == "AIR"
+    assert record["unlicensed"] is True
+    assert record["pages_owned"] == 3
+    assert record["last_contribution"] == "2024-07-11"
+
+
+def test_export_owners_metadata_to_db(
+    mocker, tmpdir, mock_response_with_account_id
+):
+    mocker.patch.object(
+        Confluence,
+        "get_all_pages_in_space",
+        return_value=mock_response_with_account_id.json()["results"],
+    )
+    db_path = str(tmpdir.join("metadata.sqlite"))
+
+    export_owners_metadata(
+        "AIR", str(tmpdir.mkdir("output")), metadata_db=db_path
+    )
+
+    with sqlite3.connect(db_path) as connection:
+        rows = connection.execute(
+            "SELECT space_key, owner, unlicensed FROM owners ORDER BY owner"
+        ).fetchall()
+    assert rows == [
+        ("AIR", "Jane Doe (Unlicensed)", 1),
+        ("AIR", "John Doe", 0),
+    ]
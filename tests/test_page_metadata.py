@@ -13,7 +13,21 @@
 # You should have received a copy of the GNU General Public License
 # along with this file.  If not, see <https://www.gnu.org/licenses/>.
 
-from swrangler.page_metadata import export_pages_metadata, save_pages_to_csv
+import csv
+import sqlite3
+
+from swrangler.analytics_cache import AnalyticsCache
+from swrangler.checkpoint import Checkpoint
+from swrangler.page_metadata import (
+    AnalyticsOptions,
+    PageMetadata,
+    export_pages_metadata,
+    fetch_all_analytics,
+    fetch_analytics,
+    prioritize_pages,
+    save_pages_to_csv,
+    update_pages_csv,
+)
 
 
 def test_save_pages_to_csv(tmpdir, mock_response):
@@ -24,10 +38,32 @@ def test_save_pages_to_csv(tmpdir, mock_response):
     assert csv_file.exists()
 
 
+def test_update_pages_csv(tmpdir, mock_response):
+    pages = mock_response.json()["results"]
+    output_dir = tmpdir.mkdir("output")
+    assert not update_pages_csv(pages, [], "AIR", str(output_dir))
+
+    pages[0]["viewers"], pages[0]["views"] = 3, 9
+    save_pages_to_csv(pages, "AIR", str(output_dir))
+    changed = dict(pages[0], title="Renamed Page")
+    del changed["viewers"], changed["views"]
+    assert update_pages_csv([changed], ["124"], "AIR", str(output_dir))
+
+    csv_file = output_dir.join("AIR/csv/pages-metadata.csv")
+    with open(str(csv_file), encoding="utf-8", newline="") as file:
+        rows = list(csv.DictReader(file))
+    assert [row[PageMetadata.PAGE_ID] for row in rows] == ["123"]
+    assert rows[0][PageMetadata.PAGE_TITLE] == "/Parent Page/Renamed Page"
+    assert rows[0][PageMetadata.TOTAL_VIEWS] == "9"
+
+
 def test_export_pages_metadata(mocker, tmpdir, mock_response):
     mock_object = "swrangler.confluence.Confluence.get_all_pages_in_space"
     mock_get_all_pages_in_space = mocker.patch(mock_object)
     mock_get_all_pages_in_space.return_value = mock_response.json()["results"]
+    mocker.patch(
+        "swrangler.confluence.Confluence.get_page_analytics", return_value={}
+    )
 
     output_dir = tmpdir.mkdir("output")
     export_pages_metadata("AIR", str(output_dir))
@@ -35,3 +71,102 @@ def test_export_pages_metadata(mocker, tmpdir, mock_response):
 
     assert csv_file.exists()
     assert mock_get_all_pages_in_space.call_count == 1
+
+
+def test_fetch_analytics_uses_cache(mocker, tmpdir, confluence):
+    clock = mocker.patch("swrangler.analytics_cache.time.time")
+    cache = AnalyticsCache(str(tmpdir.join("cache.sqlite")), "site")
+    clock.return_value = 0
+    cache.put("views", {"1": 5})
+    clock.return_value = cache.ttl + 1
+    cache.put("views", {"2": 7})
+
+    mock_analytics = mocker.patch.object(
+        confluence,
+        "get_page_analytics",
+        return_value={"1": None, "3": 9},
+    )
+    checkpoint = Checkpoint(str(tmpdir), "AIR", "pages-metadata").start(False)
+
+    counts = fetch_analytics(
+        confluence, ["1", "2", "3"], "views", checkpoint, cache=cache
+    )
+
+    # "2" is fresh in the cache, "1" is expired and could not be fetched.
+    assert mock_analytics.call_args.args == (["1", "3"], "views", None)
+    assert counts == {"1": 5, "2": 7, "3": 9}
+    assert cache.get("views", ["3"]) == {"3": 9}
+
+
+def make_pages(count):
+    return [
+        {
+            "id": str(i),
+            "history": {
+                "lastUpdated": {"when": f"2024-01-{i % 28 + 1:02}T00:00:00Z"}
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def test_prioritize_pages_orders_by_last_update():
+    pages = make_pages(3) + [{"id": "new"}]
+
+    assert prioritize_pages(pages) == ["2", "1", "0", "new"]
+
+
+def test_prioritize_pages_top_and_sample():
+    pages = make_pages(28)
+
+    assert prioritize_pages(pages, top=2) == ["27", "26"]
+
+    selected = prioritize_pages(pages, top=2, sample=0.5)
+    assert selected[:2] == ["27", "26"]
+    assert 2 < len(selected) < 28
+    assert selected == prioritize_pages(pages, top=2, sample=0.5)
+
+    assert len(prioritize_pages(pages, sample=1.0)) == 28
+    assert prioritize_pages(pages, sample=0.0) == []
+
+
+def test_fetch_all_analytics_splits_deadline(mocker, tmpdir, confluence):
+    mocker.patch("swrangler.page_metadata.time.time", return_value=100)
+    mock_analytics = mocker.patch.object(
+        confluence, "get_page_analytics", return_value={"0": 1}
+    )
+    checkpoint = Checkpoint(str(tmpdir), "AIR", "pages-metadata").start(False)
+
+    viewers, views = fetch_all_analytics(
+        confluence, make_pages(1), checkpoint, AnalyticsOptions(deadline=60)
+    )
+
+    assert viewers == views == {"0": 1}
+    assert [call.args for call in mock_analytics.call_args_list] == [
+        (["0"], "viewers", 130),
+        (["0"], "views", 160),
+    ]
+
+
+def test_export_pages_metadata_to_db(mocker, tmpdir, mock_response):
+    mocker.patch(
+        "swrangler.confluence.Confluence.get_all_pages_in_space",
+        return_value=mock_response.json()["results"],
+    )
+    mocker.patch(
+        "swrangler.confluence.Confluence.get_page_analytics",
+        return_value={"123": 7},
+    )
+    db_path = str(tmpdir.join("metadata.sqlite"))
+
+    export_pages_metadata(
+        "AIR",
+        str(tmpdir.mkdir("output")),
+        metadata_db=db_path,
+    )
+
+    with sqlite3.connect(db_path) as connection:
+        rows = connection.execute(
+            "SELECT space_key, page_id, views FROM pages"
+        ).fetchall()
+    assert rows == [("AIR", "123", 7)]
@@ -0,0 +1,69 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+
+import pytest
+
+from swrangler.page_store import PageStore
+
+
+def make_pages(count):
+    return [{"id": str(i), "title": f"Page {i}"} for i in range(count)]
+
+
+def test_page_store_keeps_pages_in_memory_by_default():
+    store = PageStore()
+    store.extend(make_pages(3))
+
+    assert not store.spilled
+    assert len(store) == 3
+    assert [page["id"] for page in store] == ["0", "1", "2"]
+
+
+def test_page_store_spills_above_threshold(tmpdir):
+    store = PageStore(spill_threshold=2, directory=str(tmpdir))
+    store.extend(make_pages(2))
+    assert not store.spilled
+
+    store.append({"id": "2", "title": "Page 2"})
+    store.extend(make_pages(5)[3:])
+
+    assert store.spilled
+    assert len(tmpdir.listdir()) == 1
+    assert len(store) == 5
+    assert [page["id"] for page in store] == ["0", "1", "2", "3", "4"]
+    assert store[0]["title"] == "Page 0"
+    assert store[-1]["title"] == "Page 4"
+
+
+def test_page_store_close_removes_database(tmpdir):
+    with PageStore(spill_threshold=1, directory=str(tmpdir)) as store:
+        store.extend(make_pages(3))
+        db_path = tmpdir.listdir()[0]
+        assert os.path.exists(db_path)
+
+    assert not os.path.exists(db_path)
+    assert len(store) == 0
+
+
+@pytest.mark.parametrize("spill_threshold", [0, 1])
+def test_page_store_index_out_of_range(spill_threshold, tmpdir):
+    store = PageStore(spill_threshold, directory=str(tmpdir))
+    store.extend(make_pages(2))
+
+    with pytest.raises(IndexError):
+        store[2]
@@ -0,0 +1,154 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+import threading
+import time
+
+import pytest
+
+from swrangler.pipeline import Pipeline, Stage
+
+
+def produce_range(count):
+    def produce(put):
+        for item in range(count):
+            put(item)
+        return count
+
+    return produce
+
+
+def test_pipeline_processes_all_items():
+    written = []
+    lock = threading.Lock()
+
+    def write(item):
+        with lock:
+            written.append(item)
+
+    pipeline = Pipeline(
+        [
+            Stage("render", lambda item: item * 2, workers=3),
+            Stage("write", write, workers=2),
+        ],
+        queue_size=4,
+    )
+
+    assert pipeline.run(produce_range(100)) == 100
+    assert sorted(written) == [item * 2 for item in range(100)]
+
+
+def test_pipeline_drops_none_results():
+    written = []
+    pipeline = Pipeline(
+        [
+            Stage("render", lambda item: item if item % 2 else None),
+            Stage("write", written.append),
+        ]
+    )
+
+    pipeline.run(produce_range(10))
+
+    assert written == [1, 3, 5, 7, 9]
+
+
+def test_pipeline_overlaps_stages():
+    def slow(item):
+        time.sleep(0.05)
+        return item
+
+    def produce(put):
+        for item in range(10):
+            time.sleep(0.05)
+            put(item)
+
+    pipeline = Pipeline([Stage("render", slow), Stage("write", slow)])
+    started = time.monotonic()
+    pipeline.run(produce)
+
+    # Run one after another, the stages would take 1.5s.
+    assert time.monotonic() - started < 1.2
+
+
+def test_pipeline_bounds_items_in_flight():
+    in_flight = []
+    lock = threading.Lock()
+    peak = [0]
+
+    def produce(put):
+        for item in range(50):
+            with lock:
+                in_flight.append(item)
+                peak[0] = max(peak[0], len(in_flight))
+            put(item)
+
+    def write(item):
+        time.sleep(0.001)
+        with lock:
+            in_flight.remove(item)
+
+    pipeline = Pipeline(
+        [Stage("render", lambda item: item), Stage("write", write)],
+        queue_size=2,
+    )
+    pipeline.run(produce)
+
+    # Two queues of two items, one item in each stage and one being put.
+    assert peak[0] <= 2 * 2 + 2 + 1
+
+
+def test_pipeline_stops_on_error():
+    produced = []
+
+    def produce(put):
+        for item in range(1000):
+            put(item)
+            produced.append(item)
+
+    def write(item):
+        if item == 3:
+            raise OSError("No space left on device")
+
+    pipeline = Pipeline(
+        [Stage("render", lambda item: item), Stage("write", write)],
+        queue_size=2,
+    )
+    with pytest.raises(OSError, match="No space left"):
+        pipeline.run(produce)
+
+    assert len(produced) < 1000
+
+
+def test_pipeline_stops_stages_when_producer_fails():
+    written = []
+
+    def produce(put):
+        put(1)
+        raise ValueError("Failed to fetch pages")
+
+    pipeline = Pipeline([Stage("write", written.append)])
+    with pytest.raises(ValueError, match="Failed to fetch"):
+        pipeline.run(produce)
+
+    assert not [
+        thread
+        for thread in threading.enumerate()
+        if thread.name.startswith("swrangler-write")
+    ]
+
+
+def test_pipeline_needs_stages():
+    with pytest.raises(ValueError):
+        Pipeline([])
@@ -0,0 +1,96 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+
+import pytest
+
+from swrangler.exceptions import Error
+from swrangler.renderers import (
+    DEFAULT_FORMATS,
+    RENDERERS,
+    get_renderers,
+    register,
+)
+
+
+@pytest.fixture
+def page():
+    return {
+        "id": "123",
+        "title": "Test Page",
+        "body": {"storage": {"value": "<p>Hello, world!</p>"}},
+    }
+
+
+def test_default_renderers(page):
+    renderers = get_renderers(DEFAULT_FORMATS)
+
+    assert [renderer.name for renderer in renderers] == ["html", "json", "txt"]
+    html, encoded, text = (renderer.func(page) for renderer in renderers)
+    assert "<h1>Test Page</h1>" in html
+    assert json.loads(encoded) == page
+    assert text == "Hello, world!"
+
+
+def test_render_md(page):
+    (renderer,) = get_renderers(["md"])
+
+    assert renderer.func(page) == "# Test Page\n\nHello, world!"
+
+
+def test_render_md_links_pages_of_the_space():
+    (renderer,) = get_renderers(["md"])
+    page = {
+        "title": "Home",
+        "body": {
+            "storage": {
+                "value": '<p><ac:link><ri:page ri:content-title="Guide"/>'
+                "</ac:link></p>"
+            }
+        },
+        "_links": {"webui": "/spaces/ENG/pages/123"},
+    }
+
+    assert renderer.func(page) == "# Home\n\n[Guide](/display/ENG/Guide)"
+
+
+def test_get_renderers_keeps_order_and_ignores_duplicates():
+    renderers = get_renderers(["txt", "json", "txt"])
+
+    assert [renderer.name for renderer in renderers] == ["txt", "json"]
+    assert renderers[1].stage == "encode"
+
+
+def test_get_renderers_unknown_format():
+    with pytest.raises(Error, match="Unknown output formats: pdf, doc"):
+        get_renderers(["html", "pdf", "doc"])
+
+
+def test_get_renderers_no_format():
+    with pytest.raises(Error, match="At least one output format"):
+        get_renderers([])
+
+
+def test_register(monkeypatch, page):
+    monkeypatch.setitem(RENDERERS, "title", RENDERERS["txt"])
+
+    @register("title")
+    def render_title(page):
+        return page["title"]
+
+    (renderer,) = get_renderers(["title"])
+    assert renderer.func(page) == "Test Page"
+    assert renderer.stage == "render"
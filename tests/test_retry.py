@@ -0,0 +1,197 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+import pickle
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from swrangler.exceptions import CircuitOpenError
+from swrangler.retry import (
+    Backoff,
+    CircuitBreaker,
+    CircuitBreakerOptions,
+    DefaultRetryOptions,
+    call_with_retry,
+    is_retryable,
+    retry_after,
+)
+
+
+def http_error(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return requests.HTTPError(f"{status_code} error", response=response)
+
+
+@pytest.fixture
+def mock_sleep(mocker):
+    return mocker.patch("swrangler.retry.time.sleep")
+
+
+@pytest.mark.parametrize("strategy", ["full", "decorrelated", "exponential"])
+def test_backoff_is_capped(strategy):
+    options = DefaultRetryOptions(
+        last_retry_delay=100, max_retry_delay=1000, strategy=strategy
+    )
+    backoff = Backoff(options)
+
+    delays = [backoff.next_delay(attempt) for attempt in range(10)]
+
+    # The exponential strategy may exceed the cap by its jitter multiplier.
+    assert all(0 <= delay <= 1.3 for delay in delays)
+
+
+def test_backoff_unknown_strategy():
+    with pytest.raises(ValueError):
+        Backoff(DefaultRetryOptions(strategy="linear"))
+
+
+def test_retry_after():
+    assert retry_after(http_error(429, {"Retry-After": "3"})) == 3.0
+    assert retry_after(http_error(429, {"Retry-After": "soon"})) is None
+    assert retry_after(http_error(500)) is None
+    assert retry_after(requests.ConnectionError()) is None
+
+
+def test_is_retryable():
+    assert is_retryable(http_error(429))
+    assert is_retryable(http_error(503))
+    assert is_retryable(requests.ConnectionError())
+    assert is_retryable(requests.Timeout())
+    assert not is_retryable(http_error(404))
+    assert not is_retryable(requests.HTTPError("no response"))
+
+
+def test_call_with_retry_recovers(mock_sleep):
+    func = MagicMock(side_effect=[http_error(500), http_error(502), 42])
+
+    assert call_with_retry(func, DefaultRetryOptions(), "test") == 42
+    assert func.call_count == 3
+    assert mock_sleep.call_count == 2
+
+
+def test_call_with_retry_sleeps_once_on_rate_limit(mock_sleep):
+    func = MagicMock(side_effect=[http_error(429, {"Retry-After": "2"}), 1])
+
+    call_with_retry(func, DefaultRetryOptions(), "test")
+
+    mock_sleep.assert_called_once_with(2.0)
+
+
+def test_call_with_retry_does_not_retry_client_errors(mock_sleep):
+    func = MagicMock(side_effect=http_error(404))
+
+    with pytest.raises(requests.HTTPError):
+        call_with_retry(func, DefaultRetryOptions(), "test")
+
+    assert func.call_count == 1
+    mock_sleep.assert_not_called()
+
+
+def test_call_with_retry_gives_up(mock_sleep):
+    func = MagicMock(side_effect=http_error(503))
+
+    with pytest.raises(requests.HTTPError):
+        call_with_retry(func, DefaultRetryOptions(max_retries=2), "test")
+
+    assert func.call_count == 3
+
+
+def test_call_with_retry_respects_deadline(mock_sleep):
+    func = MagicMock(side_effect=http_error(429, {"Retry-After": "10"}))
+
+    with pytest.raises(requests.HTTPError):
+        call_with_retry(func, DefaultRetryOptions(deadline=5000), "test")
+
+    assert func.call_count == 1
+    mock_sleep.assert_not_called()
+
+
+def test_circuit_breaker_opens_on_error_ratio():
+    breaker = CircuitBreaker(
+        "test", CircuitBreakerOptions(error_ratio=0.5, min_requests=4)
+    )
+
+    for success in (True, False, True):
+        breaker.record(success)
+    assert breaker.allow()
+
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_circuit_breaker_half_open(mocker):
+    clock = mocker.patch("swrangler.retry.time.monotonic", return_value=0)
+    breaker = CircuitBreaker(
+        "test", CircuitBreakerOptions(min_requests=1, cooldown=1000)
+    )
+    breaker.record(False)
+    assert not breaker.allow()
+
+    clock.return_value = 1
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only a single trial request is let through.
+    assert not breaker.allow()
+
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_pickle():
+    breaker = CircuitBreaker("test", CircuitBreakerOptions(min_requests=1))
+    breaker.record(False)
+
+    copy = pickle.loads(pickle.dumps(breaker))
+
+    assert copy.state == CircuitBreaker.OPEN
+    copy.record(False)
+
+
+def test_call_with_retry_fails_fast_when_circuit_opens(mock_sleep):
+    breaker = CircuitBreaker("test", CircuitBreakerOptions(min_requests=2))
+    func = MagicMock(side_effect=http_error(500))
+
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(func, DefaultRetryOptions(), "test", breaker)
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(func, DefaultRetryOptions(), "test", breaker)
+
+    assert func.call_count == 2
+    assert mock_sleep.call_count == 1
+
+
+def test_call_with_retry_client_errors_keep_circuit_closed(mock_sleep):
+    breaker = CircuitBreaker("test", CircuitBreakerOptions(min_requests=1))
+    func = MagicMock(side_effect=http_error(404))
+
+    with pytest.raises(requests.HTTPError):
+        call_with_retry(func, DefaultRetryOptions(), "test", breaker)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_call_with_retry_respects_global_deadline(mock_sleep, mocker):
+    mocker.patch("swrangler.retry.time.time", return_value=100)
+    func = MagicMock(side_effect=http_error(500))
+
+    with pytest.raises(requests.HTTPError):
+        call_with_retry(func, DefaultRetryOptions(), "test", deadline=100)
+
+    mock_sleep.assert_not_called()
@@ -0,0 +1,123 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+import sqlite3
+
+import pytest
+
+from swrangler.exceptions import Error
+from swrangler.search_index import SearchIndex
+
+
+def make_page(page_id, title, owner="Jane Doe", ancestors=()):
+    return {
+        "id": page_id,
+        "type": "page",
+        "title": title,
+        "ancestors": [{"title": ancestor} for ancestor in ancestors],
+        "history": {"ownedBy": {"displayName": owner}},
+    }
+
+
+@pytest.fixture
+def index(tmpdir):
+    with SearchIndex(str(tmpdir.join("search.sqlite"))) as index:
+        index.add(
+            "AIR",
+            make_page("1", "Deploy guide", ancestors=["Operations"]),
+            "How to release the service to production.",
+        )
+        index.add(
+            "AIR",
+            make_page("2", "Team notes", owner="John Roe"),
+            "We talked about the deploy of the service.",
+        )
+        index.add(
+            "SEA",
+            make_page("3", "Onboarding"),
+            "Read the deploy guide in the AIR space.",
+        )
+        index.flush()
+        yield index
+
+
+def test_search_ranks_titles_first(index):
+    results = index.search("deploy")
+
+    assert [result["page_id"] for result in results][0] == "1"
+    assert {result["page_id"] for result in results} == {"1", "2", "3"}
+    assert results[0] == {
+        "space_key": "AIR",
+        "page_id": "1",
+        "type": "page",
+        "title": "Deploy guide",
+        "path": "/Operations/Deploy guide",
+        "owner": "Jane Doe",
+        "snippet": "How to release the service to production.",
+    }
+
+
+def test_search_snippets_and_filters(index):
+    results = index.search("deploy", space_keys=["AIR"], limit=5)
+    notes = [result for result in results if result["page_id"] == "2"]
+
+    assert {result["space_key"] for result in results} == {"AIR"}
+    assert notes[0]["snippet"] == "We talked about the [deploy] of the service."
+    assert [r["page_id"] for r in index.search("owner:roe")] == ["2"]
+    assert [r["page_id"] for r in index.search("operations")] == ["1"]
+    assert len(index.search("deploy", limit=1)) == 1
+
+
+def test_add_replaces_pages(index):
+    index.add("AIR", make_page("2", "Team notes"), "Nothing to see.")
+    index.flush()
+
+    assert index.search("talked") == []
+    assert len(index.search("nothing")) == 1
+
+
+def test_remove_space(index):
+    index.remove_space("AIR")
+
+    assert [result["page_id"] for result in index.search("deploy")] == ["3"]
+
+
+def test_remove_pages(index):
+    index.remove_pages("AIR", ["1", "3"])
+
+    results = index.search("deploy")
+    assert sorted(result["page_id"] for result in results) == ["2", "3"]
+
+
+def test_invalid_query(index):
+    with pytest.raises(Error, match="Invalid search query"):
+        index.search('"unbalanced')
+
+
+def test_add_writes_in_batches(tmpdir):
+    db_path = str(tmpdir.join("search.sqlite"))
+
+    def count():
+        with sqlite3.connect(db_path) as connection:
+            return connection.execute("SELECT COUNT(*) FROM search").fetchone()
+
+    with SearchIndex(db_path, batch_size=2) as index:
+        index.add("AIR", make_page("1", "One"), "text")
+        assert count() == (0,)
+        index.add("AIR", make_page("2", "Two"), "text")
+        assert count() == (2,)
+        index.add("AIR", make_page("3", "Three"), "text")
+
+    assert count() == (3,)
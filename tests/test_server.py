@@ -0,0 +1,116 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import socket
+import stat
+import threading
+
+import pytest
+
+from swrangler.commands import check_job, run
+from swrangler.exceptions import Error
+from swrangler.fake_server import FakeConfluenceServer, FakeServerOptions
+from swrangler.server import Server, default_socket_path, submit
+
+
+@pytest.fixture
+def server(tmpdir):
+    """Fixture running a server in a background thread."""
+    instance = Server(str(tmpdir.join("swrangler.sock")), run, check_job)
+    thread = threading.Thread(target=instance.serve_forever, daemon=True)
+    thread.start()
+    yield instance
+    instance.shutdown()
+    instance.server_close()
+    thread.join()
+
+
+def test_default_socket_path(monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+    assert default_socket_path() == "/run/user/1000/swrangler.sock"
+
+
+def test_socket_is_private(server):
+    mode = stat.S_IMODE(os.stat(server.socket_path).st_mode)
+    assert mode == stat.S_IRUSR | stat.S_IWUSR
+
+
+def test_submit(capsys, monkeypatch, server, tmpdir):
+    monkeypatch.setattr("swrangler.confluence._SESSIONS", {})
+    monkeypatch.chdir(tmpdir)
+    with FakeConfluenceServer(FakeServerOptions(pages=10)) as fake:
+        monkeypatch.setenv("CONFLUENCE_DOMAIN", fake.url)
+        for _ in range(2):
+            exit_code = submit(
+                ["owners-metadata", "-s", "BENCH0"], server.socket_path
+            )
+            assert exit_code == 0
+
+    output = capsys.readouterr().out
+    assert "CSV file saved to output/BENCH0/csv" in output
+    assert tmpdir.join("output/BENCH0/csv/owners-metadata.csv").exists()
+
+    # Both commands used the same HTTP session.
+    from swrangler.confluence import _SESSIONS
+
+    assert len(_SESSIONS) == 1
+
+
+def test_submit_failing_command(capsys, server):
+    assert submit(["no-such-command"], server.socket_path) == 2
+    assert "No such command" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["submit", "spaces-metadata"],
+        ["-q", "--metrics-file", "metrics.json", "serve"],
+        ["bench"],
+    ],
+)
+def test_submit_rejects_server_commands(capsys, server, args):
+    assert submit(args, server.socket_path) == 2
+    assert "Cannot run" in capsys.readouterr().err
+    assert server.jobs.empty()
+
+
+def test_jobs_keep_server_state(capsys, server, tmpdir):
+    cwd = os.getcwd()
+    submit(["-q", "spaces-metadata", "--help"], server.socket_path)
+
+    assert os.getcwd() == cwd
+    assert "Export metadata" in capsys.readouterr().out
+
+
+def test_submit_without_server(tmpdir):
+    with pytest.raises(Error, match="Failed to connect"):
+        submit(["spaces-metadata"], str(tmpdir.join("missing.sock")))
+
+
+def test_stale_socket_is_replaced(tmpdir):
+    socket_path = str(tmpdir.join("swrangler.sock"))
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.bind(socket_path)
+
+    with Server(socket_path, run) as server:
+        assert server.socket_path == socket_path
+    assert not os.path.exists(socket_path)
+
+
+def test_one_server_per_socket(server):
+    with pytest.raises(Error, match="Another server"):
+        Server(server.socket_path, run)
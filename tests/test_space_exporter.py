@@ -13,8 +13,28 @@
 # You should have received a copy of the GNU General Public License
 # along with this file.  If not, see <https://www.gnu.org/licenses/>.
 
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from swrangler.checkpoint import Checkpoint
 from swrangler.confluence import Confluence
-from swrangler.space_exporter import export_space, save_pages_to_files
+from swrangler.exceptions import Error
+from swrangler.fake_server import FakeConfluenceServer, FakeServerOptions
+from swrangler.metrics import metrics
+from swrangler.object_store import ObjectStore
+from swrangler.search_index import SearchIndex
+from swrangler.space_exporter import (
+    ExportOptions,
+    PageExporter,
+    download_attachments,
+    export_space,
+    plan_downloads,
+    save_pages_to_files,
+    write_file,
+)
 
 
 def test_save_pages_to_files(tmpdir, mock_response):
@@ -28,11 +48,40 @@ def test_save_pages_to_files(tmpdir, mock_response):
     assert output_dir.join("AIR/txt/Parent Page/Test Page.txt").exists()
 
 
+def test_save_pages_to_files_formats(mocker, tmpdir, mock_response):
+    pages = mock_response.json()["results"]
+    output_dir = tmpdir.mkdir("output")
+    format_text = mocker.patch("swrangler.renderers.format_text")
+
+    exporter = PageExporter("AIR", str(output_dir), formats=["json"])
+    exporter.export(lambda callback: callback(pages))
+
+    assert output_dir.join("AIR/json/Parent Page/Test Page.json").exists()
+    assert output_dir.join("AIR").listdir() == [output_dir.join("AIR/json")]
+    format_text.assert_not_called()
+
+
+def test_page_exporter_unknown_format(tmpdir):
+    with pytest.raises(Error, match="Unknown output formats: pdf"):
+        PageExporter("AIR", str(tmpdir), formats=["txt", "pdf"])
+
+
+def fake_pages(pages):
+    """Build a fake of Confluence.get_all_pages_in_space."""
+
+    def get_all_pages_in_space(space_key, callback=None, **kwargs):
+        if callback is not None:
+            callback(pages)
+        return pages
+
+    return get_all_pages_in_space
+
+
 def test_export_space(mocker, tmpdir, mock_response):
     mock_get_all_pages_in_space = mocker.patch.object(
         Confluence,
         "get_all_pages_in_space",
-        return_value=mock_response.json()["results"],
+        side_effect=fake_pages(mock_response.json()["results"]),
     )
     output_dir = tmpdir.mkdir("output")
     export_space("AIR", str(output_dir))
@@ -42,3 +91,288 @@ def test_export_space(mocker, tmpdir, mock_response):
     assert output_dir.join("AIR/txt/Parent Page/Test Page.txt").exists()
 
     assert mock_get_all_pages_in_space.call_count == 1
+
+
+def test_save_pages_to_files_skips_completed_pages(tmpdir, mock_response):
+    pages = mock_response.json()["results"]
+    output_dir = tmpdir.mkdir("output")
+    checkpoint = Checkpoint(str(output_dir), "AIR", "export-space")
+    checkpoint.start(False).mark_completed("123")
+
+    save_pages_to_files(pages, "AIR", str(output_dir), checkpoint)
+
+    assert not output_dir.join("AIR/html/Parent Page/Test Page.html").exists()
+
+
+def test_export_space_resume(mocker, tmpdir, mock_response):
+    mocker.patch.object(
+        Confluence,
+        "get_all_pages_in_space",
+        side_effect=fake_pages(mock_response.json()["results"]),
+    )
+    output_dir = tmpdir.mkdir("output")
+    export_space("AIR", str(output_dir), resume=True)
+
+    assert output_dir.join("AIR/html/Parent Page/Test Page.html").exists()
+    assert not output_dir.join("AIR/.checkpoint").listdir()
+
+
+def test_export_space_blog_posts_and_attachments(monkeypatch, tmpdir):
+    options = FakeServerOptions(
+        pages=5, body_size=10, blog_posts=2, attachments=7, attachment_size=10
+    )
+    output_dir = tmpdir.mkdir("output")
+    with FakeConfluenceServer(options) as server:
+        monkeypatch.setenv("CONFLUENCE_DOMAIN", server.url)
+        space_key = server.content.space_key(0)
+        export_space(
+            space_key,
+            str(output_dir),
+            options=ExportOptions(blog_posts=True, attachments=True, jobs=2),
+        )
+
+    space_dir = output_dir.join(space_key)
+    assert space_dir.join("html/Page 0.html").exists()
+    assert space_dir.join("blog/html/Blog post 1.html").exists()
+    assert space_dir.join("blog/json/Blog post 1.json").exists()
+
+    # Attachment 6 belongs to page 1, a child of page 0.
+    attachment = space_dir.join("attachments/Page 0/Page 1/file-6.bin")
+    assert attachment.size() == 30
+    page_id = server.content.page_id(0, 1)
+    assert attachment.read_binary() == server.content.attachment_data(
+        page_id, "file-6.bin"
+    )
+    assert len(space_dir.join("attachments").listdir()) == 1
+    assert not space_dir.join(".checkpoint").listdir()
+
+
+def test_plan_downloads_largest_first():
+    attachments = [
+        {
+            "id": f"att{size}",
+            "title": f"{size}/b.bin",
+            "extensions": {"fileSize": size},
+            "container": {"id": container_id},
+        }
+        for size, container_id in ((10, "1"), (30, "2"), (20, "3"))
+    ]
+
+    downloads = plan_downloads(attachments, {"1": "A", "2": "A/B"}, "out")
+
+    assert downloads == [
+        (attachments[1], os.path.join("out", "A", "B", "30-b.bin")),
+        (attachments[2], os.path.join("out", "3", "20-b.bin")),
+        (attachments[0], os.path.join("out", "A", "10-b.bin")),
+    ]
+
+
+def test_download_attachments_failure(mocker, tmpdir):
+    client = mocker.Mock()
+    client.download_attachment.side_effect = [10, Error("Not found")]
+    checkpoint = Checkpoint(str(tmpdir), "AIR", "export-space").start(False)
+    checkpoint.mark_completed("att0")
+    downloads = [
+        ({"id": f"att{i}"}, str(tmpdir.join(f"{i}/file.bin")))
+        for i in range(3)
+    ]
+
+    with pytest.raises(Error, match="Failed to download 1 attachments"):
+        download_attachments(client, downloads, 1, checkpoint)
+
+    assert client.download_attachment.call_count == 2
+    assert checkpoint.completed == {"att0", "att1"}
+
+
+def test_export_space_dedup(monkeypatch, tmpdir):
+    options = FakeServerOptions(
+        pages=3, body_size=10, attachments=8, attachment_size=10
+    )
+    output_dir = tmpdir.mkdir("output")
+    with FakeConfluenceServer(options) as server:
+        monkeypatch.setenv("CONFLUENCE_DOMAIN", server.url)
+        for space_key in ("BENCH0", "BENCH0"):
+            export_space(
+                space_key,
+                str(output_dir),
+                options=ExportOptions(attachments=True, dedup=True),
+            )
+
+    space_dir = output_dir.join("BENCH0")
+    html = space_dir.join("html/Page 0.html")
+    assert "Page 0" in html.read_text("utf-8")
+    assert os.stat(str(html)).st_nlink == 2
+
+    objects = [
+        name
+        for directory in output_dir.join(".objects").listdir()
+        for name in directory.listdir()
+    ]
+    files = [name for name in space_dir.visit() if name.isfile()]
+    assert len(files) == 3 * 3 + 8
+    assert len(objects) == len({name.read_binary() for name in files})
+    assert not [
+        name for name in space_dir.visit() if name.ext == ".tmp"
+    ]
+
+
+def test_write_file_does_not_write_through_links(tmpdir):
+    store = ObjectStore(str(tmpdir.join(".objects")))
+    first = str(tmpdir.join("a.txt"))
+    second = str(tmpdir.join("b.txt"))
+    store.write(first, b"template")
+    store.write(second, b"template")
+
+    assert write_file(first, "changed") == 7
+
+    assert tmpdir.join("a.txt").read_text("utf-8") == "changed"
+    assert tmpdir.join("b.txt").read_text("utf-8") == "template"
+
+
+@pytest.mark.parametrize("durability", ["batch", "full"])
+def test_export_space_durable(monkeypatch, tmpdir, durability):
+    options = FakeServerOptions(pages=3, body_size=10, attachments=4)
+    output_dir = tmpdir.mkdir("output")
+    with FakeConfluenceServer(options) as server:
+        monkeypatch.setenv("CONFLUENCE_DOMAIN", server.url)
+        space_key = server.content.space_key(0)
+        metrics.reset()
+        export_space(
+            space_key,
+            str(output_dir),
+            options=ExportOptions(attachments=True, durability=durability),
+        )
+
+    space_dir = output_dir.join(space_key)
+    files = [name for name in space_dir.visit() if name.isfile()]
+    assert len(files) == 3 * 3 + 4
+    assert not [name for name in files if name.ext == ".tmp"]
+    assert metrics.snapshot()["counters"]["fsyncs"] > len(files)
+
+
+def test_export_space_chunks(monkeypatch, tmpdir):
+    options = FakeServerOptions(pages=4, body_size=2000, blog_posts=2)
+    output_dir = tmpdir.mkdir("output")
+    with FakeConfluenceServer(options) as server:
+        monkeypatch.setenv("CONFLUENCE_DOMAIN", server.url)
+        space_key = server.content.space_key(0)
+        export_space(
+            space_key,
+            str(output_dir),
+            options=ExportOptions(
+                blog_posts=True,
+                formats=("json",),
+                chunks=True,
+                chunk_size=500,
+            ),
+        )
+
+    space_dir = output_dir.join(space_key)
+    records = [
+        json.loads(line)
+        for line in space_dir.join("chunks.ndjson").readlines()
+    ]
+    assert {record["type"] for record in records} == {"page", "blogpost"}
+    assert len({record["page_id"] for record in records}) == 6
+    assert all(len(record["text"]) <= 500 for record in records)
+    assert not space_dir.join("txt").exists()
+
+
+@pytest.mark.parametrize("failing", ["Page 2", "Blog post 1"])
+def test_export_space_chunks_resume(monkeypatch, mocker, tmpdir, failing):
+    write = PageExporter.write
+    failed = []
+
+    def write_once(self, rendered):
+        # Fail once, after the page is chunked but before it is completed.
+        if rendered[0]["title"] == failing and not failed:
+            failed.append(rendered[0]["id"])
+            raise Error("Interrupted")
+        write(self, rendered)
+
+    mocker.patch.object(PageExporter, "write", write_once)
+    options = FakeServerOptions(pages=4, body_size=2000, blog_posts=2)
+    export_options = ExportOptions(
+        blog_posts=True, formats=("json",), chunks=True, chunk_size=500
+    )
+    output_dir = tmpdir.mkdir("output")
+    with FakeConfluenceServer(options) as server:
+        monkeypatch.setenv("CONFLUENCE_DOMAIN", server.url)
+        space_key = server.content.space_key(0)
+        with pytest.raises(Error, match="Interrupted"):
+            export_space(space_key, str(output_dir), options=export_options)
+        export_space(
+            space_key, str(output_dir), resume=True, options=export_options
+        )
+
+    records = [
+        json.loads(line)
+        for line in output_dir.join(space_key, "chunks.ndjson").readlines()
+    ]
+    keys = [(record["page_id"], record["chunk"]) for record in records]
+    assert len(keys) == len(set(keys))
+    assert failed[0] in {record["page_id"] for record in records}
+    assert len({record["page_id"] for record in records}) == 6
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_export_space_chunks_resume_after_kill(monkeypatch, tmpdir):
+    options = FakeServerOptions(pages=6, body_size=200)
+    export_options = ExportOptions(
+        formats=("json",), chunks=True, chunk_size=100
+    )
+    output_dir = tmpdir.mkdir("output")
+
+    def export_and_kill(space_key):
+        flush = Checkpoint.flush
+
+        def flush_and_kill(self):
+            flush(self)
+            if len(self.completed) == 3:
+                # Exit without flushing any buffer, like a killed process.
+                os._exit(1)
+
+        Checkpoint.maybe_flush = flush_and_kill
+        export_space(space_key, str(output_dir), options=export_options)
+
+    with FakeConfluenceServer(options) as server:
+        monkeypatch.setenv("CONFLUENCE_DOMAIN", server.url)
+        space_key = server.content.space_key(0)
+        process = multiprocessing.get_context("fork").Process(
+            target=export_and_kill, args=(space_key,)
+        )
+        process.start()
+        process.join()
+        assert process.exitcode == 1
+
+        export_space(
+            space_key, str(output_dir), resume=True, options=export_options
+        )
+
+    records = [
+        json.loads(line)
+        for line in output_dir.join(space_key, "chunks.ndjson").readlines()
+    ]
+    keys = [(record["page_id"], record["chunk"]) for record in records]
+    assert len(keys) == len(set(keys))
+    assert len({record["page_id"] for record in records}) == 6
+
+
+def test_export_space_search_index(monkeypatch, tmpdir):
+    options = FakeServerOptions(pages=3, body_size=10, blog_posts=1)
+    output_dir = tmpdir.mkdir("output")
+    with FakeConfluenceServer(options) as server:
+        monkeypatch.setenv("CONFLUENCE_DOMAIN", server.url)
+        space_key = server.content.space_key(0)
+        for _ in range(2):
+            export_space(
+                space_key,
+                str(output_dir),
+                options=ExportOptions(blog_posts=True, search_index=True),
+            )
+
+    with SearchIndex(str(output_dir.join("search.sqlite"))) as index:
+        assert len(index.search("lorem")) == 4
+        (result,) = index.search('"page 2"', limit=1)
+    assert result["path"] == "/Page 0/Page 2"
+    assert result["owner"] == server.content.user(2)["displayName"]
@@ -13,7 +13,14 @@
 # You should have received a copy of the GNU General Public License
 # along with this file.  If not, see <https://www.gnu.org/licenses/>.
 
-from swrangler.space_metadata import export_spaces_metadata
+import csv
+import sqlite3
+
+from swrangler.space_metadata import (
+    SpaceMetadata,
+    enrich_spaces,
+    export_spaces_metadata,
+)
 
 
 def test_export_spaces_metadata(tmpdir, mocker, spaces_response_with_next):
@@ -28,3 +35,70 @@ def test_export_spaces_metadata(tmpdir, mocker, spaces_response_with_next):
 
     assert csv_file.exists()
     assert mock_get_all_spaces.call_count == 1
+
+
+def test_export_spaces_metadata_enriched(
+    tmpdir, mocker, spaces_response_with_next
+):
+    response = spaces_response_with_next.json()
+    mocker.patch(
+        "swrangler.confluence.Confluence.get_all_spaces",
+        return_value=response["results"],
+    )
+    summaries = {
+        "TEST": {
+            "page_count": 42,
+            "last_activity": "2024-05-01T10:00:00.000Z",
+        },
+        "ds": {"page_count": 0, "last_activity": None},
+    }
+    mock_summary = mocker.patch(
+        "swrangler.confluence.Confluence.get_space_summary",
+        side_effect=summaries.get,
+    )
+
+    output_dir = tmpdir.mkdir("output")
+    export_spaces_metadata(str(output_dir), enrich=True, jobs=2)
+
+    with open(output_dir.join("all-spaces.csv"), encoding="utf-8") as file:
+        rows = list(csv.DictReader(file))
+
+    assert mock_summary.call_count == 2
+    assert rows[0][SpaceMetadata.PAGE_COUNT] == "42"
+    assert rows[0][SpaceMetadata.LAST_ACTIVITY] == "05/01/2024"
+    assert rows[1][SpaceMetadata.PAGE_COUNT] == "0"
+    assert rows[1][SpaceMetadata.LAST_ACTIVITY] == ""
+
+
+def test_enrich_spaces_tolerates_failures(mocker, confluence):
+    mocker.patch.object(
+        confluence, "get_space_summary", side_effect=RuntimeError("boom")
+    )
+
+    summaries = enrich_spaces(confluence, [{"key": "TEST"}], jobs=1)
+
+    assert summaries == {"TEST": {}}
+
+
+def test_export_spaces_metadata_to_db(
+    tmpdir, mocker, spaces_response_with_next
+):
+    mocker.patch(
+        "swrangler.confluence.Confluence.get_all_spaces",
+        return_value=spaces_response_with_next.json()["results"],
+    )
+    mocker.patch(
+        "swrangler.confluence.Confluence.get_space_summary",
+        return_value={"page_count": 3, "last_activity": None},
+    )
+    db_path = str(tmpdir.join("metadata.sqlite"))
+
+    export_spaces_metadata(
+        str(tmpdir.mkdir("output")), enrich=True, metadata_db=db_path
+    )
+
+    with sqlite3.connect(db_path) as connection:
+        rows = connection.execute(
+            "SELECT space_key, page_count FROM spaces ORDER BY space_key"
+        ).fetchall()
+    assert rows == [("TEST", 3), ("ds", 3)]
@@ -0,0 +1,151 @@
+# Copyright (C) 2024-2025 Serghei Iakovlev <gnu@serghei.pl>
+#
+# This file is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# This file is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this file.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import re
+
+from swrangler.confluence import Confluence
+from swrangler.fake_server import FakeConfluenceServer, FakeServerOptions
+from swrangler.space_exporter import ExportOptions
+from swrangler.sync import SYNC_STATE_FILE, SyncState, sync_space
+
+
+def make_page(page_id, title, ancestors=(), version=1):
+    return {
+        "id": page_id,
+        "type": "page",
+        "title": title,
+        "ancestors": [
+            {"id": ancestor_id, "title": ancestor_title}
+            for ancestor_id, ancestor_title in ancestors
+        ],
+        "body": {"storage": {"value": f"<p>{title} v{version}</p>"}},
+        "history": {
+            "createdDate": "2024-01-01T12:00:00.000Z",
+            "lastUpdated": {"when": "2024-01-02T12:00:00.000Z"},
+            "ownedBy": {"displayName": "Jane Doe"},
+        },
+        "version": {"number": version},
+    }
+
+
+class FakeSite:
+    """Space whose pages are searched with CQL queries."""
+
+    def __init__(self, pages):
+        self.pages = {page["id"]: page for page in pages}
+        self.modified = set(self.pages)
+        self.queries = []
+
+    def search_content(self, cql, expand=None, limit=100, description=""):
+        # pylint: disable=unused-argument
+        self.queries.append(cql)
+        ids = re.fullmatch(r"id in \(([^)]*)\)", cql)
+        ancestor = re.match(r"ancestor = (\S+)", cql)
+        if ids is not None:
+            found = [
+                self.pages[page_id]
+                for page_id in ids.group(1).split(",")
+                if page_id in self.pages
+            ]
+        elif ancestor is not None:
+            found = [
+                page
+                for page in self.pages.values()
+                if ancestor.group(1)
+                in [item["id"] for item in page["ancestors"]]
+            ]
+        elif "lastmodified" in cql:
+            found = [self.pages[page_id] for page_id in sorted(self.modified)]
+        else:
+            found = list(self.pages.values())
+        yield found
+
+
+def read_chunks(file_path):
+    with open(file_path, encoding="utf-8") as file:
+        return {json.loads(line)["page_id"] for line in file}
+
+
+def test_sync_space(monkeypatch, tmpdir):
+    options = FakeServerOptions(pages=5, body_size=10, blog_posts=2)
+    output_dir = tmpdir.mkdir("output")
+    export_options = ExportOptions(
+        blog_posts=True, chunks=True, search_index=True
+    )
+    with FakeConfluenceServer(options) as server:
+        monkeypatch.setenv("CONFLUENCE_DOMAIN", server.url)
+        space_key = server.content.space_key(0)
+        sync_space(space_key, str(output_dir), export_options)
+        state_path = str(output_dir.join(space_key, SYNC_STATE_FILE))
+        first = SyncState.load(state_path)
+
+        sync_space(space_key, str(output_dir), export_options)
+        second = SyncState.load(state_path)
+
+    space_dir = output_dir.join(space_key)
+    assert space_dir.join("html/Page 0.html").exists()
+    assert space_dir.join("blog/html/Blog post 1.html").exists()
+    assert len(read_chunks(str(space_dir.join("chunks.ndjson")))) == 7
+    assert first.cursor is not None
+    assert len(first.content) == 7
+    assert second.content == first.content
+
+
+def test_sync_space_applies_changes(mocker, tmpdir):
+    site = FakeSite(
+        [
+            make_page("1", "A"),
+            make_page("2", "B", ancestors=[("1", "A")]),
+            make_page("3", "C"),
+        ]
+    )
+    mocker.patch.object(
+        Confluence, "search_content", side_effect=site.search_content
+    )
+    output_dir = tmpdir.mkdir("output")
+    options = ExportOptions(formats=("html",), chunks=True)
+    sync_space("AIR", str(output_dir), options)
+
+    space_dir = output_dir.join("AIR")
+    assert space_dir.join("html/A/B.html").exists()
+    assert space_dir.join("html/C.html").exists()
+
+    # A is renamed, which moves B without a new version, C is deleted and
+    # D is created.
+    site.pages["1"] = make_page("1", "A2", version=2)
+    site.pages["2"] = make_page("2", "B", ancestors=[("1", "A2")])
+    site.pages["4"] = make_page("4", "D")
+    del site.pages["3"]
+    site.modified = {"1", "4"}
+    site.queries.clear()
+    sync_space("AIR", str(output_dir), options)
+
+    assert space_dir.join("html/A2.html").exists()
+    assert space_dir.join("html/A2/B.html").exists()
+    assert space_dir.join("html/D.html").exists()
+    assert not space_dir.join("html/A.html").exists()
+    assert not space_dir.join("html/A").exists()
+    assert not space_dir.join("html/C.html").exists()
+    assert "ancestor = 1 and type = page" in site.queries
+    assert read_chunks(str(space_dir.join("chunks.ndjson"))) == {
+        "1",
+        "2",
+        "4",
+    }
+
+    state = SyncState.load(str(space_dir.join(SYNC_STATE_FILE)))
+    assert set(state.content) == {"1", "2", "4"}
+    assert state.content["2"]["path"] == "A2/B"